@@ -1,58 +1,38 @@
-import json
+import os
 import re
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.json_stream import iter_json_leaves
+
+# Javítjuk a speciális karaktereket: a francia nagybetűs ékezetes karaktereket egyetlen
+# str.translate menetben cseréljük (É és Ü marad, mert a magyarban is használjuk őket)
+ENCODING_TABLE = str.maketrans({
+    # Francia ékezetes karakterek
+    'È': 'E',
+    'Ê': 'E',
+    'Ë': 'E',
+    'À': 'A',
+    'Â': 'A',
+    'Î': 'I',
+    'Ï': 'I',
+    'Ô': 'O',
+    'Û': 'U',
+    'Ù': 'U',
+    'Ÿ': 'Y',
+    'Ç': 'C',
+    'Œ': 'OE',
+    'Æ': 'AE',
+})
+
+WIP_PATTERN = re.compile(r'WIP\s*-\s*')
 
 def fix_encoding(text):
-    # Javítjuk a speciális karaktereket
-    replacements = {
-        # Francia ékezetes karakterek
-        'È': 'E',
-        'É': 'E',
-        'Ê': 'E',
-        'Ë': 'E',
-        'À': 'A',
-        'Â': 'A',
-        'Î': 'I',
-        'Ï': 'I',
-        'Ô': 'O',
-        'Û': 'U',
-        'Ù': 'U',
-        'Ü': 'U',
-        'Ÿ': 'Y',
-        'Ç': 'C',
-        'Œ': 'OE',
-        'Æ': 'AE',
-        
-        # Magyar ékezetes karakterek megtartása
-        'á': 'á',
-        'é': 'é',
-        'í': 'í',
-        'ó': 'ó',
-        'ö': 'ö',
-        'ő': 'ő',
-        'ú': 'ú',
-        'ü': 'ü',
-        'ű': 'ű',
-        'Á': 'Á',
-        'É': 'É',
-        'Í': 'Í',
-        'Ó': 'Ó',
-        'Ö': 'Ö',
-        'Ő': 'Ő',
-        'Ú': 'Ú',
-        'Ü': 'Ü',
-        'Ű': 'Ű'
-    }
-    
-    # Először a francia ékezetes karaktereket javítjuk
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
+    text = text.translate(ENCODING_TABLE)
     # Speciális kifejezések kezelése
-    text = re.sub(r'WIP\s*-\s*', 'WIP - ', text)  # WIP után egységes szóköz
-    text = text.replace('Ellenőrző', 'Ellenőrző')  # Javítjuk az "éllenőrző" hibát
-    text = text.replace('Előőrs', 'Előőrs')  # Javítjuk az "élőőrs" hibát
-    text = text.replace('Elhagyott', 'Elhagyott')  # Javítjuk az "élhagyott" hibát
-    
+    if 'WIP' in text:
+        text = WIP_PATTERN.sub('WIP - ', text)  # WIP után egységes szóköz
     return text
 
 def fix_line_endings(text):
@@ -62,32 +42,77 @@ def fix_line_endings(text):
     text = ' '.join(text.split())
     return text
 
-def json_to_ini(json_file, ini_file):
-    print(f"JSON fájl beolvasása: {json_file}")
-    # Beolvassuk a JSON fájlt
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"JSON fájl sikeresen beolvasva, {len(data)} kulcs található benne")
-    
-    print(f"INI fájl létrehozása: {ini_file}")
+def json_to_ini(json_file, ini_file, verbose=True):
+    """
+    A JSON fájlt streamelve olvassuk, és soronként írjuk az INI fájlt,
+    így a memóriahasználat nem függ a fájl méretétől.
+    :return: (kulcsok száma, beolvasott bájtok száma)
+    """
+    if verbose:
+        print(f"JSON fájl beolvasása: {json_file}")
+        print(f"INI fájl létrehozása: {ini_file}")
+    keys = 0
     # Kiírjuk INI formátumban
-    with open(ini_file, 'w', encoding='utf-8') as f:
-        for key, value in data.items():
+    with open(json_file, 'r', encoding='utf-8') as src, open(ini_file, 'w', encoding='utf-8') as f:
+        for key, value in iter_json_leaves(src):
             # Ha a value üres string, akkor csak a kulcsot írjuk ki
             if value == "":
                 f.write(f"{key}=\n")
             else:
-                # Javítjuk a kódolást és a sortöréseket
-                value = fix_encoding(value)
-                value = fix_line_endings(value)
-                
-                # Minden értéket egy sorba írunk
-                f.write(f"{key}={value}\n")
-    print(f"Az INI fájl sikeresen létrehozva: {ini_file}")
+                # Javítjuk a kódolást és a sortöréseket, minden értéket egy sorba írunk
+                f.write(f"{key}={fix_line_endings(fix_encoding(value))}\n")
+            keys += 1
+    if verbose:
+        print(f"Az INI fájl sikeresen létrehozva: {ini_file} ({keys} kulcs)")
+    return keys, os.path.getsize(json_file)
+
+def _convert_one(json_file, ini_file):
+    os.makedirs(os.path.dirname(ini_file) or '.', exist_ok=True)
+    return json_to_ini(json_file, ini_file, verbose=False)
+
+def convert_directory(input_dir, output_dir, workers=None):
+    """
+    Egy könyvtár összes JSON fájljának konvertálása párhuzamos worker folyamatokkal.
+    A könyvtárszerkezet megmarad, a végén átviteli riportot írunk ki.
+    """
+    jobs = []
+    for root, _, files in os.walk(input_dir):
+        for filename in files:
+            if filename.lower().endswith('.json'):
+                json_file = os.path.join(root, filename)
+                relative = os.path.relpath(json_file, input_dir)
+                jobs.append((json_file, os.path.join(output_dir, os.path.splitext(relative)[0] + '.ini')))
+
+    print(f"{len(jobs)} JSON fájl konvertálása, workerek: {workers or os.cpu_count()}")
+    start = time.perf_counter()
+    total_keys = 0
+    total_bytes = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_convert_one, json_file, ini_file): json_file for json_file, ini_file in jobs}
+        for future in as_completed(futures):
+            try:
+                keys, size = future.result()
+                total_keys += keys
+                total_bytes += size
+            except Exception as e:
+                failed += 1
+                print(f"Hiba a konvertálás során: {futures[future]}: {e}")
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print("\nÁtviteli riport:")
+    print(f"  Fájlok:  {len(jobs) - failed} sikeres, {failed} hibás")
+    print(f"  Kulcsok: {total_keys} ({total_keys / elapsed:.0f} kulcs/s)")
+    print(f"  Adat:    {total_bytes / 1_000_000:.1f} MB ({total_bytes / 1_000_000 / elapsed:.1f} MB/s)")
+    print(f"  Idő:     {elapsed:.2f} s")
+    return failed == 0
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 3:
-        print("Használat: python json_to_ini.py input.json output.ini")
-        sys.exit(1)
-    json_to_ini(sys.argv[1], sys.argv[2])
+    parser = argparse.ArgumentParser(description="JSON fájl vagy könyvtár konvertálása INI formátumba")
+    parser.add_argument("input", help="Bemeneti JSON fájl vagy könyvtár")
+    parser.add_argument("output", help="Kimeneti INI fájl vagy könyvtár")
+    parser.add_argument("--workers", type=int, help="Párhuzamos worker folyamatok száma könyvtár esetén (alapértelmezés: CPU-k száma)")
+    args = parser.parse_args()
+    if os.path.isdir(args.input):
+        sys.exit(0 if convert_directory(args.input, args.output, args.workers) else 1)
+    json_to_ini(args.input, args.output)
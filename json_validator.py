@@ -1,5 +1,7 @@
 import json
 import sys
+import argparse
+from src.validation import validate_directory
 
 def validate_json(file_path):
     try:
@@ -21,5 +23,31 @@ def validate_json(file_path):
     except Exception as e:
         print(f"Error reading file: {str(e)}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Validate translated files: syntax and source/target parity")
+    parser.add_argument("path", nargs="?", default="tests/test_files/json/test1_hu.json",
+                        help="File or directory to validate (directories are checked in parallel)")
+    parser.add_argument("--source-lang", help="Source language code: strings_hu.json is compared to strings_<lang>.json "
+                                              "(default: the file without a language suffix)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--warnings", action="store_true", help="Also print warnings, e.g. untranslated values")
+    args = parser.parse_args()
+
+    results = validate_directory(args.path, args.source_lang, args.workers)
+    error_count = 0
+    for file_path, source_path, issues in results:
+        errors = [issue for issue in issues if issue.severity == 'error']
+        error_count += len(errors)
+        against = f" (against {source_path})" if source_path else ""
+        print(f"{'OK' if not errors else f'{len(errors)} error(s)'}: {file_path}{against}")
+        for issue in (issues if args.warnings else errors):
+            key = f" {issue.key}:" if issue.key else ""
+            print(f"    [{issue.severity}/{issue.code}]{key} {issue.message}")
+        if file_path.lower().endswith('.json') and any(issue.code == 'syntax' for issue in errors):
+            validate_json(file_path)
+
+    print(f"\n{len(results)} file(s) checked, {error_count} error(s)")
+    sys.exit(1 if error_count else 0)
+
 if __name__ == "__main__":
-    validate_json("tests/test_files/json/test1_hu.json")
+    main()
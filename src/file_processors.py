@@ -1,12 +1,36 @@
 import os
 import json
+import time
 import xml.etree.ElementTree as ET
 import re
 import logging
-import configparser
-from .translation import batch_translate_texts
-from .language_utils import get_target_language
-from langdetect import detect, LangDetectException
+from collections import deque
+from .translation import batch_translate_texts, fallbacks, translate_stream
+from .routing import record_tier, router, translate_routed
+from .translation_memory import memory
+from .language_utils import in_place_language, localized_path, detect_language
+from .profiling import profiler
+from .json_stream import stream_rewrite
+from .ini_engine import read_ini
+from .logging_config import progress
+from .metrics import metrics
+from .prefilter import prefilter
+from .validation import gate_failures, log_gate_failures
+
+class Extraction:
+    """
+    Egy forrásfájlból kinyert fordítandó szegmensek.
+    A fájlt egyszer olvassuk be; apply() a {szegmens index: fordítás} szótárt írja
+    a memóriában lévő dokumentumba, write() pedig kiírja a megadott útvonalra.
+    Így ugyanabból a kinyerésből több célnyelvű kimenet is készülhet.
+    """
+
+    def __init__(self, file_path: str, texts, keys, apply, write):
+        self.file_path = file_path
+        self.texts = texts
+        self.keys = keys
+        self.apply = apply
+        self.write = write
 
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -14,13 +38,6 @@ class CustomJSONEncoder(json.JSONEncoder):
             return obj.text
         return super().default(obj)
 
-def print_safe(text: str):
-    """Biztonságos kiírás, ami kezeli a kódolási hibákat"""
-    try:
-        print(text)
-    except UnicodeEncodeError:
-        print(text.encode('utf-8', 'replace').decode('utf-8'))
-
 # Francia szavak és kifejezések listája a jobb felismeréshez
 french_words = [
     # Általános francia szavak
@@ -46,26 +63,19 @@ french_words = [
 
 def is_text_french(text):
     """Ellenőrzi, hogy a szöveg francia-e"""
-    try:
-        # Konvertáljuk kisbetűssé a szöveget a jobb felismeréshez
-        text_lower = text.lower()
-        
-        # Először próbáljuk meg a nyelvfelismerést
-        detected_lang = detect(text_lower)
-        if detected_lang == 'fr':
-            return True
-            
-        # Ha nem francia, nézzük meg a francia szavakat
-        words = text_lower.split()
-        french_word_count = sum(1 for word in words if any(fw.lower() == word for fw in french_words))
-        
-        # Ha van legalább egy francia szó, vagy tartalmaz speciális francia karaktereket
-        return french_word_count > 0 or any(c in text for c in 'éèêëàâäôöûüùïîç')
-    except LangDetectException:
-        # Ha a nyelvfelismerés nem sikerül, nézzük meg a francia szavakat és karaktereket
-        words = text_lower.split()
-        french_word_count = sum(1 for word in words if any(fw.lower() == word for fw in french_words))
-        return french_word_count > 0 or any(c in text for c in 'éèêëàâäôöûüùïîç')
+    # Konvertáljuk kisbetűssé a szöveget a jobb felismeréshez
+    text_lower = text.lower()
+
+    # Először próbáljuk meg a nyelvfelismerést
+    if detect_language(text_lower) == 'fr':
+        return True
+
+    # Ha nem francia (vagy a felismerés nem sikerül), nézzük meg a francia szavakat
+    words = text_lower.split()
+    french_word_count = sum(1 for word in words if any(fw.lower() == word for fw in french_words))
+
+    # Ha van legalább egy francia szó, vagy tartalmaz speciális francia karaktereket
+    return french_word_count > 0 or any(c in text for c in 'éèêëàâäôöûüùïîç')
 
 def count_french_words(text):
     """Megszámolja a francia szavakat a szövegben"""
@@ -85,26 +95,39 @@ def preprocess_text(text):
             pass
     return text
 
-def process_json(file_path: str, node: str, model: str, default_lang: str):
-    print_safe(f"\nProcessing JSON file: {file_path}")
-    target_lang = get_target_language(file_path, default_lang)
-    print_safe(f"Target language: {target_lang}")
-    
-    # Ellenőrizzük, hogy van-e mentett állapot
-    progress_file = file_path + '.progress'
-    translated_keys = set()
-    if os.path.exists(progress_file):
-        try:
-            with open(progress_file, 'r', encoding='utf-8') as f:
-                translated_keys = set(json.load(f))
-            print_safe(f"\nFound saved progress: {len(translated_keys)} keys already translated")
-        except:
-            print_safe("\nCould not load progress file, starting from beginning")
-            translated_keys = set()
-    
+# A validáláson elbukó szegmenseket ennyiszor fordítjuk újra, utána a forrásszöveg marad
+GATE_RETRIES = 1
+
+# Ekkora JSON fájl felett a streamelő feldolgozást használjuk
+STREAM_JSON_THRESHOLD = 50 * 1024 * 1024
+
+# A folytatható JSON feldolgozás legfeljebb ennyi másodpercenként menti a teljes fájlt és a haladást
+JSON_CHECKPOINT_SECONDS = 30
+
+def select_json_text(value):
+    """A JSON string értékből fordítandó szöveg, ha francia (vagy TextBlock maradvány), különben None"""
+    if not value.strip():
+        return None
+    text_to_check = value.strip()
+    with profiler.stage('detect'):
+        is_french = is_text_french(text_to_check)
+        french_word_count = count_french_words(text_to_check)
+
+    # Előfeldolgozzuk a szöveget
+    with profiler.stage('mask'):
+        text_to_translate = preprocess_text(text_to_check)
+
+    # Ha a szöveg francia vagy tartalmaz francia kifejezéseket
+    if is_french or french_word_count >= 1 or text_to_translate != text_to_check:
+        return text_to_translate
+    return None
+
+def extract_json(file_path: str, node: str = None, translated_keys=frozenset()) -> Extraction:
+    """Kinyeri a francia szövegeket a JSON fájlból (a már lefordított kulcsokat kihagyja)"""
     # Beolvassuk a JSON fájlt
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    with profiler.stage('parse'):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
     
     texts_to_translate = []
     keys_to_update = []
@@ -117,174 +140,598 @@ def process_json(file_path: str, node: str, model: str, default_lang: str):
                 if isinstance(value, (dict, list)):
                     process_node(value, current_key)
                 elif isinstance(value, str) and value.strip():
-                    try:
-                        # Ha már le van fordítva ez a kulcs, kihagyjuk
-                        if current_key in translated_keys:
-                            print_safe(f"\nSkipping already translated key: {current_key}")
-                            continue
-                            
-                        text_to_check = value.strip()
-                        is_french = is_text_french(text_to_check)
-                        french_word_count = count_french_words(text_to_check)
-                        
-                        # Előfeldolgozzuk a szöveget
-                        text_to_translate = preprocess_text(text_to_check)
-                        
-                        # Ha a szöveg francia vagy tartalmaz francia kifejezéseket
-                        if is_french or french_word_count >= 1 or text_to_translate != text_to_check:
-                            print_safe(f"Found French text: {value}")
-                            texts_to_translate.append(text_to_translate)
-                            keys_to_update.append((node_data, key, current_key))
-                    except LangDetectException:
-                        pass
+                    # Ha már le van fordítva ez a kulcs, kihagyjuk
+                    if current_key in translated_keys:
+                        logging.debug("Skipping already translated key: %s", current_key)
+                        continue
+                    
+                    text_to_translate = select_json_text(value)
+                    if text_to_translate is not None:
+                        logging.debug("Found French text", extra={'key': current_key, 'source': value})
+                        texts_to_translate.append(text_to_translate)
+                        keys_to_update.append((node_data, key, current_key))
         elif isinstance(node_data, list):
             for i, item in enumerate(node_data):
                 current_key = f"{parent_key}[{i}]"
                 process_node(item, current_key)
     
     # Ha node meg van adva, csak azt a részfát járjuk be
-    if node is not None and node in data:
-        print_safe(f"\nProcessing only node: {node}")
-        process_node(data[node])
+    with profiler.stage('parse'):
+        if node is not None and node in data:
+            logging.debug("Processing only node: %s", node)
+            process_node(data[node])
+        else:
+            logging.debug("Processing entire JSON tree")
+            process_node(data)
+
+    def apply(translations):
+        for index, translated_text in translations.items():
+            node_data, key, full_key = keys_to_update[index]
+            logging.debug("Updating key", extra={'key': full_key, 'old': node_data[key], 'new': translated_text})
+            node_data[key] = translated_text
+
+    def write(out_path):
+        with open(out_path, 'w', encoding='utf-8') as save_file:
+            json.dump(data, save_file, indent=4, ensure_ascii=False, cls=CustomJSONEncoder)
+
+    return Extraction(file_path, texts_to_translate, [full_key for _, _, full_key in keys_to_update], apply, write)
+
+def extract_xml(file_path: str) -> Extraction:
+    """Kinyeri az XML fájl összes nem üres szöveges csomópontját"""
+    with profiler.stage('parse'):
+        tree = ET.parse(file_path)
+        root = tree.getroot()
+    
+    texts_to_translate = []
+    elements_to_update = []
+    
+    with profiler.stage('detect'):
+        for elem in root.iter():
+            if elem.text and elem.text.strip():
+                texts_to_translate.append(elem.text)
+                elements_to_update.append(elem)
+
+    def apply(translations):
+        for index, translated in translations.items():
+            elements_to_update[index].text = translated
+
+    def write(out_path):
+        tree.write(out_path, encoding='utf-8', xml_declaration=True)
+
+    keys = [f"{elem.tag}[{i}]" for i, elem in enumerate(elements_to_update)]
+    return Extraction(file_path, texts_to_translate, keys, apply, write)
+
+def extract_xliff(file_path: str) -> Extraction:
+    """Kinyeri az XLIFF trans-unit forrásszövegeit, a célt a <target> elembe írjuk"""
+    with profiler.stage('parse'):
+        tree = ET.parse(file_path)
+        root = tree.getroot()
+    
+    texts_to_translate = []
+    elements_to_update = []
+    keys = []
+    
+    with profiler.stage('detect'):
+        for trans_unit in root.findall('.//{urn:oasis:names:tc:xliff:document:1.2}trans-unit'):
+            source = trans_unit.find('{urn:oasis:names:tc:xliff:document:1.2}source')
+            if source is not None and source.text and source.text.strip():
+                texts_to_translate.append(source.text)
+                target = trans_unit.find('{urn:oasis:names:tc:xliff:document:1.2}target')
+                if target is None:
+                    target = ET.SubElement(trans_unit, '{urn:oasis:names:tc:xliff:document:1.2}target')
+                elements_to_update.append(target)
+                keys.append(trans_unit.get('id', str(len(keys))))
+
+    def apply(translations):
+        for index, translated in translations.items():
+            elements_to_update[index].text = translated
+
+    def write(out_path):
+        tree.write(out_path, encoding='utf-8', xml_declaration=True)
+
+    return Extraction(file_path, texts_to_translate, keys, apply, write)
+
+def extract_text(file_path: str) -> Extraction:
+    """Szöveges és Markdown fájl: a teljes tartalom egyetlen szegmens"""
+    with profiler.stage('parse'):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    result = [content]
+
+    def apply(translations):
+        if 0 in translations:
+            result[0] = translations[0]
+
+    def write(out_path):
+        with open(out_path, 'w', encoding='utf-8') as file:
+            file.write(result[0])
+
+    return Extraction(file_path, [content], ['content'], apply, write)
+
+def ini_value_is_french(value: str) -> bool:
+    """Igaz, ha az INI érték valamelyik része francia (a nagybetűs azonosítók mentén feldarabolva)"""
+    # Ha a szöveg egy TextBlock objektum stringje, vegyük ki belőle a szöveget
+    with profiler.stage('mask'):
+        text_to_check = preprocess_text(value)
+    
+    # Próbáljuk meg feldarabolni a szöveget, ha több nyelv van benne
+    text_parts = re.split(r'([A-Z][A-Z0-9_]+(?:\s*[:-]\s*|\s+))', text_to_check)
+    for part in text_parts:
+        if part.strip():
+            with profiler.stage('detect'):
+                detected_lang = detect_language(part)
+            if detected_lang == 'fr':
+                return True  # Ha találtunk francia részt, az egész értéket lefordítjuk
+    return False
+
+def extract_ini(file_path: str) -> Extraction:
+    """
+    Kinyeri a francia értékeket az INI fájlból (szekciókkal vagy egyszerű kulcs=érték sorokkal).
+    A fájlt egyszer olvassuk be, és csak a lefordított értékek bájt-tartományait írjuk át,
+    így a kommentek, a sorrend, a kulcsok írásmódja, a kódolás és a sorvégek megmaradnak.
+    """
+    with profiler.stage('parse'):
+        document = read_ini(file_path)
+
+    texts_to_translate = []
+    entry_indexes = []
+    keys = []
+
+    for index, entry in enumerate(document.entries):
+        value = document.value(entry)
+        # Ha a szöveg nem üres, ellenőrizzük, hogy francia-e
+        if value.strip() and ini_value_is_french(value):
+            logging.debug("Found French text", extra={'section': entry.section, 'key': entry.key, 'source': value})
+            texts_to_translate.append(value)
+            entry_indexes.append(index)
+            keys.append(document.entry_id(entry))
+
+    replacements = {}
+
+    def apply(translations):
+        for index, translated in translations.items():
+            replacements[entry_indexes[index]] = translated
+
+    def write(out_path):
+        document.write(out_path, replacements)
+
+    return Extraction(file_path, texts_to_translate, keys, apply, write)
+
+EXTRACTORS = {
+    '.json': extract_json,
+    '.xml': extract_xml,
+    '.xlf': extract_xliff,
+    '.txt': extract_text,
+    '.md': extract_text,
+    '.markdown': extract_text,
+    '.ini': extract_ini,
+}
+
+def translate_gated(texts, target_langs, model: str, langs_per_call: int = 1, file_path: str = None, keys=None,
+                    failed: dict = None) -> dict:
+    """
+    Fordítás írás előtti ellenőrzéssel: csak a hibás szegmenseket (eltérő helyőrzők/tagek,
+    üres válasz, TextBlock maradvány) küldjük újra, nem az egész fájlt.
+    Ami az újrapróbálás után is hibás, annál a forrásszöveg marad.
+    Modell szintek használatakor az újrapróbálás a legerősebb szinten történik.
+    A fordítási memóriában már meglévő szegmenseket nem küldjük el újra, az ellenőrzött
+    új fordítások pedig bekerülnek a memóriába.
+    Az előszűrő szerint nem fordítandó szegmensek (számok, URL-ek, azonosítók, ...) változatlanul maradnak.
+    :param failed: ha megadjuk, nyelvenként kitöltjük azoknak a szegmenseknek az indexeivel, amelyeknél valódi hiba
+                   (API hiba, kliens hiánya, újrapróbálás után is hibás válasz) miatt maradt a forrásszöveg.
+                   A forrással azonos, de helyes fordítás ("Garage", "Hangar") nem számít hibának.
+    """
+    failed = failed if failed is not None else {}
+    keep = prefilter.split(texts, len(target_langs))
+    if len(keep) < len(texts):
+        progress.advance((len(texts) - len(keep)) * len(target_langs))
+        results = {lang: list(texts) for lang in target_langs}
+        if keep:
+            kept_failed = {}
+            translated = translate_gated([texts[i] for i in keep], target_langs, model, langs_per_call, file_path,
+                                         [keys[i] for i in keep] if keys else None, kept_failed)
+            for lang in target_langs:
+                for i, value in zip(keep, translated[lang]):
+                    results[lang][i] = value
+                failed[lang] = {keep[j] for j in kept_failed.get(lang, ())}
+        return results
+    with fallbacks.collect() as fell_back:
+        results = translate_cached(texts, target_langs, model, langs_per_call, keys)
+        for lang in target_langs:
+            _gate(texts, results[lang], lang, model, file_path, keys, fell_back, failed)
+    return results
+
+def _gate(texts, translations: list, lang: str, model: str, file_path: str, keys, fell_back: set, failed: dict):
+    """Egy nyelv fordításainak ellenőrzése, a hibásak újrakérése és a jók memóriába írása (helyben módosít)"""
+    escalated = set()
+    with profiler.stage('validate'):
+        failures = gate_failures(texts, translations)
+    for _ in range(GATE_RETRIES):
+        if not failures:
+            break
+        indexes = sorted(failures)
+        escalated.update(indexes)
+        logging.info("Re-queueing %d segments of %s [%s] that failed validation", len(indexes), file_path, lang)
+        retried = batch_translate_texts([texts[i] for i in indexes], lang, router.escalation_model(model))
+        for i, translated in zip(indexes, retried):
+            translations[i] = translated
+        with profiler.stage('validate'):
+            still_failing = gate_failures([texts[i] for i in indexes], retried)
+        failures = {indexes[j]: issues for j, issues in still_failing.items()}
+    if failures:
+        log_gate_failures(file_path, lang, failures, keys)
+        for i in failures:
+            translations[i] = texts[i]
+    lost = set(failures)
+    lost.update(i for i, text in enumerate(texts) if (text, lang) in fell_back)
+    failed[lang] = lost
+    if memory.enabled:
+        for i, (source, translated) in enumerate(zip(texts, translations)):
+            # A visszaesést nem tároljuk; a forrással azonos, de helyes fordítást igen
+            if i not in lost:
+                # Az a modell kerül a memóriába, amelyik a fordítást ténylegesen adta (szint vagy eszkaláció)
+                memory.put(source, lang, translated, router.escalation_model(model) if i in escalated
+                           else router.model_for(source, keys[i] if keys else None, model))
+
+def _memory_lookup(text: str, lang: str):
+    """
+    Egy szegmens a fordítási memóriából: (fordítás, tipp). Pontos találat nélkül fuzzy keresés:
+    számokban/helyőrzőkben eltérő korábbi szövegnél átigazított fordítás, csak hasonlónál few-shot tipp.
+    """
+    cached = memory.get(text, lang)
+    if cached is not None:
+        return cached, None
+    match = memory.fuzzy(text, lang)
+    if match is None:
+        return None, None
+    kind, value = match
+    metrics.incr(f"tm.fuzzy.{kind}")
+    return (value, None) if kind == 'reuse' else (None, value)
+
+def translate_gated_stream(texts, target_lang: str, model: str, file_path: str = None, keys=None):
+    """
+    A translate_gated egynyelvű, generátoros változata: (index, fordítás) párokat ad, amint egy szegmens
+    elkészült, így a hívó szegmensenként alkalmazhatja és mentheti az eredményt.
+    Az előszűrt és a memóriából jövő szegmensek azonnal jönnek, a többi a translate_stream sorrendjében.
+    Az ellenőrzésen elbukott szegmenst rögtön újrakérjük; ha az is hibás, a forrásszöveg jön.
+    """
+    keep = prefilter.split(texts)
+    kept = set(keep)
+    for index, text in enumerate(texts):
+        if index not in kept:
+            progress.advance()
+            yield index, text
+    hints = [None] * len(texts)
+    missing = []
+    for index in keep:
+        cached = None
+        if memory.enabled:
+            cached, hints[index] = _memory_lookup(texts[index], target_lang)
+        if cached is None:
+            missing.append(index)
+        else:
+            progress.advance()
+            yield index, cached
+    if router.enabled:
+        groups = [(tier, [missing[j] for j in indexes]) for tier, indexes in
+                  router.assign([texts[i] for i in missing], [keys[i] for i in missing] if keys else None).items()]
     else:
-        print_safe("\nProcessing entire JSON tree")
-        process_node(data)
+        groups = [(None, missing)]
+    for tier, indexes in groups:
+        group_model = tier.model if tier else model
+        group_hints = [hints[i] for i in indexes]
+        stream = translate_stream([texts[i] for i in indexes], target_lang, group_model,
+                                  hints=group_hints if any(group_hints) else None)
+        while True:
+            started = time.perf_counter()
+            with fallbacks.collect() as fell_back:
+                item = next(stream, None)
+            if item is None:
+                break
+            j, translated, _ = item
+            index = indexes[j]
+            if tier is not None:
+                record_tier(tier, [texts[index]], {target_lang: [translated]}, time.perf_counter() - started)
+            yield index, _gate_segment(texts[index], translated, target_lang, group_model, file_path, index, keys,
+                                       (texts[index], target_lang) in fell_back)
+
+def _gate_segment(source: str, translated: str, lang: str, model: str, file_path: str, index: int, keys,
+                  fell_back: bool = False) -> str:
+    """
+    Egy szegmens ellenőrzése és szükség szerinti újrakérése, mint a translate_gated kötegenként
+    :param model: a szegmenst fordító (szint) modell, ez kerül a memóriába
+    :param fell_back: a szegmens hiba miatt maradt forrásszöveg, nem tároljuk
+    """
+    with profiler.stage('validate'):
+        failures = gate_failures([source], [translated])
+    for _ in range(GATE_RETRIES):
+        if not failures:
+            break
+        logging.info("Re-queueing segment %s of %s [%s] that failed validation", keys[index] if keys else index,
+                     file_path, lang)
+        model = router.escalation_model(model)
+        translated = batch_translate_texts([source], lang, model)[0]
+        with profiler.stage('validate'):
+            failures = gate_failures([source], [translated])
+    if failures:
+        log_gate_failures(file_path, lang, {index: failures[0]}, keys)
+        return source
+    if memory.enabled and not fell_back:
+        memory.put(source, lang, translated, model)
+    return translated
+
+def translate_cached(texts, target_langs, model: str, langs_per_call: int = 1, keys=None) -> dict:
+    """
+    A fordítási memória találatai, a hiányzó szegmensek fordítása nyelvcsoportonként.
+    A pontos találat nélküli szegmensekhez fuzzy keresés: ha csak számokban/helyőrzőkben tér el egy
+    korábbi szövegtől, a régi fordítást igazítjuk át; ha csak hasonló, a párok few-shot példaként mennek a prompthoz.
+    """
+    if not memory.enabled:
+        return translate_routed(texts, target_langs, model, langs_per_call, keys)
+    results = {lang: [None] * len(texts) for lang in target_langs}
+    hints = {}
+    for lang in target_langs:
+        for index, text in enumerate(texts):
+            results[lang][index], hint = _memory_lookup(text, lang)
+            if hint is not None:
+                hints.setdefault(lang, [None] * len(texts))[index] = hint
+    groups = {}
+    for index in range(len(texts)):
+        missing = tuple(lang for lang in target_langs if results[lang][index] is None)
+        if missing:
+            groups.setdefault(missing, []).append(index)
+    hits = sum(len(texts) - sum(len(indexes) for langs, indexes in groups.items() if lang in langs)
+               for lang in target_langs)
+    if hits:
+        logging.debug("Translation memory served %d segments", hits)
+        progress.advance(hits)
+    for langs, indexes in groups.items():
+        group_hints = {lang: [hints[lang][i] for i in indexes] for lang in langs if lang in hints}
+        translated = translate_routed([texts[i] for i in indexes], langs, model, langs_per_call,
+                                      [keys[i] for i in indexes] if keys else None, group_hints or None)
+        for lang in langs:
+            for i, value in zip(indexes, translated[lang]):
+                results[lang][i] = value
+    return results
+
+def translate_extraction(extraction: Extraction, target_langs, model: str, output_paths: dict, langs_per_call: int = 1):
+    """
+    Lefordítja a kinyert szegmenseket minden célnyelvre, és nyelvenként kiírja a kimenetet.
+    Ha nincs mit fordítani, a forrásfájlt nem írjuk felül feleslegesen.
+    """
+    logging.info("Number of texts to translate in %s: %d", extraction.file_path, len(extraction.texts))
+    progress.add_segments(len(extraction.texts) * len(target_langs))
+
+    results = {}
+    if extraction.texts:
+        with profiler.stage('translate'):
+            results = translate_gated(extraction.texts, target_langs, model, langs_per_call, extraction.file_path, extraction.keys)
+    write_extraction(extraction, results, target_langs, output_paths)
+    return results
+
+def write_extraction(extraction: Extraction, results: dict, target_langs, output_paths: dict):
+    """A fordítások alkalmazása és nyelvenkénti kiírása (a translate_extraction második fele)"""
+    for lang in target_langs:
+        out_path = output_paths[lang]
+        if not extraction.texts and os.path.abspath(out_path) == os.path.abspath(extraction.file_path):
+            continue
+        if extraction.texts:
+            with profiler.stage('apply'):
+                extraction.apply(dict(enumerate(results[lang])))
+        with profiler.stage('write'):
+            extraction.write(out_path)
+        logging.debug("Wrote %s translation to %s", lang, out_path)
+
+def stream_translate_json(file_path: str, model: str, output_paths: dict, node: str = None,
+                          translated_keys=frozenset(), langs_per_call: int = 1, window: int = 200,
+                          progress_path: str = None):
+    """
+    Nagy JSON fájlok streamelő fordítása: a string leveleket útvonalukkal együtt olvassuk,
+    window méretű ablakokban fordítjuk, és egyetlen előre haladó menetben írjuk ki minden célnyelvre.
+    A kulcsok sorrendje és a formázás megmarad, a memóriahasználat nem függ a fájl méretétől.
+    A node megadásakor csak az alatta lévő részfát fordítjuk (a kulcsok a node-hoz relatívak).
+    progress_path megadásakor (egy célnyelv) a fordítás szegmensenként jön; ha közben kivétel történik,
+    a már kész fordításokkal (a többi levél változatlan) kiírjuk a kimenetet, a kész kulcsokat
+    a haladási fájlba mentjük, és csak ezután adjuk tovább a kivételt.
+    """
+    target_langs = list(output_paths)
+    temp_paths = {lang: path + '.tmp' for lang, path in output_paths.items()}
+    # A kiválasztott levelek kulcsai a fordításra küldés sorrendjében (a modell routinghoz)
+    pending_keys = deque()
+
+    def relative_key(path):
+        if node is None:
+            return path
+        if path.startswith(node + '.'):
+            return path[len(node) + 1:]
+        if path.startswith(node + '['):
+            return path[len(node):]
+        return None
+
+    def select(path, value):
+        key = relative_key(path)
+        if key is None or key in translated_keys:
+            return None
+        text = select_json_text(value)
+        if text is not None:
+            logging.debug("Found French text", extra={'key': key, 'source': value})
+            progress.add_segments(len(target_langs))
+            pending_keys.append(key)
+        return text
+
+    done_keys = []
+    # Az első kivétel; utána a maradék levelek fordítás nélkül íródnak ki
+    failed = []
+
+    def translate(texts):
+        keys = [pending_keys.popleft() for _ in texts]
+        if failed:
+            return {}
+        if progress_path is None:
+            with profiler.stage('translate'):
+                return translate_gated(texts, target_langs, model, langs_per_call, file_path, keys)
+        translations = [None] * len(texts)
+        try:
+            with profiler.stage('translate'):
+                for index, translated in translate_gated_stream(texts, target_langs[0], model, file_path, keys):
+                    translations[index] = translated
+                    done_keys.append(keys[index])
+        except BaseException as e:
+            failed.append(e)
+        return {target_langs[0]: translations}
+
+    outputs = {}
+    try:
+        for lang, temp_path in temp_paths.items():
+            outputs[lang] = open(temp_path, 'w', encoding='utf-8', newline='')
+        with open(file_path, 'r', encoding='utf-8', newline='') as source:
+            stats = stream_rewrite(source, outputs, select, translate, window)
+    except Exception:
+        for out in outputs.values():
+            out.close()
+        for temp_path in temp_paths.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+    for out in outputs.values():
+        out.close()
+    # A kész kimenetek atomi cseréje, így hiba esetén a cél érintetlen marad
+    with profiler.stage('write'):
+        for lang, temp_path in temp_paths.items():
+            os.replace(temp_path, output_paths[lang])
+    if failed:
+        logging.error("Translation of %s stopped after %d segments, saving progress", file_path, len(done_keys))
+        with open(progress_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(set(translated_keys).union(done_keys)), f, indent=4)
+        raise failed[0]
+    logging.info("Streamed %s: %d string values, %d translated", file_path, stats['leaves'], stats['selected'])
+    return stats
+
+def process_json(file_path: str, node: str, model: str, default_lang: str, stream: bool = None):
+    target_lang = in_place_language(file_path, default_lang)
+    logging.info("Processing JSON file: %s (target language: %s)", file_path, target_lang)
+    
+    if stream is None:
+        stream = os.path.getsize(file_path) >= STREAM_JSON_THRESHOLD
+    
+    # Ellenőrizzük, hogy van-e mentett állapot
+    progress_file = file_path + '.progress'
+    translated_keys = set()
+    if os.path.exists(progress_file):
+        try:
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                translated_keys = set(json.load(f))
+            logging.info("Found saved progress: %d keys already translated", len(translated_keys))
+        except:
+            logging.warning("Could not load progress file, starting from beginning")
+            translated_keys = set()
+    
+    if stream:
+        # Streamelésnél a fájl csak a végén cserélődik; megszakadáskor a kész kulcsokat a haladási fájl őrzi,
+        # és egy korábbi futás már lefordított kulcsait kihagyjuk
+        stream_translate_json(file_path, model, {target_lang: file_path}, node, translated_keys,
+                              progress_path=progress_file)
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
+        return
     
-    print_safe(f"\nNumber of texts to translate: {len(texts_to_translate)}")
+    extraction = extract_json(file_path, node, translated_keys)
+    texts_to_translate = extraction.texts
     
+    logging.info("Number of texts to translate in %s: %d", file_path, len(texts_to_translate))
+    progress.add_segments(len(texts_to_translate))
+
+    def checkpoint():
+        """
+        A fájl, majd a haladás mentése (így a haladási fájl sosem előzi meg a kiírt fordításokat).
+        A fájl egy ideiglenes fájlon át, atomi cserével íródik, így megszakadáskor sem marad félig kiírva.
+        """
+        with profiler.stage('write'):
+            temp_path = file_path + '.tmp'
+            try:
+                extraction.write(temp_path)
+                os.replace(temp_path, file_path)
+            except Exception as e:
+                logging.error("Error saving file %s: %s", file_path, e)
+                return False
+            try:
+                with open(progress_file, 'w', encoding='utf-8') as f:
+                    json.dump(list(translated_keys), f, indent=4)
+            except Exception as e:
+                logging.warning("Error saving progress: %s", e)
+        return True
+
     if texts_to_translate:
-        print_safe("\nStarting translation...")
-        # Batch-ekben fordítjuk a szövegeket
-        batch_size = 10
-        for i in range(0, len(texts_to_translate), batch_size):
-            batch = texts_to_translate[i:i+batch_size]
-            batch_keys = keys_to_update[i:i+batch_size]
-            
-            print_safe(f"\nProcessing batch {i//batch_size + 1}/{(len(texts_to_translate) + batch_size - 1)//batch_size}")
-            translated_batch = batch_translate_texts(batch, default_lang, model)
-            
-            # Frissítjük és azonnal mentjük a változtatásokat
-            for (node_data, key, full_key), translated_text in zip(batch_keys, translated_batch):
-                print_safe(f"\nUpdating key: {full_key}")
-                print_safe(f"Old value: {node_data[key]}")
-                print_safe(f"New value: {translated_text}")
-                node_data[key] = translated_text
-                
-                # Hozzáadjuk a lefordított kulcsot a listához
-                translated_keys.add(full_key)
-                
-                # Minden fordítás után mentjük a haladást
-                try:
-                    print_safe("\nSaving progress...")
-                    with open(progress_file, 'w', encoding='utf-8') as f:
-                        json.dump(list(translated_keys), f, indent=4)
-                except Exception as e:
-                    print_safe(f"Error saving progress: {str(e)}")
-                
-                # Mentjük a JSON fájlt is
-                try:
-                    print_safe("\nSaving changes to file...")
-                    with open(file_path, 'w', encoding='utf-8') as save_file:
-                        json.dump(data, save_file, indent=4, ensure_ascii=False, cls=CustomJSONEncoder)
-                    print_safe("File saved successfully!")
-                except Exception as e:
-                    print_safe(f"Error saving file: {str(e)}")
-                    return
+        # Minden elkészült szegmenst azonnal alkalmazunk; a teljes fájlt csak JSON_CHECKPOINT_SECONDS
+        # másodpercenként írjuk ki (nem minden néhány szegmens után), így az írás nem nő négyzetesen a fájlmérettel
+        last_checkpoint = time.monotonic()
+        try:
+            for index, translated in translate_gated_stream(texts_to_translate, target_lang, model, file_path,
+                                                            extraction.keys):
+                with profiler.stage('apply'):
+                    extraction.apply({index: translated})
+                translated_keys.add(extraction.keys[index])
+                if time.monotonic() - last_checkpoint >= JSON_CHECKPOINT_SECONDS:
+                    if not checkpoint():
+                        return
+                    last_checkpoint = time.monotonic()
+        except BaseException:
+            # Megszakadáskor a már megkapott fordítások ne vesszenek el
+            checkpoint()
+            raise
+        if not checkpoint():
+            return
     
     # Ha minden kész, töröljük a progress fájlt
     if os.path.exists(progress_file):
         try:
             os.remove(progress_file)
-            print_safe("\nProgress file removed - translation completed")
+            logging.debug("Progress file removed - translation completed")
         except:
-            print_safe("\nCould not remove progress file")
+            logging.warning("Could not remove progress file %s", progress_file)
 
 def process_xml(file_path: str, model: str, default_lang: str):
-    target_lang = get_target_language(file_path, default_lang)
+    target_lang = in_place_language(file_path, default_lang)
     logging.info(f"Detected language for {file_path}: {target_lang}")
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        texts_to_translate = []
-        elements_to_update = []
-        
-        for elem in root.iter():
-            if elem.text and elem.text.strip():
-                texts_to_translate.append(elem.text)
-                elements_to_update.append(elem)
-        
-        if texts_to_translate:
-            translated_texts = batch_translate_texts(texts_to_translate, default_lang, model)
-            for elem, translated in zip(elements_to_update, translated_texts):
-                elem.text = translated
-        
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
+        extraction = extract_xml(file_path)
+        translate_extraction(extraction, [target_lang], model, {target_lang: file_path})
         logging.info(f"Successfully processed XML: {file_path}")
     except Exception as e:
         logging.error(f"Error processing XML {file_path}: {e}")
         raise
 
 def process_xliff(file_path: str, model: str, default_lang: str):
-    target_lang = get_target_language(file_path, default_lang)
+    target_lang = in_place_language(file_path, default_lang)
     logging.info(f"Detected language for {file_path}: {target_lang}")
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        
-        texts_to_translate = []
-        elements_to_update = []
-        
-        for trans_unit in root.findall('.//{urn:oasis:names:tc:xliff:document:1.2}trans-unit'):
-            source = trans_unit.find('{urn:oasis:names:tc:xliff:document:1.2}source')
-            if source is not None and source.text and source.text.strip():
-                texts_to_translate.append(source.text)
-                target = trans_unit.find('{urn:oasis:names:tc:xliff:document:1.2}target')
-                if target is None:
-                    target = ET.SubElement(trans_unit, '{urn:oasis:names:tc:xliff:document:1.2}target')
-                elements_to_update.append(target)
-        
-        if texts_to_translate:
-            translated_texts = batch_translate_texts(texts_to_translate, default_lang, model)
-            for elem, translated in zip(elements_to_update, translated_texts):
-                elem.text = translated
-        
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
+        extraction = extract_xliff(file_path)
+        translate_extraction(extraction, [target_lang], model, {target_lang: file_path})
         logging.info(f"Successfully processed XLIFF: {file_path}")
     except Exception as e:
         logging.error(f"Error processing XLIFF {file_path}: {e}")
         raise
 
 def process_markdown(file_path: str, model: str, default_lang: str):
-    target_lang = get_target_language(file_path, default_lang)
+    target_lang = in_place_language(file_path, default_lang)
     logging.info(f"Detected language for {file_path}: {target_lang}")
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        translated_content = batch_translate_texts([content], default_lang, model)[0]
-        
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(translated_content)
-        
+        extraction = extract_text(file_path)
+        results = translate_extraction(extraction, [target_lang], model, {target_lang: file_path})
         logging.info(f"Successfully processed Markdown file: {file_path}")
+        return results[target_lang][0] if results else extraction.texts[0]
     except Exception as e:
         logging.error(f"Error processing Markdown file {file_path}: {e}")
         raise
 
 def process_text(file_path: str, model: str, default_lang: str):
-    target_lang = get_target_language(file_path, default_lang)
+    target_lang = in_place_language(file_path, default_lang)
     logging.info(f"Detected language for {file_path}: {target_lang}")
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        translated_content = batch_translate_texts([content], default_lang, model)[0]
-        
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(translated_content)
-        
+        extraction = extract_text(file_path)
+        results = translate_extraction(extraction, [target_lang], model, {target_lang: file_path})
         logging.info(f"Successfully processed text file: {file_path}")
+        return results[target_lang][0] if results else extraction.texts[0]
     except Exception as e:
         logging.error(f"Error processing text file {file_path}: {e}")
         raise
@@ -294,168 +741,61 @@ def process_ini(file_path: str, model: str, default_lang: str):
     INI fájl feldolgozása és fordítása
     """
     try:
-        print_safe(f"\nProcessing INI file: {file_path}")
-        print_safe(f"Target language: {default_lang}\n")
-
-        # Először próbáljuk meg egyszerű kulcs-érték párként olvasni
-        lines = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-        except UnicodeDecodeError:
-            with open(file_path, 'r', encoding='latin1') as f:
-                lines = f.readlines()
-
-        # Ellenőrizzük, hogy van-e szekció
-        has_sections = False
-        for line in lines:
-            if line.strip().startswith('[') and line.strip().endswith(']'):
-                has_sections = True
-                break
-
-        texts_to_translate = []
-        keys_to_update = []
-
-        if has_sections:
-            # Szekciókkal rendelkező INI fájl feldolgozása
-            config = configparser.ConfigParser()
-            try:
-                config.read(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                config.read(file_path, encoding='latin1')
-
-            for section in config.sections():
-                print_safe(f"\nChecking section: {section}")
-                for key in config[section]:
-                    value = config[section][key]
-                    print_safe(f"\nChecking key: {key}")
-
-                    # Ha a szöveg nem üres, ellenőrizzük, hogy francia-e
-                    if value.strip():
-                        try:
-                            # Ha a szöveg egy TextBlock objektum stringje, vegyük ki belőle a szöveget
-                            text_to_check = value
-                            if "[TextBlock" in value:
-                                try:
-                                    text_start = value.find('text=') + 6
-                                    text_end = value.find("', type=") if "', type=" in value else value.find('", type=')
-                                    if text_start > 5 and text_end > text_start:
-                                        text_to_check = value[text_start:text_end].strip('"\'')
-                                except:
-                                    pass
-                            
-                            # Próbáljuk meg feldarabolni a szöveget, ha több nyelv van benne
-                            text_parts = re.split(r'([A-Z][A-Z0-9_]+(?:\s*[:-]\s*|\s+))', text_to_check)
-                            for part in text_parts:
-                                if part.strip():
-                                    try:
-                                        detected_lang = detect(part)
-                                        if detected_lang == 'fr':
-                                            print_safe(f"Found French text: {value}")
-                                            texts_to_translate.append(value)
-                                            keys_to_update.append((section, key))
-                                            break  # Ha találtunk francia részt, az egész értéket lefordítjuk
-                                    except LangDetectException:
-                                        pass
-                        except LangDetectException:
-                            pass
-        else:
-            # Egyszerű kulcs-érték párok feldolgozása
-            for line in lines:
-                line = line.strip()
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    if value.strip():
-                        try:
-                            # Ha a szöveg egy TextBlock objektum stringje, vegyük ki belőle a szöveget
-                            text_to_check = value
-                            if "[TextBlock" in value:
-                                try:
-                                    text_start = value.find('text=') + 6
-                                    text_end = value.find("', type=") if "', type=" in value else value.find('", type=')
-                                    if text_start > 5 and text_end > text_start:
-                                        text_to_check = value[text_start:text_end].strip('"\'')
-                                except:
-                                    pass
-                            
-                            # Próbáljuk meg feldarabolni a szöveget, ha több nyelv van benne
-                            text_parts = re.split(r'([A-Z][A-Z0-9_]+(?:\s*[:-]\s*|\s+))', text_to_check)
-                            for part in text_parts:
-                                if part.strip():
-                                    try:
-                                        detected_lang = detect(part)
-                                        if detected_lang == 'fr':
-                                            print_safe(f"Found French text: {value}")
-                                            texts_to_translate.append(value)
-                                            keys_to_update.append(key.strip())
-                                            break  # Ha találtunk francia részt, az egész értéket lefordítjuk
-                                    except LangDetectException:
-                                        pass
-                        except LangDetectException:
-                            pass
-
-        print_safe(f"\nNumber of texts to translate: {len(texts_to_translate)}")
-
-        if texts_to_translate:
-            print_safe("\nStarting translation...")
-            
-            # Szövegek fordítása
-            translations = batch_translate_texts(texts_to_translate, default_lang, model)
-
-            # Frissítjük az eredeti fájlt a fordításokkal
-            if has_sections:
-                # Szekciókkal rendelkező INI fájl frissítése
-                for (section, key), translated in zip(keys_to_update, translations):
-                    print_safe(f"\nUpdating section: {section}, key: {key}")
-                    print_safe(f"Old value: {config[section][key]}")
-                    print_safe(f"New value: {translated}")
-                    config[section][key] = translated
-
-                # Visszaírjuk a fájlba
-                print_safe("\nWriting back to file...")
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    config.write(file)
-            else:
-                # Egyszerű kulcs-érték párok frissítése
-                updated_lines = []
-                line_idx = 0
-                trans_idx = 0
-                
-                for line in lines:
-                    line = line.strip()
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        if key in keys_to_update:
-                            # Ez egy lefordítandó sor
-                            translated = translations[trans_idx]
-                            updated_lines.append(f"{key}={translated}\n")
-                            trans_idx += 1
-                        else:
-                            # Ez egy változatlan sor
-                            updated_lines.append(line + '\n')
-                    else:
-                        # Üres sor vagy komment
-                        updated_lines.append(line + '\n')
-                        
-                # Visszaírjuk a fájlba
-                print_safe("\nWriting back to file...")
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.writelines(updated_lines)
-                    
-            print_safe("File updated successfully")
+        target_lang = in_place_language(file_path, default_lang)
+        logging.info("Processing INI file: %s (target language: %s)", file_path, target_lang)
+        extraction = extract_ini(file_path)
+        if extraction.texts:
+            translate_extraction(extraction, [target_lang], model, {target_lang: file_path})
+            logging.info("Successfully processed INI: %s", file_path)
+    except Exception as e:
+        logging.error(f"Error processing INI {file_path}: {e}")
+        raise
 
+def process_file_targets(file_path: str, model: str, targets, langs_per_call: int = 1, output_dir: str = None, stream_json: bool = None,
+                         root: str = None):
+    """
+    Egy forrásfájl fordítása több célnyelvre: egyszer olvassuk be és nyerjük ki a szegmenseket,
+    majd nyelvenként külön kimeneti fájlt írunk (pl. strings_fr.json -> strings_hu.json, strings_de.json).
+    :param root: a bemeneti könyvtár, amelyhez képesti alkönyvtár az output_dir alatt megmarad
+    """
+    _, ext = os.path.splitext(file_path)
+    extractor = EXTRACTORS.get(ext.lower())
+    if extractor is None:
+        logging.warning(f"Unsupported file type: {ext}")
+        return
+    logging.info("Processing %s into %s", file_path, ",".join(targets))
+    try:
+        output_paths = {lang: localized_path(file_path, lang, output_dir, root) for lang in targets}
+        for out_path in output_paths.values():
+            os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        if extractor is extract_json:
+            if stream_json is None:
+                stream_json = os.path.getsize(file_path) >= STREAM_JSON_THRESHOLD
+            if stream_json:
+                stream_translate_json(file_path, model, output_paths, langs_per_call=langs_per_call)
+                return
+        extraction = extractor(file_path)
+        translate_extraction(extraction, targets, model, output_paths, langs_per_call)
     except Exception as e:
-        print_safe(f"\nError processing INI {file_path}: {str(e)}")
+        logging.error(f"Error processing {file_path}: {e}")
         raise
 
-def process_file(file_path: str, model: str, default_lang: str):
-    print(f"Processing file: {file_path}")  # Debug print
+def process_file(file_path: str, model: str, default_lang: str, targets=None, langs_per_call: int = 1, output_dir: str = None,
+                 stream_json: bool = None, root: str = None):
+    logging.debug("Processing file: %s", file_path)
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     
+    with profiler.file(file_path):
+        if targets:
+            process_file_targets(file_path, model, targets, langs_per_call, output_dir, stream_json, root)
+        else:
+            _dispatch(file_path, ext, model, default_lang, stream_json)
+    progress.file_done()
+
+def _dispatch(file_path: str, ext: str, model: str, default_lang: str, stream_json: bool = None):
     if ext == '.json':
-        process_json(file_path, None, model, default_lang)  # A None azt jelzi, hogy nincs szükség node-ra
+        process_json(file_path, None, model, default_lang, stream_json)  # A None azt jelzi, hogy nincs szükség node-ra
     elif ext == '.xml':
         process_xml(file_path, model, default_lang)
     elif ext == '.xlf':
@@ -0,0 +1,150 @@
+import os
+import logging
+
+_BOM = b'\xef\xbb\xbf'
+
+
+class IniValue:
+    """Egy kulcs=érték sor: a szekció, a kulcs és az érték bájt-tartománya a fájlban"""
+    __slots__ = ('section', 'key', 'start', 'end', 'line')
+
+    def __init__(self, section, key, start, end, line):
+        self.section = section
+        self.key = key
+        self.start = start
+        self.end = end
+        self.line = line
+
+
+class IniDocument:
+    """
+    Egyszer beolvasott INI fájl. Csak az értékek bájt-tartományait jegyezzük fel,
+    így a visszaírás egyetlen menetben, a kommentek, a sorrend, a kulcsok kis- és nagybetűi,
+    a kódolás és a sorvégek megtartásával történik.
+    """
+
+    def __init__(self, data: bytes, encoding: str, entries, has_sections: bool):
+        self.data = data
+        self.encoding = encoding
+        # A BOM a fájl elején a nyers bájtok része marad, az értékeket BOM nélkül kódoljuk
+        self.codec = 'utf-8' if encoding == 'utf-8-sig' else encoding
+        self.entries = entries
+        self.has_sections = has_sections
+
+    def value(self, entry: IniValue) -> str:
+        return self.data[entry.start:entry.end].decode(self.codec)
+
+    def entry_id(self, entry: IniValue) -> str:
+        return f"{entry.section}.{entry.key}" if entry.section is not None else entry.key
+
+    def render(self, replacements: dict) -> bytes:
+        """
+        :param replacements: bejegyzés index -> új érték
+        :return: az új fájltartalom bájtokban
+        """
+        values = {}
+        for index, text in replacements.items():
+            # Az INI érték egy sor, a sortöréseket \n escape-ként írjuk
+            text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\\n')
+            values[index] = text
+        try:
+            encoded = {index: text.encode(self.codec) for index, text in values.items()}
+        except UnicodeEncodeError:
+            # A fordítás nem fér bele az eredeti (latin-1) kódolásba, a fájlt UTF-8-ban írjuk
+            logging.warning("Translations do not fit %s, writing the file as UTF-8", self.encoding)
+            data = self.data.decode(self.codec).encode('utf-8')
+            return IniDocument(data, 'utf-8', *_tokenize(data)).render(replacements)
+
+        parts = []
+        pos = 0
+        for index in sorted(encoded, key=lambda i: self.entries[i].start):
+            entry = self.entries[index]
+            parts.append(self.data[pos:entry.start])
+            parts.append(encoded[index])
+            pos = entry.end
+        parts.append(self.data[pos:])
+        return b''.join(parts)
+
+    def write(self, out_path: str, replacements: dict):
+        content = self.render(replacements)
+        temp_path = out_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, out_path)
+
+
+def _tokenize(data: bytes):
+    """
+    Egymenetes INI tokenizáló a bájtokon (UTF-8 és latin-1 esetén a szerkezeti karakterek egybájtosak).
+    Szekciós fájlban a '=' és ':' is elválasztó (mint a configparserben), egyszerű fájlban csak a '='.
+    Kommentek (';', '#'), üres sorok és folytatósorok érintetlenek maradnak.
+    """
+    entries = []
+    has_sections = False
+    section = None
+    pos = 0
+    line_no = 0
+    length = len(data)
+    if data.startswith(_BOM):
+        pos = len(_BOM)
+
+    while pos < length:
+        line_no += 1
+        newline = data.find(b'\n', pos)
+        line_end = length if newline < 0 else newline
+        next_pos = length if newline < 0 else newline + 1
+        content_end = line_end
+        if content_end > pos and data[content_end - 1:content_end] == b'\r':
+            content_end -= 1
+
+        start = pos
+        while start < content_end and data[start:start + 1] in (b' ', b'\t'):
+            start += 1
+        first = data[start:start + 1]
+
+        if start == content_end or first in (b';', b'#'):
+            pass
+        elif first == b'[' and data[start:content_end].rstrip().endswith(b']'):
+            section = data[start + 1:data.rindex(b']', start, content_end)].strip().decode('latin-1')
+            has_sections = True
+        elif start == pos or section is None:
+            # A behúzott sor szekción belül a configparser szerint folytatósor, azt nem bontjuk
+            delimiter = data.find(b'=', start, content_end)
+            if has_sections:
+                colon = data.find(b':', start, content_end)
+                if colon >= 0 and (delimiter < 0 or colon < delimiter):
+                    delimiter = colon
+            if delimiter > start:
+                key = data[start:delimiter].strip()
+                value_start = delimiter + 1
+                while value_start < content_end and data[value_start:value_start + 1] in (b' ', b'\t'):
+                    value_start += 1
+                value_end = content_end
+                while value_end > value_start and data[value_end - 1:value_end] in (b' ', b'\t'):
+                    value_end -= 1
+                entries.append(IniValue(section, key.decode('latin-1'), value_start, value_end, line_no))
+        pos = next_pos
+
+    return entries, has_sections
+
+
+def read_ini(file_path: str) -> IniDocument:
+    """Egyszer olvassa be a fájlt; UTF-8 (BOM-mal vagy anélkül), ennek hibájánál latin-1"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if data.startswith(_BOM):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            data.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'latin-1'
+    entries, has_sections = _tokenize(data)
+    if encoding != 'latin-1':
+        # A kulcsokat és szekciókat a tényleges kódolással dekódoljuk
+        for entry in entries:
+            entry.key = entry.key.encode('latin-1').decode('utf-8')
+            if entry.section is not None:
+                entry.section = entry.section.encode('latin-1').decode('utf-8')
+    return IniDocument(data, encoding, entries, has_sections)
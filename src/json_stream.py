@@ -0,0 +1,183 @@
+import re
+import json
+
+# Két string közötti szerkezeti szakasz, majd egy teljes JSON string token (escape-elt idézőjelekkel együtt)
+_TOKEN = re.compile(r'([^"]*)("[^"\\]*(?:\\.[^"\\]*)*")', re.S)
+# A stringek közötti szakaszokban csak ezek a karakterek változtatják a szerkezetet
+_STRUCTURE = re.compile(r'[{}\[\],]')
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def _child_path(frames) -> str:
+    """A következő érték útvonala a process_json kulcsformátumában (a.b[0].c)"""
+    if not frames:
+        return ''
+    is_obj, path, key, index, _ = frames[-1]
+    if is_obj:
+        return f"{path}.{key}" if path else key
+    return f"{path}[{index}]"
+
+
+def _decode(token: str) -> str:
+    # Escape nélküli stringnél megspóroljuk a json.loads hívást
+    if '\\' not in token:
+        return token[1:-1]
+    return json.loads(token)
+
+
+def _walk_structure(run: str, frames):
+    """A két string közötti szakasz szerkezeti karaktereinek feldolgozása (whitespace, számok, literálok átugorva)"""
+    if '{' not in run and '[' not in run and '}' not in run and ']' not in run:
+        # Gyakori eset (': ' vagy ',\n    '): csak vesszők, mind ugyanarra a keretre vonatkoznak
+        commas = run.count(',')
+        if commas and frames:
+            frame = frames[-1]
+            if frame[0]:
+                frame[4] = True
+            else:
+                frame[3] += commas
+        return
+    for match in _STRUCTURE.finditer(run):
+        ch = match.group()
+        if ch == ',':
+            if frames:
+                frame = frames[-1]
+                if frame[0]:
+                    frame[4] = True
+                else:
+                    frame[3] += 1
+        elif ch == '{' or ch == '[':
+            frames.append([ch == '{', _child_path(frames), None, 0, True])
+        else:
+            if not frames:
+                raise ValueError(f"Unexpected {ch!r} in JSON")
+            frames.pop()
+
+
+def iter_json_events(fp, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Eseményalapú JSON olvasó, a fájlt darabokban olvassa, így a memóriahasználat nem függ a mérettől.
+    ('raw', szöveg): minden, ami nem string érték (szerkezet, whitespace, kulcsok, számok), változatlanul
+    ('leaf', útvonal, érték, nyers_token): egy string levél érték
+    A raw darabok és a nyers tokenek összefűzve pontosan visszaadják a bemenetet.
+    """
+    buf = ''
+    pos = 0
+    # Keretek: [objektum-e, útvonal, aktuális kulcs, aktuális index, kulcsot várunk-e]
+    frames = []
+    raw = []
+    raw_size = 0
+    token_match = _TOKEN.match
+
+    while True:
+        match = token_match(buf, pos)
+        if match is None:
+            rest = buf[pos:]
+            chunk = fp.read(chunk_size)
+            quote = rest.find('"')
+            if quote < 0:
+                # Nincs több string a pufferben: a maradék szerkezet, jöhet a következő darab
+                if rest:
+                    _walk_structure(rest, frames)
+                    raw.append(rest)
+                    raw_size += len(rest)
+                if not chunk:
+                    break
+                buf = chunk
+            else:
+                # A string a puffer végén félbe van vágva, olvassunk hozzá
+                if not chunk:
+                    raise ValueError(f"Unterminated JSON string near: {rest[quote:quote + 40]!r}")
+                buf = rest + chunk
+            pos = 0
+            continue
+
+        run, token = match.group(1, 2)
+        pos = match.end()
+        if run:
+            _walk_structure(run, frames)
+            raw.append(run)
+            raw_size += len(run)
+        frame = frames[-1] if frames else None
+        if frame is not None and frame[0] and frame[4]:
+            frame[2] = _decode(token)
+            frame[4] = False
+            raw.append(token)
+            raw_size += len(token)
+            if raw_size >= DEFAULT_CHUNK_SIZE:
+                yield ('raw', ''.join(raw))
+                raw = []
+                raw_size = 0
+        else:
+            if raw:
+                yield ('raw', ''.join(raw))
+                raw = []
+                raw_size = 0
+            yield ('leaf', _child_path(frames), _decode(token), token)
+
+    if frames:
+        raise ValueError("Unexpected end of JSON input")
+    if raw:
+        yield ('raw', ''.join(raw))
+
+
+def iter_json_leaves(fp, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Csak a string levelek: (útvonal, érték)"""
+    for event in iter_json_events(fp, chunk_size):
+        if event[0] == 'leaf':
+            yield event[1], event[2]
+
+
+def stream_rewrite(fp, outputs: dict, select, translate, window: int = 200, max_pending_chars: int = 1 << 22) -> dict:
+    """
+    Egyetlen előre haladó menetben átírja a JSON-t egy vagy több kimenetbe.
+    :param outputs: kimenet kulcs (pl. nyelvkód) -> írható szöveges fájl
+    :param select: select(útvonal, érték) -> a fordítandó szöveg, vagy None, ha a levél változatlan marad
+    :param translate: translate(szövegek) -> {kimenet kulcs: fordítások listája}
+    :param window: ennyi kiválasztott levél után fordítunk és írunk
+    :param max_pending_chars: ennyi pufferelt karakter után akkor is írunk, ha az ablak nem telt meg
+    A kulcsok sorrendje és a formázás változatlan marad, csak a kiválasztott string tokenek cserélődnek.
+    :return: statisztika (leaves, selected)
+    """
+    pending = []
+    texts = []
+    pending_chars = 0
+    stats = {'leaves': 0, 'selected': 0}
+
+    def flush():
+        results = translate(texts) if texts else {}
+        for key, out in outputs.items():
+            translated = results.get(key)
+            parts = []
+            for piece in pending:
+                if isinstance(piece, str):
+                    parts.append(piece)
+                elif translated is not None and translated[piece[0]] is not None:
+                    parts.append(json.dumps(translated[piece[0]], ensure_ascii=False))
+                else:
+                    parts.append(piece[1])
+            out.write(''.join(parts))
+        pending.clear()
+        texts.clear()
+
+    for event in iter_json_events(fp):
+        if event[0] == 'raw':
+            pending.append(event[1])
+            pending_chars += len(event[1])
+        else:
+            _, path, value, token = event
+            stats['leaves'] += 1
+            text = select(path, value)
+            if text is None:
+                pending.append(token)
+            else:
+                pending.append((len(texts), token))
+                texts.append(text)
+                stats['selected'] += 1
+            pending_chars += len(token)
+        if len(texts) >= window or pending_chars >= max_pending_chars:
+            flush()
+            pending_chars = 0
+    flush()
+    return stats
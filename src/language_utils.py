@@ -2,7 +2,6 @@ import os
 import re
 import json
 import xml.etree.ElementTree as ET
-from language_tags import tags
 import logging
 
 def get_target_language(file_path: str, default_lang: str) -> str:
@@ -10,6 +9,7 @@ def get_target_language(file_path: str, default_lang: str) -> str:
     Determine the target language from the file name or metadata.
     Returns the ISO 639-1 language code.
     """
+    from language_tags import tags
     file_name = os.path.basename(file_path)
     
     # Check filename for language code
@@ -25,6 +25,18 @@ def get_target_language(file_path: str, default_lang: str) -> str:
             logging.warning(f"Invalid language code in filename: {lang_code}")
     
     # Check file content for language information
+    return metadata_language(file_path) or default_lang
+
+def in_place_language(file_path: str, default_lang: str) -> str:
+    """
+    A helyben fordítás célnyelve: a fájl metaadata (target-language), különben default_lang.
+    A fájlnév nyelvkódja itt is a forrás nyelvét jelöli, ahogy localized_path-nál (strings_fr.json: francia forrás).
+    """
+    return metadata_language(file_path) or default_lang
+
+def metadata_language(file_path: str):
+    """A fájl tartalmában megadott célnyelv (JSON/XML/XLIFF target-language), ha van"""
+    from language_tags import tags
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
 
@@ -59,5 +71,69 @@ def get_target_language(file_path: str, default_lang: str) -> str:
         except Exception as e:
             logging.warning(f"Error extracting language from XML/XLIFF: {e}")
     
-    # If no language is found, return the default
-    return default_lang
+    return None
+
+def language_suffix(stem: str):
+    """A fájlnév végén lévő nyelvkód (pl. 'strings_fr' -> match a 'fr'-re), ha érvényes"""
+    match = re.search(r'[_-]([a-zA-Z]{2,3})$', stem)
+    if match:
+        from language_tags import tags
+        lang_code = match.group(1).lower()
+        if lang_code == 'fra' or tags.tag(lang_code).valid:
+            return match
+    return None
+
+def detect_language(text: str):
+    """
+    A szöveg nyelvkódja a langdetect szerint, None ha nem állapítható meg.
+    A langdetect csak itt, az első felismeréskor töltődik be (a nyelvprofilokkal együtt).
+    """
+    from langdetect import detect, LangDetectException
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+def plausible_language(text: str, lang: str, min_chars: int = 40, confidence: float = 0.9) -> bool:
+    """
+    False, ha a szöveg elég hosszú a megbízható felismeréshez, és a langdetect nagy valószínűséggel
+    a célnyelvtől eltérő nyelvet ismer fel. Rövid vagy bizonytalan szövegnél True.
+    """
+    letters = re.sub(r'[\W\d_]+', ' ', text).strip()
+    if len(letters) < min_chars or len(letters.split()) < 4:
+        return True
+    from langdetect import DetectorFactory, detect_langs, LangDetectException
+    # Rögzített seed: ugyanarra a szövegre mindig ugyanaz a döntés
+    DetectorFactory.seed = 0
+    try:
+        best = detect_langs(letters)[0]
+    except LangDetectException:
+        return True
+    expected = re.split(r'[-_]', lang.lower())[0]
+    return best.prob < confidence or best.lang.split('-')[0] == expected
+
+def localized_path(file_path: str, lang: str, output_dir: str = None, root: str = None) -> str:
+    """
+    A célnyelvi kimenet útvonala: a fájlnév nyelvkódját lecseréli, vagy ha nincs, hozzáfűzi.
+    strings_fr.json -> strings_hu.json, readme.md -> readme_hu.md
+    :param root: a bemeneti könyvtár; output_dir alatt a hozzá képesti alkönyvtár megmarad
+                 (root/a/strings_fr.json -> output_dir/a/strings_hu.json), így az azonos nevű fájlok nem írják felül egymást
+    """
+    directory, file_name = os.path.split(file_path)
+    stem, ext = os.path.splitext(file_name)
+    match = language_suffix(stem)
+    if match:
+        stem = stem[:match.start(1)]
+    else:
+        stem = stem + '_'
+    if output_dir:
+        relative = os.path.relpath(directory or '.', root) if root else os.curdir
+        # A bemeneti könyvtáron kívüli fájl közvetlenül az output_dir-be kerül
+        directory = output_dir if relative.startswith(os.pardir) else os.path.normpath(os.path.join(output_dir, relative))
+    return os.path.join(directory, f"{stem}{lang}{ext}")
+
+def is_localized_output(file_path: str, targets) -> bool:
+    """Igaz, ha a fájl egy korábbi futás célnyelvi kimenete (a neve a célnyelvek egyikére végződik)"""
+    stem, _ = os.path.splitext(os.path.basename(file_path))
+    match = language_suffix(stem)
+    return bool(match) and match.group(1).lower() in targets
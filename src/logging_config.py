@@ -1,35 +1,208 @@
 import os
-import logging
 import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+# A LogRecord szabványos mezői, ezeken kívül minden extra mező bekerül a JSON sorba
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Egy rekord = egy JSON sor (ts, level, logger, msg és az extra mezők)"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 
 # Set up logging
-def setup_logging(log_dir: str, timestamp: str):
+def setup_logging(log_dir: str, timestamp: str, level: int = logging.INFO, console_level: int = logging.WARNING):
+    """
+    Queue alapú, nem blokkoló naplózás: a hívó szál csak sorba teszi a rekordot,
+    a fájlba (JSON-lines) és a konzolra írást egy háttérszál végzi.
+    A szegmensenkénti részletek DEBUG szinten vannak, alapból kikapcsolva.
+    """
+    global _listener
+
     # Create logs directory if it doesn't exist
     os.makedirs(log_dir, exist_ok=True)
-    
-    log_file = os.path.join(log_dir, f"translation_log_{timestamp}.log")
-    
+
+    log_file = os.path.join(log_dir, f"translation_log_{timestamp}.jsonl")
+
     # Remove any existing handlers
     root_logger = logging.getLogger()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
-    
+    if _listener is not None:
+        _listener.stop()
+
     # File handler for detailed logs
     file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
+    file_handler.setLevel(level)
+    file_handler.setFormatter(JsonLinesFormatter())
 
     # Console handler for relevant info
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    console_formatter = logging.Formatter('%(message)s')
-    console_handler.setFormatter(console_formatter)
+    console_handler = ConsoleHandler(sys.stderr)
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    # A rekordok egy sorba kerülnek, a kiírást a listener háttérszála végzi
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
     # Root logger configuration
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-    
+    root_logger.setLevel(min(level, console_level))
+    root_logger.addHandler(QueueHandler(log_queue))
+
     return log_file
+
+
+def stop_logging():
+    """Kiüríti a sort és leállítja a háttérszálat"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Konzol kezelő, amely a kiírt sor idejére félreteszi a haladásjelzőt, így a kettő nem keveredik"""
+
+    def emit(self, record):
+        with progress.suspended(self.stream):
+            super().emit(record)
+
+
+class ProgressReporter:
+    """
+    Rátakorlátozott, egysoros haladásjelző a konzolra.
+    Terminálon helyben frissül, egyébként ritkán, külön sorokban jelenik meg.
+    """
+
+    def __init__(self, interval: float = 0.5, stream=None):
+        self.interval = interval
+        self.stream = stream
+        self.enabled = False
+        self._lock = threading.Lock()
+        # A konzolra írás zára: a haladásjelző és a naplósorok (ConsoleHandler) nem írnak egymásba
+        self._write_lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.files_total = 0
+        self.files_done = 0
+        self.segments_total = 0
+        self.segments_done = 0
+        self.started = time.monotonic()
+        self._last_emit = 0.0
+        self._last_width = 0
+
+    def start(self, files_total: int = 0):
+        self.reset()
+        self.enabled = True
+        self.files_total = files_total
+
+    def add_files(self, count: int):
+        with self._lock:
+            self.files_total += count
+        self._maybe_emit()
+
+    def add_segments(self, count: int):
+        with self._lock:
+            self.segments_total += count
+        self._maybe_emit()
+
+    def advance(self, count: int = 1):
+        with self._lock:
+            self.segments_done += count
+        self._maybe_emit()
+
+    def file_done(self):
+        with self._lock:
+            self.files_done += 1
+        self._maybe_emit()
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rate = self.segments_done / elapsed
+        files = f"files {self.files_done}/{self.files_total}" if self.files_total else f"files {self.files_done}"
+        return f"{files} | segments {self.segments_done}/{self.segments_total} | {rate:.1f}/s | {elapsed:.0f}s"
+
+    def _maybe_emit(self, force: bool = False):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        stream = self.stream or sys.stderr
+        tty = hasattr(stream, 'isatty') and stream.isatty()
+        # Terminál nélkül (pl. CI log) sokkal ritkábban írunk
+        interval = self.interval if tty else max(self.interval, 10.0)
+        if not force and now - self._last_emit < interval:
+            return
+        self._last_emit = now
+        text = self.line()
+        with self._write_lock:
+            if tty:
+                padding = ' ' * max(0, self._last_width - len(text))
+                stream.write('\r' + text + padding)
+                stream.flush()
+                self._last_width = len(text)
+            else:
+                stream.write(text + '\n')
+                stream.flush()
+
+    @contextmanager
+    def suspended(self, stream=None):
+        """
+        Egy konzolra írt naplósor idejére letörli a terminálon helyben frissülő sort, majd alatta újrarajzolja.
+        :param stream: a naplósor célja; ha nem a haladásjelzőé, csak az írások sorrendjét fogjuk össze
+        """
+        with self._write_lock:
+            own = self.stream or sys.stderr
+            drawn = (self.enabled and self._last_width > 0 and (stream is None or stream is own)
+                     and hasattr(own, 'isatty') and own.isatty())
+            if drawn:
+                own.write('\r' + ' ' * self._last_width + '\r')
+                own.flush()
+            try:
+                yield
+            finally:
+                if drawn:
+                    text = self.line()
+                    own.write(text)
+                    own.flush()
+                    self._last_width = len(text)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self._maybe_emit(force=True)
+        stream = self.stream or sys.stderr
+        if hasattr(stream, 'isatty') and stream.isatty():
+            with self._write_lock:
+                stream.write('\n')
+                stream.flush()
+        self.enabled = False
+
+
+# Globális haladásjelző, a main indítja el
+progress = ProgressReporter()
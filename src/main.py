@@ -4,7 +4,19 @@ import argparse
 import logging
 from datetime import datetime
 from src.file_processors import process_file
-from src.logging_config import setup_logging
+from src.pipeline import Pipeline
+from src.language_utils import is_localized_output
+from src.logging_config import setup_logging, progress
+from src.profiling import profiler
+from src.metrics import metrics
+from src.resilience import caller
+from src.routing import router
+from src.prefilter import prefilter
+from src.translation_memory import memory
+from src import server_client
+
+# A szervernek továbbított kapcsolók (a többi a szerver saját beállításait módosítaná)
+SERVER_FORWARDED = {'path', 'model', 'default_lang', 'targets', 'langs_per_call', 'output_dir', 'stream_json', 'port'}
 
 def main():
     # Állítsuk be a konzol kódolását UTF-8-ra
@@ -13,33 +25,187 @@ def main():
     
     parser = argparse.ArgumentParser(
         description="Translate files using Anthropic's Claude AI model.",
-        epilog="Example: python main.py --path /path/to/files --model claude-3-haiku-20240307 --default-lang en"
+        epilog="Example: python main.py --path /path/to/files --model claude-3-haiku-20240307 --default-lang hu"
     )
     parser.add_argument("--path", default=os.getcwd(), help="Path to directory containing files to translate (default: current directory)")
     parser.add_argument("--model", default="claude-3-haiku-20240307", help="Anthropic model to use for translation (default: claude-3-haiku-20240307)")
-    parser.add_argument("--default-lang", default="en", help="Default target language if not specified in filename (default: en)")
+    parser.add_argument("--default-lang", default="hu", help="Target language of in-place translation if the file does not specify one in its target-language metadata (default: hu)")
+    parser.add_argument("--profile", action="store_true", help="Time each pipeline stage (scan, parse, detect, mask, translate, apply, write) and print a ranked report")
+    parser.add_argument("--profile-cprofile", action="store_true", help="With --profile: capture a cProfile dump per file")
+    parser.add_argument("--profile-memory", action="store_true", help="With --profile: capture tracemalloc peak and top allocations per file")
+    parser.add_argument("--targets", help="Comma-separated target languages (e.g. hu,de,es); each source file is parsed once and one output file is written per language")
+    parser.add_argument("--langs-per-call", type=int, default=1, help="With --targets: request up to this many languages in a single API call (default: 1)")
+    parser.add_argument("--output-dir", help="With --targets: directory for the per-language output files (default: next to the source file)")
+    parser.add_argument("--stream-json", action="store_true", default=None, help="Always use the streaming JSON reader/writer (default: only for files over 50 MB)")
+    parser.add_argument("--log-dir", default="logs", help="Directory for the JSON-lines run log (default: logs)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Log file level; DEBUG adds per-segment detail (default: INFO)")
+    parser.add_argument("--verbose", action="store_true", help="Echo log messages to the console instead of showing only the progress line")
+    parser.add_argument("--profile-dir", default=os.path.join("logs", "profile"), help="Directory for the profile report and cProfile dumps (default: logs/profile)")
+    parser.add_argument("--request-timeout", type=float, default=60.0, help="Deadline in seconds for a single API request, including its hedged duplicate (default: 60)")
+    parser.add_argument("--no-hedge", action="store_true", help="Do not send a duplicate request when a request is slower than the model's p95 latency")
+    parser.add_argument("--fallback-model", help="Model to switch to while the circuit breaker of --model is open (default: wait and retry)")
+    parser.add_argument("--routing", help="JSON file with model tiers and key patterns; segments are sent to the cheapest tier they fit (default: everything to --model)")
+    parser.add_argument("--prefilter", help="JSON file with extra or disabled pre-filter rules for segments that are passed through untranslated")
+    parser.add_argument("--no-prefilter", action="store_true", help="Send every extracted segment to translation, even numbers, URLs and identifiers")
+    parser.add_argument("--workers", type=int, default=4, help="Number of files translated concurrently in the staged pipeline (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Files buffered between pipeline stages before upstream stages wait (default: 8)")
+    parser.add_argument("--no-schedule", action="store_true", help="Process files in directory-walk order instead of longest-first with small files up front")
+    parser.add_argument("--sequential", action="store_true", help="Process files one at a time with the per-format processors (resumable JSON progress files)")
+    parser.add_argument("--tm", help="Translation memory file (JSON lines); segments already in it are not sent to the API, validated translations are added")
+    parser.add_argument("--serve", action="store_true", help="Run as a resident local HTTP server that keeps the client, detector, tokenizer and translation memory warm")
+    parser.add_argument("--port", type=int, help=f"Port of the local translation server (default: $TRANSLATOR_PORT or {server_client.DEFAULT_PORT})")
+    parser.add_argument("--no-server", action="store_true", help="Translate in this process even if a translation server is running")
+    parser.add_argument("--watch", action="store_true", help="Keep running and translate only added or modified segments whenever files under --path change")
+    parser.add_argument("--debounce", type=float, default=1.0, help="With --watch: seconds of quiet before a batch of changes is processed (default: 1)")
+    parser.add_argument("--poll-interval", type=float, help="With --watch: poll the tree every N seconds instead of using inotify")
+    parser.add_argument("--watch-state", help="With --watch: file that keeps the last seen segment hashes (default: <log-dir>/watch_state.json)")
+    parser.add_argument("--queue", help="SQLite work queue for sharded runs across processes or hosts sharing a filesystem")
+    parser.add_argument("--queue-mode", choices=["enqueue", "work", "merge", "requeue", "status"], default="status",
+                        help="With --queue: enqueue the files under --path, work on shards (--workers threads), merge finished files, "
+                             "put failed shards back in the queue, or show status (default: status)")
+    parser.add_argument("--shard-size", type=int, default=50, help="With --queue enqueue: segments per shard (default: 50)")
+    parser.add_argument("--lease", type=float, default=120.0, help="With --queue work: seconds a claimed shard stays reserved without a heartbeat (default: 120)")
+    parser.add_argument("--metrics", action="store_true", help="Print request latency percentiles, hedging and circuit breaker counters at the end")
     args = parser.parse_args()
+    targets = [lang.strip() for lang in args.targets.split(',') if lang.strip()] if args.targets else None
+
+    # Ha fut a szerver, a kérést továbbítjuk neki, és nem fizetjük meg újra a hideg indítást.
+    # A szerver a saját indításkori beállításaival fordít, így ha bármely nem továbbított kapcsoló
+    # (memória, routing, előszűrő, időkorlát, naplózás, ...) eltér az alapértéktől, helyben futunk.
+    local_only = [name for name, value in vars(args).items()
+                  if name not in SERVER_FORWARDED and value != parser.get_default(name)]
+    server_error = None
+    if not local_only and os.path.exists(args.path) and server_client.is_running(args.port):
+        try:
+            stats = server_client.translate_file(args.path, args.port, model=args.model, default_lang=args.default_lang,
+                                                 targets=targets, langs_per_call=args.langs_per_call,
+                                                 output_dir=args.output_dir, stream_json=args.stream_json)
+        except (RuntimeError, OSError) as e:
+            # Elutasított kérés (token, hibás paraméter) vagy megszakadt kapcsolat: helyben fordítunk
+            # (a hibát a naplózás beállítása után írjuk ki, így a naplófájlba is bekerül)
+            server_error = e
+        else:
+            print(f"Translated by server: {stats['files']} files, {stats['written']} written, {stats['failed']} failed")
+            return
+
+    level = getattr(logging, args.log_level)
+    log_file = setup_logging(args.log_dir, datetime.now().strftime("%Y%m%d_%H%M%S"), level,
+                             console_level=level if args.verbose else logging.WARNING)
+    if server_error is not None:
+        logging.error("Translation server on port %s failed: %s; translating in this process instead",
+                      server_client.server_port(args.port), server_error)
+
+    if args.profile or args.profile_cprofile or args.profile_memory:
+        profiler.configure(enabled=True, cprofile=args.profile_cprofile, memory=args.profile_memory, output_dir=args.profile_dir)
+
+    caller.configure(deadline=args.request_timeout, hedge=not args.no_hedge, fallback_model=args.fallback_model,
+                     concurrency=args.workers)
 
-    print(f"Starting translation process for files in {args.path}")
+    if args.tm:
+        memory.configure(args.tm)
+
+    if args.routing:
+        router.load(args.routing)
+        logging.info("Model routing: %s", ", ".join(f"{tier.name}={tier.model}" for tier in router.tiers))
+    if args.prefilter:
+        prefilter.load(args.prefilter)
+    prefilter.enabled = not args.no_prefilter
+
+    if args.serve:
+        from src.server import serve
+        serve(server_client.server_port(args.port), args.model, args.default_lang)
+        return
+
+    if args.queue:
+        run_queue(args, targets)
+        memory.close()
+        return
+
+    if args.watch:
+        from src.watch import IncrementalTranslator, watch
+        if not os.path.isdir(args.path):
+            logging.error("--watch needs a directory: %s", args.path)
+            return
+        # A változatlan szegmensek fordítása a memóriából jön, ezért figyelésnél mindig van memória
+        if not memory.enabled:
+            memory.configure(os.path.join(args.log_dir, "translation_memory.jsonl"))
+        translator = IncrementalTranslator(args.model, args.default_lang, targets, args.langs_per_call, args.output_dir,
+                                           args.watch_state or os.path.join(args.log_dir, "watch_state.json"), args.path)
+        watch(args.path, translator, args.debounce, args.poll_interval)
+        memory.close()
+        return
+
+    logging.info("Starting translation process for files in %s (log: %s)", args.path, log_file)
 
     # Ellenőrizzük, hogy a megadott útvonal létezik-e
     if not os.path.exists(args.path):
-        print(f"Error: Path does not exist: {args.path}")
+        logging.error(f"Path does not exist: {args.path}")
         return
 
     # Ha a megadott útvonal egy fájl
     if os.path.isfile(args.path):
-        print(f"\nProcessing single file: {args.path}")
-        process_file(args.path, args.model, args.default_lang)
+        progress.start(1)
+        process_file(args.path, args.model, args.default_lang, targets, args.langs_per_call, args.output_dir, args.stream_json)
+    elif not (args.sequential or args.profile_cprofile or args.profile_memory):
+        # Könyvtár: szakaszokra bontott pipeline, a kinyerés, a fordítás és az írás átfedésben fut
+        progress.start(0)
+        stats = Pipeline(args.model, args.default_lang, targets, args.langs_per_call, args.output_dir, args.stream_json,
+                         translate_workers=args.workers, queue_size=args.queue_size,
+                         schedule=not args.no_schedule).run(args.path)
+        logging.info("Pipeline finished: %d files, %d written, %d failed", stats['files'], stats['written'], stats['failed'])
     else:
-        # Ha a megadott útvonal egy könyvtár
-        for root, _, files in os.walk(args.path):
-            for filename in files:
-                file_path = os.path.join(root, filename)
-                print(f"\nProcessing file: {file_path}")
-                process_file(file_path, args.model, args.default_lang)
-
-    print("\nTranslation process completed")
+        # Ha a megadott útvonal egy könyvtár (fájlonkénti cProfile/tracemalloc csak soros feldolgozással mérhető)
+        with profiler.stage('scan'):
+            file_paths = [os.path.join(root, filename)
+                          for root, _, files in os.walk(args.path)
+                          for filename in files]
+            # Korábbi futások célnyelvi kimeneteit nem fordítjuk újra forrásként
+            if targets:
+                file_paths = [path for path in file_paths if not is_localized_output(path, targets)]
+        progress.start(len(file_paths))
+        for file_path in file_paths:
+            process_file(file_path, args.model, args.default_lang, targets, args.langs_per_call, args.output_dir, args.stream_json,
+                         args.path)
+
+    progress.finish()
+    logging.info("Translation process completed")
+    if memory.enabled:
+        logging.info("Translation memory: %(entries)d entries, %(hits)d hits, %(misses)d misses", memory.stats())
+        memory.close()
+    if prefilter.counts:
+        logging.info("Pre-filter avoided %d requests", sum(prefilter.counts.values()))
+    metrics.log()
+
+    if args.metrics:
+        print(metrics.report())
+        if router.enabled:
+            print(router.report())
+        if prefilter.enabled:
+            print(prefilter.report())
+
+    if profiler.enabled:
+        print(profiler.write_report())
+
+def run_queue(args, targets):
+    """A --queue műveletei; a work módban --workers szál dolgozik, több folyamat/gép egyszerre is futhat"""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.work_queue import WorkQueue, enqueue_tree, run_worker
+    queue = WorkQueue(args.queue)
+    if args.queue_mode == "enqueue":
+        stats = enqueue_tree(queue, args.path, args.default_lang, targets, args.output_dir, args.shard_size)
+        print(f"Queued {stats['files']} files in {stats['shards']} shards")
+    elif args.queue_mode == "work":
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(run_worker, args.queue, args.model, args.langs_per_call, args.lease)
+                       for _ in range(args.workers)]
+            done = sum(future.result() for future in futures)
+        print(f"Completed {done} shards")
+    elif args.queue_mode == "merge":
+        stats = queue.merge()
+        print(f"Merged {stats['merged']} files, {stats['stale']} stale")
+    elif args.queue_mode == "requeue":
+        print(f"Requeued {queue.requeue()} failed shards")
+    print(f"Queue status: {queue.status()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+import math
+import logging
+import threading
+from collections import Counter, deque
+
+
+class Metrics:
+    """
+    Szálbiztos futásidejű metrikák: számlálók és gördülő ablakú mintasorok (pl. késleltetések).
+    A percentilisek az utolsó `window` mintából számolódnak, így a hedge késleltetés
+    a futás közben változó API sebességhez igazodik.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = Counter()
+            self.samples = {}
+
+    def incr(self, name: str, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(value)
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            return len(self.samples.get(name, ()))
+
+    def percentile(self, name: str, q: float):
+        """A minták q-adik percentilise (0-100), None ha még nincs minta"""
+        with self._lock:
+            values = sorted(self.samples.get(name, ()))
+        if not values:
+            return None
+        rank = max(0, math.ceil(q / 100 * len(values)) - 1)
+        return values[rank]
+
+    def report(self) -> str:
+        """Szöveges összesítő: késleltetés percentilisek és számlálók"""
+        with self._lock:
+            names = sorted(self.samples)
+            counters = dict(sorted(self.counters.items()))
+        lines = ["", "Request metrics", "==============="]
+        if names:
+            lines.append(f"{'series':<32}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+            for name in names:
+                p50, p95, p99, top = (self.percentile(name, q) for q in (50, 95, 99, 100))
+                lines.append(f"{name:<32}{self.count(name):>8}{p50:>9.3f}{p95:>9.3f}{p99:>9.3f}{top:>9.3f}")
+        for name, value in counters.items():
+            lines.append(f"{name:<32}{value:>8.4g}" if isinstance(value, float) else f"{name:<32}{value:>8}")
+        return "\n".join(lines)
+
+    def log(self):
+        """A percentiliseket és számlálókat egy JSON-lines rekordként naplózza"""
+        summary = {name: value for name, value in self.counters.items()}
+        for name in list(self.samples):
+            for q in (50, 95, 99):
+                summary[f"{name}.p{q}"] = self.percentile(name, q)
+        logging.info("Request metrics", extra={'metrics': summary})
+
+
+metrics = Metrics()
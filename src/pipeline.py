@@ -0,0 +1,257 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .file_processors import (EXTRACTORS, STREAM_JSON_THRESHOLD, process_json, stream_translate_json,
+                              translate_gated, write_extraction)
+from .language_utils import in_place_language, localized_path, is_localized_output
+from .logging_config import progress
+from .profiling import profiler
+from .scheduler import CHUNK_TOKENS, MakespanPlan, estimate_file_tokens, split_balanced, split_paragraphs
+from .translation import count_tokens
+
+# A szakasz végét jelző elem a sorban
+_DONE = object()
+# Egyetlen szegmensként kinyert fájlok, amelyek bekezdésenként darabolhatók
+TEXT_EXTENSIONS = ('.txt', '.md', '.markdown')
+
+
+class FileJob:
+    """Egy fájl útja a pipeline-on: a kimeneti útvonalak, a kinyert szegmensek és a fordítások"""
+    __slots__ = ('file_path', 'output_paths', 'extraction', 'results', 'standalone')
+
+    def __init__(self, file_path: str, output_paths: dict):
+        self.file_path = file_path
+        self.output_paths = output_paths
+        self.extraction = None
+        self.results = {}
+        self.standalone = False
+
+
+class Pipeline:
+    """
+    Szakaszokra bontott feldolgozás korlátos sorokkal:
+    scan -> parse (kinyerés és nyelvfelismerés) -> translate -> apply/write.
+    Minden szakasznak saját szála(i) vannak, így a következő fájl kinyerése és az előző kiírása
+    a hálózati várakozással párhuzamosan fut. A sorok mérete korlátos: ha a fordítás lassabb,
+    a scan és a parse megáll (backpressure), a memóriában csak néhány fájl várakozik.
+    Ütemezéssel (alapértelmezés) a scan előbb összegyűjti a fájlokat, és becsült méret szerint
+    rendezi őket (néhány kicsi elöl, utána a legnagyobbtól lefelé); az egymagában a workerenkénti
+    ideális terhelésnél nagyobb fájl szegmenseit kiegyensúlyozott részekben, párhuzamosan fordítjuk
+    (a szöveges és Markdown fájlokat előbb bekezdéshatárokon daraboljuk).
+    Egyszerre legfeljebb translate_workers fordítási egység (fájl vagy rész) fut: a szétosztott fájl
+    részei ugyanazokon a helyeken osztoznak, mint a többi fájl.
+    """
+
+    def __init__(self, model: str, default_lang: str = 'hu', targets=None, langs_per_call: int = 1,
+                 output_dir: str = None, stream_json: bool = None, parse_workers: int = 2,
+                 translate_workers: int = 4, queue_size: int = 8, schedule: bool = True):
+        self.model = model
+        self.default_lang = default_lang
+        self.targets = targets
+        self.langs_per_call = langs_per_call
+        self.output_dir = output_dir
+        self.stream_json = stream_json
+        self.parse_workers = parse_workers
+        self.translate_workers = translate_workers
+        self.queue_size = queue_size
+        self.schedule = schedule
+        self.plan = None
+        self.makespan = None
+        self._lock = threading.Lock()
+        self._busy = 0.0
+        self._chunk_pool = None
+        self._root = None
+        self._slots = threading.BoundedSemaphore(max(1, translate_workers))
+        self.stats = {'files': 0, 'written': 0, 'failed': 0}
+
+    def run(self, path: str) -> dict:
+        """Feldolgozza a fájlt vagy a könyvtár összes fájlját; :return: statisztika (files, written, failed)"""
+        self._root = path if os.path.isdir(path) else os.path.dirname(path)
+        to_parse = queue.Queue(self.queue_size)
+        to_translate = queue.Queue(self.queue_size)
+        to_write = queue.Queue(self.queue_size)
+
+        stages = [
+            ([threading.Thread(target=self._scan, args=(path, to_parse), name='scan')], to_parse),
+            (self._workers('parse', self._parse, to_parse, to_translate, self.parse_workers), to_translate),
+            (self._workers('translate', self._translate, to_translate, to_write, self.translate_workers), to_write),
+            (self._workers('write', self._write, to_write, None, 1), None),
+        ]
+        started = time.perf_counter()
+        self._chunk_pool = ThreadPoolExecutor(self.translate_workers, thread_name_prefix='translate-part')
+        try:
+            for threads, _ in stages:
+                for thread in threads:
+                    thread.start()
+            # A szakaszokat sorrendben zárjuk le: ha egy szakasz összes szála végzett, jelezzük a következőnek
+            for threads, outbox in stages:
+                for thread in threads:
+                    thread.join()
+                if outbox is not None:
+                    outbox.put(_DONE)
+        finally:
+            self._chunk_pool.shutdown()
+        if self.plan is not None and self._busy:
+            self.makespan = self.plan.report(time.perf_counter() - started, self._busy)
+        return self.stats
+
+    def _workers(self, name, handler, inbox, outbox, count):
+        return [threading.Thread(target=self._work, args=(handler, inbox, outbox), name=f"{name}-{i}")
+                for i in range(count)]
+
+    def _work(self, handler, inbox, outbox):
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                # A testvér szálaknak is jelezzük a szakasz végét
+                inbox.put(_DONE)
+                return
+            try:
+                job = handler(job)
+            except Exception as e:
+                logging.error("Error processing %s: %s", getattr(job, 'file_path', job), e)
+                self._count('failed')
+                progress.file_done()
+                continue
+            if job is not None and outbox is not None:
+                outbox.put(job)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _scan(self, path: str, outbox):
+        if os.path.isfile(path):
+            paths = iter([path])
+        else:
+            paths = (os.path.join(root, filename) for root, _, files in os.walk(path) for filename in files)
+        if self.schedule:
+            with profiler.stage('scan'):
+                wanted = [file_path for file_path in paths if self._wanted(file_path)]
+                self.plan = MakespanPlan({file_path: estimate_file_tokens(file_path) for file_path in wanted},
+                                         self.translate_workers)
+            self.plan.log_plan()
+            paths = iter(self.plan.order)
+        while True:
+            with profiler.stage('scan'):
+                file_path = next(paths, None)
+                while file_path is not None and not self._wanted(file_path):
+                    file_path = next(paths, None)
+            if file_path is None:
+                return
+            self._count('files')
+            progress.add_files(1)
+            outbox.put(file_path)
+
+    def _wanted(self, file_path: str) -> bool:
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in EXTRACTORS:
+            logging.warning("Unsupported file type: %s", ext)
+            return False
+        # Korábbi futások célnyelvi kimeneteit nem fordítjuk újra forrásként
+        return not (self.targets and is_localized_output(file_path, self.targets))
+
+    def _parse(self, file_path: str) -> FileJob:
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.json' and not self.targets:
+            # A helyben fordított JSON a process_json-on fut le egészben: időnként ment, és a .progress fájlból
+            # folytatható, ahogy soros feldolgozásnál (a célnyelvet is az határozza meg)
+            job = FileJob(file_path, {})
+            job.standalone = True
+            return job
+        if self.targets:
+            output_paths = {lang: localized_path(file_path, lang, self.output_dir, self._root) for lang in self.targets}
+            for out_path in output_paths.values():
+                os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        else:
+            output_paths = {in_place_language(file_path, self.default_lang): file_path}
+        job = FileJob(file_path, output_paths)
+        if ext == '.json':
+            stream = self.stream_json
+            if stream is None:
+                stream = os.path.getsize(file_path) >= STREAM_JSON_THRESHOLD
+            if stream:
+                # A streamelő fordítás maga olvas és ír, a translate szakaszban fut le egészben
+                job.standalone = True
+                return job
+        job.extraction = EXTRACTORS[ext](file_path)
+        logging.info("Number of texts to translate in %s: %d", file_path, len(job.extraction.texts))
+        return job
+
+    def _translate(self, job: FileJob) -> FileJob:
+        target_langs = list(job.output_paths)
+        if job.standalone:
+            with self._slots:
+                if self.targets:
+                    stream_translate_json(job.file_path, self.model, job.output_paths, langs_per_call=self.langs_per_call)
+                else:
+                    process_json(job.file_path, None, self.model, self.default_lang, self.stream_json)
+            return job
+        extraction = job.extraction
+        progress.add_segments(len(extraction.texts) * len(target_langs))
+        if extraction.texts:
+            with profiler.stage('translate'):
+                weights = [count_tokens(text) for text in extraction.texts] if self.plan is not None else None
+                dominates = weights is not None and self.plan.dominates(sum(weights))
+                chunks = None
+                if dominates and len(weights) == 1 and os.path.splitext(job.file_path)[1].lower() in TEXT_EXTENSIONS:
+                    chunks = split_paragraphs(extraction.texts[0], CHUNK_TOKENS, count_tokens)
+                if chunks and len(chunks) > 1:
+                    job.results = self._translate_chunks(extraction, target_langs, chunks)
+                elif dominates and len(weights) > 1:
+                    job.results = self._translate_split(extraction.texts, extraction.keys, target_langs, weights,
+                                                        extraction.file_path)
+                else:
+                    with self._slots:
+                        started = time.perf_counter()
+                        job.results = translate_gated(extraction.texts, target_langs, self.model,
+                                                      self.langs_per_call, extraction.file_path, extraction.keys)
+                        self._add_busy(time.perf_counter() - started)
+        return job
+
+    def _add_busy(self, seconds: float):
+        with self._lock:
+            self._busy += seconds
+
+    def _translate_chunks(self, extraction, target_langs, chunks) -> dict:
+        """Egyetlen szegmensű szöveges fájl fordítása bekezdéscsoportonként, az elválasztók megtartásával"""
+        texts = [chunk for chunk, _ in chunks]
+        keys = [f"{extraction.keys[0]}[{i}]" for i in range(len(texts))]
+        logging.info("Chunked %s into %d parts at paragraph breaks", extraction.file_path, len(texts))
+        progress.add_segments((len(texts) - 1) * len(target_langs))
+        parts = self._translate_split(texts, keys, target_langs, [count_tokens(text) for text in texts],
+                                      extraction.file_path)
+        return {lang: [''.join(translated + separator for translated, (_, separator) in zip(parts[lang], chunks))]
+                for lang in target_langs}
+
+    def _translate_split(self, texts, keys, target_langs, weights, file_path: str) -> dict:
+        """Egy nagy fájl szegmenseinek fordítása tokenre kiegyensúlyozott részekben, párhuzamosan"""
+        parts = split_balanced(weights, self.translate_workers)
+        logging.info("Splitting %s (~%d tokens) into %d parallel parts", file_path, sum(weights), len(parts))
+
+        def translate_part(indexes):
+            with self._slots:
+                started = time.perf_counter()
+                try:
+                    return translate_gated([texts[i] for i in indexes], target_langs, self.model,
+                                           self.langs_per_call, file_path, [keys[i] for i in indexes] if keys else None)
+                finally:
+                    self._add_busy(time.perf_counter() - started)
+
+        results = {lang: [None] * len(texts) for lang in target_langs}
+        for indexes, part in zip(parts, self._chunk_pool.map(translate_part, parts)):
+            for lang in target_langs:
+                for i, translated in zip(indexes, part[lang]):
+                    results[lang][i] = translated
+        return results
+
+    def _write(self, job: FileJob) -> FileJob:
+        if not job.standalone:
+            write_extraction(job.extraction, job.results, list(job.output_paths), job.output_paths)
+        logging.info("Processed %s", job.file_path)
+        self._count('written')
+        progress.file_done()
+        return job
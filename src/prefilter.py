@@ -0,0 +1,101 @@
+import re
+import json
+from collections import Counter
+from .metrics import metrics
+from .validation import PLACEHOLDER_PATTERN
+
+# Alapértelmezett szabályok: név -> a teljes (két szélén levágott) szegmensre illeszkedő minta.
+# Ami illeszkedik, az fordítás nélkül, változatlanul marad.
+DEFAULT_RULES = {
+    'number': r'[-+]?(?:\d+(?:[.,\s]\d+)*|\.\d+)\s*%?',
+    'url': r'(?:https?|ftp)://\S+|www\.\S+',
+    'email': r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+',
+    # Kiterjesztéssel végződő vagy gyökérből/meghajtóról induló útvonal (az "Oui/Non" így nem útvonal)
+    'path': r'(?:[A-Za-z]:|\.{0,2})?[\\/]?(?:[\w.-]+[\\/])+[\w-]+\.\w{1,4}|(?:[A-Za-z]:|\.{0,2})[\\/](?:[\w.-]+[\\/]?)+'
+            r'|[\w-]+\.(?:png|jpe?g|gif|svg|webp|ogg|wav|mp3|json|xml|ini|txt|md|lua|dds)',
+    'color': r'#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})|rgba?\(\s*[\d.,\s%]+\)',
+    'identifier': r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+                  r'|[a-z][a-z0-9]*(?:[._][a-z0-9]+)+|[a-z]+(?:[A-Z][a-z0-9]+)+|0x[0-9a-fA-F]+',
+    'constant': r'[A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+',
+    # Csak írásjelek és szimbólumok: az egybetűs szó ("à", "y", "A") is lehet fordítandó
+    'symbol': r'(?:[^\w\s]|_){1,3}',
+    'placeholder': r'(?:%s|[\s\W\d])*' % PLACEHOLDER_PATTERN.pattern,
+}
+
+
+class PreFilter:
+    """
+    Szabály alapú előszűrő: a nem fordítandó szegmenseket (számok, URL-ek, útvonalak, színkódok,
+    azonosítók, konstansok, magányos szimbólumok, csak helyőrzőt tartalmazó értékek) API hívás nélkül,
+    változatlanul engedi át. Szabályonként számolja, hány kérést takarított meg.
+    """
+
+    def __init__(self, rules=None):
+        self.enabled = True
+        self.rules = []
+        self.counts = Counter()
+        self.configure(rules)
+
+    def configure(self, rules=None, disabled=(), enabled: bool = True):
+        """
+        :param rules: név -> regex; None esetén az alapértelmezett szabályok
+        :param disabled: kikapcsolt szabályok nevei
+        """
+        rules = DEFAULT_RULES if rules is None else rules
+        unknown = set(disabled) - set(rules)
+        if unknown:
+            raise ValueError(f"Unknown pre-filter rules: {', '.join(sorted(unknown))}")
+        self.enabled = enabled
+        self.rules = [(name, re.compile(pattern)) for name, pattern in rules.items() if name not in disabled]
+        self.counts = Counter()
+
+    def load(self, config_path: str):
+        """
+        JSON konfiguráció betöltése; a saját szabályok az alapértelmezettek után jönnek:
+        {"disable": ["constant"], "rules": [{"name": "sku", "pattern": "SKU-\\\\d+"}]}
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        rules = dict(DEFAULT_RULES)
+        for rule in config.get('rules', []):
+            rules[rule['name']] = rule['pattern']
+        self.configure(rules, config.get('disable', ()))
+
+    def classify(self, text: str):
+        """Az első illeszkedő szabály neve, None ha a szegmenst fordítani kell"""
+        stripped = text.strip()
+        if not stripped:
+            return None
+        for name, pattern in self.rules:
+            if pattern.fullmatch(stripped):
+                return name
+        return None
+
+    def split(self, texts, langs: int = 1) -> list:
+        """
+        :return: a fordítandó szegmensek indexei; az átengedetteket szabályonként
+                 (szegmensek x célnyelvek megtakarított kérésként) számoljuk
+        """
+        if not self.enabled:
+            return list(range(len(texts)))
+        keep = []
+        for index, text in enumerate(texts):
+            rule = self.classify(text)
+            if rule is None:
+                keep.append(index)
+            else:
+                self.counts[rule] += langs
+                metrics.incr(f"prefilter.{rule}", langs)
+        return keep
+
+    def report(self) -> str:
+        """Szabályonként a megtakarított kérések száma"""
+        lines = ["", "Pre-filter", "=========="]
+        lines.append(f"{'rule':<14}{'requests avoided':>18}")
+        for name, _ in self.rules:
+            lines.append(f"{name:<14}{self.counts[name]:>18}")
+        lines.append(f"{'total':<14}{sum(self.counts.values()):>18}")
+        return "\n".join(lines)
+
+
+prefilter = PreFilter()
@@ -0,0 +1,221 @@
+import os
+import io
+import time
+import threading
+import tracemalloc
+
+# A feldolgozási lánc szakaszai, a riportban ebben a sorrendben jelennek meg azonos idő esetén
+STAGES = ('scan', 'parse', 'detect', 'mask', 'translate', 'validate', 'apply', 'write')
+
+
+class _NullStage:
+    """Kikapcsolt profilozásnál használt üres context manager"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    """Egy szakasz egyszeri futását méri, a beágyazott szakaszok idejét levonja a szülőéből"""
+    __slots__ = ('profiler', 'name', 'start', 'child', 'mem_start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.child = 0.0
+        self.mem_start = 0
+
+    def __enter__(self):
+        if self.profiler.capture_memory and tracemalloc.is_tracing():
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.profiler._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        self.profiler._record(self.name, elapsed, elapsed - self.child, self.mem_start)
+        return False
+
+
+class Profiler:
+    """
+    Alacsony overheadű, szakaszonkénti idő- és memóriamérés.
+    Kikapcsolt állapotban a stage() egy megosztott üres context managert ad vissza.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.capture_cprofile = False
+        self.capture_memory = False
+        self.output_dir = None
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.wall = {}
+        self.self_wall = {}
+        self.calls = {}
+        self.memory = {}
+        self.files = []
+
+    def configure(self, enabled: bool = True, cprofile: bool = False, memory: bool = False, output_dir: str = None):
+        self.enabled = enabled or cprofile or memory
+        self.capture_cprofile = cprofile
+        self.capture_memory = memory
+        self.output_dir = output_dir
+        self.reset()
+
+    def stage(self, name: str):
+        """Context manager egy szakasz méréséhez"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name)
+
+    @property
+    def _stack(self):
+        # Szálanként külön verem, hogy a párhuzamos szakaszok ne vonódjanak le egymásból
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, elapsed, self_elapsed, mem_start):
+        with self._lock:
+            self._accumulate(name, elapsed, self_elapsed, mem_start)
+
+    def _accumulate(self, name, elapsed, self_elapsed, mem_start):
+        self.wall[name] = self.wall.get(name, 0.0) + elapsed
+        self.self_wall[name] = self.self_wall.get(name, 0.0) + self_elapsed
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.capture_memory and tracemalloc.is_tracing():
+            delta = tracemalloc.get_traced_memory()[0] - mem_start
+            self.memory[name] = self.memory.get(name, 0) + delta
+
+    def file(self, file_path: str):
+        """Context manager egy fájl teljes feldolgozásához (cProfile és tracemalloc pillanatkép)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _FileProfile(self, file_path)
+
+    def report(self, top: int = 10) -> str:
+        """Rangsorolt szöveges riport arról, hová ment az idő és a memória"""
+        lines = ["", "Profile report", "=============="]
+        total = sum(self.self_wall.values())
+        order = {name: i for i, name in enumerate(STAGES)}
+        ranked = sorted(self.self_wall.items(), key=lambda kv: (-kv[1], order.get(kv[0], len(STAGES))))
+
+        lines.append(f"{'stage':<12}{'self s':>10}{'total s':>10}{'share':>8}{'calls':>9}")
+        for name, self_elapsed in ranked:
+            share = (self_elapsed / total * 100) if total else 0.0
+            lines.append(f"{name:<12}{self_elapsed:>10.3f}{self.wall[name]:>10.3f}{share:>7.1f}%{self.calls[name]:>9}")
+        lines.append(f"{'total':<12}{total:>10.3f}")
+
+        if self.memory:
+            lines.append("")
+            lines.append(f"{'stage':<12}{'net alloc':>14}")
+            for name, delta in sorted(self.memory.items(), key=lambda kv: -kv[1]):
+                lines.append(f"{name:<12}{_format_bytes(delta):>14}")
+
+        if self.files:
+            lines.append("")
+            lines.append("Files (slowest first):")
+            for entry in sorted(self.files, key=lambda f: -f['wall'])[:top]:
+                line = f"  {entry['wall']:>8.3f}s  {entry['path']}"
+                if entry.get('peak') is not None:
+                    line += f"  peak {_format_bytes(entry['peak'])}"
+                lines.append(line)
+                for stat_line in entry.get('top_allocations', []):
+                    lines.append(f"      {stat_line}")
+                if entry.get('profile_path'):
+                    lines.append(f"      cProfile: {entry['profile_path']}")
+                for stat_line in entry.get('top_functions', []):
+                    lines.append(f"      {stat_line}")
+        return "\n".join(lines)
+
+    def write_report(self, top: int = 10):
+        """Kiírja a riportot az output_dir könyvtárba (ha meg van adva), és visszaadja a szöveget"""
+        text = self.report(top)
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, 'profile_report.txt'), 'w', encoding='utf-8') as f:
+                f.write(text + "\n")
+        return text
+
+
+class _FileProfile:
+    def __init__(self, profiler, file_path):
+        self.profiler = profiler
+        self.file_path = file_path
+        self.cprofile = None
+        self.started_tracing = False
+
+    def __enter__(self):
+        if self.profiler.capture_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        if self.profiler.capture_cprofile:
+            # A cProfile/pstats csak fájlonkénti profilozásnál kell, a normál indulást nem lassítja
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        entry = {'path': self.file_path, 'wall': elapsed, 'peak': None}
+
+        if self.cprofile is not None:
+            import pstats
+            self.cprofile.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(self.cprofile, stream=stream).sort_stats('cumulative')
+            stats.print_stats(5)
+            entry['top_functions'] = [l.strip() for l in stream.getvalue().splitlines()
+                                      if l.strip() and l.strip()[0].isdigit()][:5]
+            if self.profiler.output_dir:
+                os.makedirs(self.profiler.output_dir, exist_ok=True)
+                name = os.path.basename(self.file_path) + '.prof'
+                entry['profile_path'] = os.path.join(self.profiler.output_dir, name)
+                stats.dump_stats(entry['profile_path'])
+
+        if self.profiler.capture_memory and tracemalloc.is_tracing():
+            entry['peak'] = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            entry['top_allocations'] = [str(stat) for stat in snapshot.statistics('lineno')[:3]]
+            if self.started_tracing:
+                tracemalloc.stop()
+
+        self.profiler.files.append(entry)
+        return False
+
+
+def _format_bytes(size: int) -> str:
+    sign = '-' if size < 0 else ''
+    size = abs(size)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{sign}{size:.1f} {unit}" if unit != 'B' else f"{sign}{size} B"
+        size /= 1024
+
+
+# Globális profiler, a --profile kapcsoló konfigurálja
+profiler = Profiler()
@@ -0,0 +1,204 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .metrics import metrics
+
+
+class CircuitBreaker:
+    """
+    Modellenkénti megszakító: ha a legutóbbi hívások hibaaránya átlépi a küszöböt, a kör
+    `cooldown` másodpercre kinyit. Utána egyetlen próbahívás mehet át (half-open); ha az sikeres,
+    a kör bezár, ha nem, dupla ideig marad nyitva (legfeljebb `max_cooldown`).
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 10, threshold: float = 0.5,
+                 cooldown: float = 5.0, max_cooldown: float = 120.0):
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half-open'
+            if self.state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def remaining(self) -> float:
+        """Ennyi másodperc múlva enged át újra próbahívást"""
+        with self._lock:
+            if self.state == 'closed':
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record(self, ok: bool):
+        with self._lock:
+            if self.state == 'half-open':
+                self.trial_running = False
+                if ok:
+                    self.state = 'closed'
+                    self.cooldown = self.base_cooldown
+                    self.outcomes.clear()
+                else:
+                    self._open(min(self.cooldown * 2, self.max_cooldown))
+                return
+            self.outcomes.append(ok)
+            errors = self.outcomes.count(False)
+            if (self.state == 'closed' and len(self.outcomes) >= self.min_calls
+                    and errors / len(self.outcomes) >= self.threshold):
+                self._open(self.cooldown)
+
+    def _open(self, cooldown: float):
+        self.state = 'open'
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        metrics.incr('breaker.opened')
+        logging.warning("Circuit breaker opened for %.0f s after repeated API errors", cooldown)
+
+
+class ResilientCaller:
+    """
+    A messages.create hívások határidővel, hedge-eléssel és megszakítóval.
+    - Minden kérésnek határideje van (deadline), az SDK timeoutja is ez, így egy beragadt
+      kérés sem blokkolja a batch-et. A határidő a kérés tényleges indulásától számít, a közös
+      végrehajtó sorában töltött idő nem számít bele.
+    - A végrehajtó mérete a párhuzamos hívók számából jön (configure(concurrency=...)): hívónként
+      egy elsődleges és egy hedge kérés fér el.
+    - Ha egy kérés tovább tart a modell eddigi p95 késleltetésénél, egy másodpéldányt indítunk;
+      az elsőként visszaérő válasz nyer, a másik eredményét eldobjuk.
+    - Sok hiba esetén a megszakító kinyit: ilyenkor a tartalék modellre váltunk, vagy kivárjuk a
+      visszaállást.
+    """
+
+    def __init__(self, deadline: float = 60.0, hedge: bool = True, hedge_quantile: float = 95,
+                 hedge_min_samples: int = 20, fallback_model: str = None, max_workers: int = 16):
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.fallback_model = fallback_model
+        self.max_workers = max_workers
+        self.breakers = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, deadline: float = None, hedge: bool = None, fallback_model: str = None,
+                  concurrency: int = None):
+        if deadline is not None:
+            self.deadline = deadline
+        if hedge is not None:
+            self.hedge = hedge
+        self.fallback_model = fallback_model
+        self.breakers = {}
+        if concurrency is not None:
+            with self._lock:
+                self.max_workers = max(2 * concurrency, 2)
+                # A régi végrehajtó befejezi a már beküldött kéréseket, az újak a most méretezettre mennek
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker()
+            return self.breakers[model]
+
+    def hedge_delay(self, model: str):
+        """A hedge kérés indítása előtti várakozás: a modell sikeres kéréseinek p95-e, ha már van elég minta"""
+        if not self.hedge or metrics.count(f"attempt.{model}") < self.hedge_min_samples:
+            return None
+        delay = metrics.percentile(f"attempt.{model}", self.hedge_quantile)
+        return delay if delay < self.deadline else None
+
+    def _route(self, model: str) -> str:
+        """A megszakító állapota alapján választott modell; nyitott körnél tartalék modell vagy várakozás"""
+        while True:
+            breaker = self.breaker(model)
+            if breaker.allow():
+                return model
+            if self.fallback_model and self.fallback_model != model and self.breaker(self.fallback_model).allow():
+                metrics.incr('breaker.fallback')
+                return self.fallback_model
+            metrics.incr('breaker.waits')
+            time.sleep(max(breaker.remaining(), 0.05))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='request')
+            return self._executor
+
+    def _attempt(self, client, kwargs, started: dict = None):
+        start = time.perf_counter()
+        if started is not None:
+            started.setdefault('at', start)
+        message = client.messages.create(timeout=self.deadline, **kwargs)
+        metrics.observe(f"attempt.{kwargs['model']}", time.perf_counter() - start)
+        return message
+
+    def create(self, client, **kwargs):
+        """A client.messages.create helyett: ugyanazok a paraméterek, ugyanaz a visszatérési érték"""
+        model = self._route(kwargs['model'])
+        kwargs['model'] = model
+        breaker = self.breaker(model)
+        executor = self._get_executor()
+        start = time.perf_counter()
+        metrics.incr('requests')
+
+        # Az első próbálkozás indulásának ideje: a határidő ettől számít, nem a beküldéstől
+        started = {}
+        futures = {executor.submit(self._attempt, client, kwargs, started): 'primary'}
+        delay = self.hedge_delay(model)
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            # Ha még el sem indult (a végrehajtó sorában vár), egy másodpéldány csak tovább terhelné a sort
+            if not done and 'at' in started:
+                metrics.incr('hedge.fired')
+                futures[executor.submit(self._attempt, client, kwargs, started)] = 'hedge'
+
+        error = None
+        pending = set(futures)
+        while pending:
+            begun = started.get('at')
+            remaining = self.deadline - (time.perf_counter() - begun) if begun is not None else self.deadline
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                if started.get('at') is None or time.perf_counter() - started['at'] < self.deadline:
+                    continue
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if futures[future] == 'hedge':
+                        metrics.incr('hedge.won')
+                    breaker.record(True)
+                    metrics.observe(f"request.{model}", time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+
+        for future in pending:
+            future.cancel()
+        breaker.record(False)
+        if error is None:
+            metrics.incr('timeouts')
+            error = TimeoutError(f"No response from {model} within {self.deadline:.0f} s")
+        metrics.incr('errors')
+        raise error
+
+
+caller = ResilientCaller()
@@ -0,0 +1,139 @@
+import json
+import time
+import logging
+from fnmatch import fnmatchcase
+from .metrics import metrics
+from .translation import batch_translate_multi, count_tokens, _segment_cost
+
+
+class Tier:
+    """Egy modell szint: a szegmens ide kerül, ha legfeljebb max_chars karakter és max_tokens token"""
+    __slots__ = ('name', 'model', 'max_chars', 'max_tokens')
+
+    def __init__(self, name: str, model: str, max_chars: int = None, max_tokens: int = None):
+        self.name = name
+        self.model = model
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+
+    def fits(self, text: str) -> bool:
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return False
+        if self.max_tokens is not None and count_tokens(text) > self.max_tokens:
+            return False
+        return True
+
+
+class ModelRouter:
+    """
+    Szegmensenkénti modellválasztás. A szinteket a legolcsóbbtól a legerősebbig kell megadni:
+    a szegmens az első olyan szintre kerül, amelynek a korlátaiba belefér, az utolsó szint mindent elfogad.
+    A kulcs/útvonal minták (pl. '*.tooltip', 'dialog.*') felülírják a hossz szerinti döntést.
+    Üres router esetén minden a --model modellre megy.
+    """
+
+    def __init__(self, tiers=(), rules=()):
+        self.tiers = list(tiers)
+        self.rules = list(rules)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tiers)
+
+    def configure(self, tiers=(), rules=()):
+        self.tiers = list(tiers)
+        self.rules = list(rules)
+        names = {tier.name for tier in self.tiers}
+        for pattern, tier_name in self.rules:
+            if tier_name not in names:
+                raise ValueError(f"Routing rule {pattern!r} refers to unknown tier {tier_name!r}")
+
+    def load(self, config_path: str):
+        """
+        JSON konfiguráció betöltése:
+        {"tiers": [{"name": "fast", "model": "...", "max_chars": 40, "max_tokens": 12}, {"name": "full", "model": "..."}],
+         "rules": [{"pattern": "*.tooltip", "tier": "fast"}, {"pattern": "dialog.*", "tier": "full"}]}
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        tiers = [Tier(t['name'], t['model'], t.get('max_chars'), t.get('max_tokens')) for t in config.get('tiers', [])]
+        rules = [(r['pattern'], r['tier']) for r in config.get('rules', [])]
+        self.configure(tiers, rules)
+
+    def tier_for(self, text: str, key: str = None) -> Tier:
+        if key is not None:
+            for pattern, tier_name in self.rules:
+                if fnmatchcase(key, pattern):
+                    return next(tier for tier in self.tiers if tier.name == tier_name)
+        for tier in self.tiers[:-1]:
+            if tier.fits(text):
+                return tier
+        return self.tiers[-1]
+
+    def assign(self, texts, keys=None) -> dict:
+        """:return: szint -> a hozzá rendelt szegmensek indexei, a szintek sorrendjében"""
+        groups = {tier.name: [] for tier in self.tiers}
+        for index, text in enumerate(texts):
+            key = keys[index] if keys else None
+            groups[self.tier_for(text, key).name].append(index)
+        return {tier: groups[tier.name] for tier in self.tiers if groups[tier.name]}
+
+    def model_for(self, text: str, key: str = None, model: str = None) -> str:
+        """A szegmenst fordító modell: a szintjéé, router nélkül a megadott modell"""
+        return self.tier_for(text, key).model if self.tiers else model
+
+    def escalation_model(self, model: str) -> str:
+        """Az ellenőrzésen elbukott szegmensek újrafordításához a legerősebb szint modellje"""
+        return self.tiers[-1].model if self.tiers else model
+
+    def report(self) -> str:
+        """Szintenkénti szegmensszám, költség és átviteli sebesség"""
+        lines = ["", "Model tiers", "==========="]
+        total = sum(metrics.counters[f"tier.{tier.name}.segments"] for tier in self.tiers)
+        lines.append(f"{'tier':<12}{'model':<30}{'segments':>10}{'share':>8}{'cost $':>10}{'seg/s':>9}")
+        for tier in self.tiers:
+            segments = metrics.counters[f"tier.{tier.name}.segments"]
+            cost = metrics.counters[f"tier.{tier.name}.cost"]
+            seconds = metrics.counters[f"tier.{tier.name}.seconds"]
+            share = segments / total * 100 if total else 0.0
+            rate = segments / seconds if seconds else 0.0
+            lines.append(f"{tier.name:<12}{tier.model:<30}{segments:>10}{share:>7.1f}%{cost:>10.4f}{rate:>9.1f}")
+        return "\n".join(lines)
+
+
+router = ModelRouter()
+
+
+def translate_routed(texts, target_langs, model: str, langs_per_call: int = 1, keys=None, hints=None) -> dict:
+    """
+    A szegmensek szintekre osztása és szintenként külön batch-ekben fordítása.
+    Router nélkül ugyanaz, mint a batch_translate_multi a megadott modellel.
+    """
+    if not router.enabled:
+        return batch_translate_multi(texts, list(target_langs), model, langs_per_call=langs_per_call, hints=hints)
+
+    results = {lang: [None] * len(texts) for lang in target_langs}
+    for tier, indexes in router.assign(texts, keys).items():
+        batch = [texts[i] for i in indexes]
+        logging.debug("Routing %d segments to tier %s (%s)", len(batch), tier.name, tier.model)
+        start = time.perf_counter()
+        tier_hints = {lang: [lang_hints[i] for i in indexes] for lang, lang_hints in hints.items()} if hints else None
+        tier_results = batch_translate_multi(batch, list(target_langs), tier.model, langs_per_call=langs_per_call,
+                                             hints=tier_hints)
+        record_tier(tier, batch, tier_results, time.perf_counter() - start)
+        for lang, translations in tier_results.items():
+            for i, translated in zip(indexes, translations):
+                results[lang][i] = translated
+    return results
+
+
+def record_tier(tier: Tier, sources, results: dict, seconds: float):
+    """
+    A szint metrikái (tier.<név>.segments/cost/seconds) a --metrics és a szintjelentés számára
+    :param results: nyelv -> a sources sorrendjében a fordítások
+    """
+    metrics.incr(f"tier.{tier.name}.seconds", seconds)
+    metrics.incr(f"tier.{tier.name}.segments", len(sources) * len(results))
+    for translations in results.values():
+        metrics.incr(f"tier.{tier.name}.cost",
+                     sum(_segment_cost(source, target, tier.model) for source, target in zip(sources, translations)))
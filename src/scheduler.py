@@ -0,0 +1,154 @@
+import os
+import re
+import heapq
+import logging
+
+# A fájlméret hányada, ami kinyert szöveg (a többi kulcs, jelölés, szerkezet); ~4 bájt egy token
+TEXT_SHARE = {
+    '.json': 0.5,
+    '.xml': 0.4,
+    '.xlf': 0.3,
+    '.ini': 0.6,
+    '.txt': 1.0,
+    '.md': 1.0,
+    '.markdown': 1.0,
+}
+BYTES_PER_TOKEN = 4
+# Egy nagy szöveges/Markdown fájl darabjainak legnagyobb becsült mérete tokenben
+CHUNK_TOKENS = 800
+_PARAGRAPH_BREAK = re.compile(r'(\n[ \t]*\n\s*)')
+_FENCE = re.compile(r'^[ \t]*(?:```|~~~)', re.MULTILINE)
+
+
+def estimate_file_tokens(file_path: str) -> int:
+    """Fordítandó tokenek becslése a fájl méretéből, beolvasás nélkül"""
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        return 0
+    share = TEXT_SHARE.get(os.path.splitext(file_path)[1].lower(), 0.5)
+    return max(1, int(size * share / BYTES_PER_TOKEN))
+
+
+def order_jobs(jobs: dict, workers: int, feedback: int = None) -> list:
+    """
+    Feldolgozási sorrend a becsült méretek alapján (jobs: elem -> becsült token).
+    Elöl a `feedback` (alapból workers) legkisebb elem a gyors első visszajelzésért, utána a többi
+    a legnagyobbtól a legkisebbig (LPT), így a futás végén csak kicsi munkák maradnak.
+    """
+    feedback = workers if feedback is None else feedback
+    by_size = sorted(jobs, key=lambda job: jobs[job])
+    small = by_size[:feedback] if len(by_size) > workers else []
+    rest = by_size[len(small):]
+    return small + rest[::-1]
+
+
+def simulate_makespan(weights, workers: int) -> list:
+    """
+    A sorrendben érkező munkák mohó szétosztása mindig a legkevésbé terhelt workerre
+    (ahogy a közös sorból a szabad workerek veszik ki őket). :return: workerenkénti terhelés
+    """
+    loads = [0] * max(1, workers)
+    heapq.heapify(loads)
+    for weight in weights:
+        heapq.heappush(loads, heapq.heappop(loads) + weight)
+    return sorted(loads, reverse=True)
+
+
+def split_balanced(weights, parts: int) -> list:
+    """
+    Az indexek `parts` részre osztása közel azonos összsúllyal (LPT): a legnagyobb súlyú elem
+    mindig a legkönnyebb részbe kerül. A részeken belül az eredeti sorrend marad.
+    """
+    parts = max(1, min(parts, len(weights)))
+    heap = [(0, part) for part in range(parts)]
+    groups = [[] for _ in range(parts)]
+    for index in sorted(range(len(weights)), key=lambda i: weights[i], reverse=True):
+        load, part = heapq.heappop(heap)
+        groups[part].append(index)
+        heapq.heappush(heap, (load + weights[index], part))
+    return [sorted(group) for group in groups if group]
+
+
+def split_paragraphs(text: str, max_tokens: int = CHUNK_TOKENS, weight=len) -> list:
+    """
+    Egyetlen nagy szöveg (txt/Markdown) darabolása bekezdéshatárokon (üres sor) egymást követő,
+    legfeljebb max_tokens súlyú részekre. A Markdown címsorok saját bekezdések, így előttük is vághatunk;
+    kódblokkon (``` vagy ~~~) belül nem vágunk. A max_tokens-nél nagyobb bekezdés egyben marad.
+    :return: (rész, utána következő elválasztó) párok; sorban összefűzve az eredeti szöveget adják
+    """
+    pieces = _PARAGRAPH_BREAK.split(text)
+    blocks = []
+    in_fence = False
+    for i in range(0, len(pieces), 2):
+        block, separator = pieces[i], pieces[i + 1] if i + 1 < len(pieces) else ''
+        if blocks and (in_fence or not block.strip()):
+            # Nyitott kódblokk folytatása, vagy üres maradék: az előző részhez tartozik
+            previous, previous_separator = blocks[-1]
+            blocks[-1] = (previous + previous_separator + block, separator) if in_fence else \
+                (previous, previous_separator + block + separator)
+        else:
+            blocks.append((block, separator))
+        if len(_FENCE.findall(block)) % 2:
+            in_fence = not in_fence
+    chunks, loads = [], []
+    for block, separator in blocks:
+        tokens = weight(block)
+        if chunks and loads[-1] + tokens <= max_tokens:
+            chunks[-1] = (chunks[-1][0] + chunks[-1][1] + block, separator)
+            loads[-1] += tokens
+        else:
+            chunks.append((block, separator))
+            loads.append(tokens)
+    return chunks
+
+
+class MakespanPlan:
+    """
+    Egy futás ütemezése: a fájlok sorrendje, a becsült workerenkénti terhelés, és a futás után
+    a becsült és a tényleges makespan (a teljes fordítási idő) összevetése.
+    """
+
+    def __init__(self, estimates: dict, workers: int, feedback: int = None, split: bool = True):
+        """:param split: az ideális terhelésnél nagyobb munkákat a workerek között szétosztva számoljuk"""
+        self.estimates = estimates
+        self.workers = max(1, workers)
+        self.order = order_jobs(estimates, self.workers, feedback)
+        self.total = sum(estimates.values())
+        pieces = []
+        for job in self.order:
+            tokens = estimates[job]
+            if split and self.dominates(tokens):
+                pieces.extend([tokens / self.workers] * self.workers)
+            else:
+                pieces.append(tokens)
+        self.loads = simulate_makespan(pieces, self.workers)
+
+    @property
+    def share(self) -> float:
+        """Egy worker ideális (tökéletesen kiegyensúlyozott) terhelése tokenben"""
+        return self.total / self.workers
+
+    def dominates(self, tokens: int) -> bool:
+        """Egy munka egymaga hosszabb-e az ideális workerenkénti terhelésnél (ilyenkor érdemes szétosztani)"""
+        return self.workers > 1 and tokens > self.share
+
+    def log_plan(self):
+        if not self.order:
+            return
+        logging.info("Scheduled %d files (~%d tokens) on %d workers: busiest worker ~%d tokens, balanced ~%d",
+                     len(self.order), self.total, self.workers, self.loads[0], self.share)
+
+    def report(self, seconds: float, busy: float) -> dict:
+        """
+        :param seconds: a fordítás tényleges faliórás ideje
+        :param busy: a workerek összesített fordítással töltött ideje
+        :return: becsült és tényleges makespan másodpercben; a becslés a mért átviteli sebességgel
+                 (token / worker-másodperc) számol, így a sorrend és a szétosztás minőségét méri
+        """
+        rate = self.total / busy if busy else 0.0
+        predicted = self.loads[0] / rate if rate else 0.0
+        balanced = self.share / rate if rate else 0.0
+        logging.info("Makespan: predicted %.1f s, actual %.1f s (perfectly balanced %.1f s)",
+                     predicted, seconds, balanced)
+        return {'predicted_makespan': predicted, 'makespan': seconds}
@@ -0,0 +1,134 @@
+import os
+import hmac
+import json
+import time
+import secrets
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .file_processors import translate_gated
+from .pipeline import Pipeline
+from .translation import get_client, count_tokens, language_name
+from .language_utils import detect_language
+from .translation_memory import memory
+from .metrics import metrics
+from .server_client import TOKEN_HEADER, token_path
+
+
+def warm_up():
+    """Betölti mindazt, amit egy hideg indítás az első fájlnál fizetne: kliens, tokenizáló, nyelvprofilok"""
+    start = time.perf_counter()
+    get_client()
+    count_tokens("warm up")
+    detect_language("Bonjour et bienvenue à bord du vaisseau")
+    language_name('hu')
+    logging.info("Server warm-up took %.2f s", time.perf_counter() - start)
+
+
+class TranslationServer(ThreadingHTTPServer):
+    """
+    Helyi HTTP szerver (csak 127.0.0.1), amely futások között melegen tartja az API klienst,
+    a nyelvfelismerőt, a tokenizálót és a fordítási memóriát.
+    A POST kérésekhez JSON törzs és a futásonkénti token kell, amelyet a szerver egy csak a
+    tulajdonos által olvasható fájlba ír: egy böngészőben megnyitott oldal így nem indíthat fordítást.
+    """
+    daemon_threads = True
+
+    def __init__(self, port: int, model: str, default_lang: str):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.model = model
+        self.default_lang = default_lang
+        self.started = time.time()
+        self.token = secrets.token_urlsafe(32)
+        self.token_path = token_path(self.server_address[1])
+        os.makedirs(os.path.dirname(self.token_path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.token)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.token_path)
+        except OSError:
+            pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {'status': 'ok', 'pid': os.getpid(), 'uptime': round(time.time() - self.server.started, 1),
+                              'memory': memory.stats(), 'requests': metrics.counters['requests']})
+        else:
+            self._reply(404, {'error': f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.headers.get('Content-Type', '').split(';')[0].strip().lower() != 'application/json':
+            self._reply(415, {'error': "Content-Type must be application/json"})
+            return
+        if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode('utf-8'), self.server.token.encode('utf-8')):
+            self._reply(403, {'error': f"Missing or invalid {TOKEN_HEADER}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if self.path == '/translate-file':
+                self._reply(200, self._translate_file(payload))
+            elif self.path == '/translate-strings':
+                self._reply(200, self._translate_strings(payload))
+            elif self.path == '/shutdown':
+                self._reply(200, {'status': 'stopping'})
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                self._reply(404, {'error': f"Unknown endpoint: {self.path}"})
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            logging.exception("Error serving %s", self.path)
+            self._reply(500, {'error': str(e)})
+
+    def _translate_file(self, payload):
+        path = payload['path']
+        if not os.path.exists(path):
+            raise ValueError(f"Path does not exist: {path}")
+        logging.info("Request: translate %s", path)
+        pipeline = Pipeline(payload.get('model', self.server.model), payload.get('default_lang', self.server.default_lang),
+                            payload.get('targets'), payload.get('langs_per_call', 1), payload.get('output_dir'),
+                            payload.get('stream_json'))
+        return pipeline.run(path)
+
+    def _translate_strings(self, payload):
+        texts = payload['texts']
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise ValueError("'texts' must be a list of strings")
+        targets = payload.get('targets') or [self.server.default_lang]
+        results = translate_gated(texts, targets, payload.get('model', self.server.model))
+        return {'translations': results}
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug("HTTP %s", format % args)
+
+
+def serve(port: int, model: str, default_lang: str):
+    """Elindítja a szervert, és leállításig (Ctrl+C vagy POST /shutdown) kiszolgálja a kéréseket"""
+    server = TranslationServer(port, model, default_lang)
+    warm_up()
+    logging.warning("Translation server listening on http://127.0.0.1:%d", port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        memory.close()
@@ -0,0 +1,74 @@
+import os
+import json
+import urllib.error
+import urllib.request
+
+# Csak a standard könyvtárat használjuk, hogy a továbbítás ne töltse be a nehéz függőségeket
+DEFAULT_PORT = 8765
+TOKEN_HEADER = 'X-Translator-Token'
+
+
+def server_port(port: int = None) -> int:
+    return port or int(os.getenv("TRANSLATOR_PORT", DEFAULT_PORT))
+
+
+def token_path(port: int = None) -> str:
+    """A szerver futásonkénti tokenjének fájlja (csak a tulajdonos olvashatja); $TRANSLATOR_RUN_DIR felülírja a helyét"""
+    run_dir = os.getenv("TRANSLATOR_RUN_DIR") or os.path.join(os.path.expanduser('~'), '.ai-translator')
+    return os.path.join(run_dir, f"server-{server_port(port)}.token")
+
+
+def read_token(port: int = None):
+    """A futó szerver tokenje, None ha nem olvasható (pl. másik felhasználó szervere)"""
+    try:
+        with open(token_path(port), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _url(port: int, path: str) -> str:
+    return f"http://127.0.0.1:{server_port(port)}{path}"
+
+
+def is_running(port: int = None, timeout: float = 0.2) -> bool:
+    """
+    Fut-e a szerver a helyi porton (rövid időkorláttal, hogy a szerver nélküli indítást ne lassítsa).
+    Token nélkül nem tudnánk kérést küldeni, ilyenkor nem számít futónak.
+    """
+    if read_token(port) is None:
+        return False
+    try:
+        with urllib.request.urlopen(_url(port, '/health'), timeout=timeout) as response:
+            return response.status == 200
+    except (OSError, urllib.error.URLError):
+        return False
+
+
+def call(path: str, payload: dict = None, port: int = None, timeout: float = None) -> dict:
+    """POST kérés a szervernek JSON törzzsel és a futás tokenjével; hiba esetén RuntimeError a szerver üzenetével"""
+    data = json.dumps(payload or {}).encode('utf-8')
+    request = urllib.request.Request(_url(port, path), data=data,
+                                     headers={'Content-Type': 'application/json', TOKEN_HEADER: read_token(port) or ''})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read().decode('utf-8')).get('error', str(e))) from None
+
+
+def translate_file(path: str, port: int = None, **options) -> dict:
+    """Egy fájl vagy könyvtár fordítása a szerveren; a relatív útvonalakat a hívó könyvtárához képest oldjuk fel"""
+    payload = {key: value for key, value in options.items() if value is not None}
+    payload['path'] = os.path.abspath(path)
+    if payload.get('output_dir'):
+        payload['output_dir'] = os.path.abspath(payload['output_dir'])
+    return call('/translate-file', payload, port)
+
+
+def translate_strings(texts, targets, port: int = None, model: str = None) -> dict:
+    """:return: nyelvkód -> fordítások listája"""
+    payload = {'texts': list(texts), 'targets': list(targets)}
+    if model:
+        payload['model'] = model
+    return call('/translate-strings', payload, port)['translations']
@@ -0,0 +1,195 @@
+import os
+import re
+import logging
+import xml.etree.ElementTree as ET
+from collections import Counter
+from .language_utils import language_suffix
+from .translation_memory import lang_key
+from .validation import (SUPPORTED_EXTENSIONS, XLIFF_NS, check_segment, load_segments, pair_localized_files)
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def normalize_lang(code: str) -> str:
+    """A nyelvkód a régióval együtt, a memória kulcsaival egyező alakban (pt_BR -> pt-br)"""
+    return lang_key(code)
+
+
+def primary_lang(code: str) -> str:
+    """A nyelvkód elsődleges része (pt-BR -> pt)"""
+    return re.split(r'[-_]', code.strip().lower())[0]
+
+
+def accept_pair(source: str, target: str, stats: Counter) -> bool:
+    """Üres, a forrással azonos vagy hibás (eltérő helyőrzők/tagek) fordítást nem veszünk fel"""
+    if not source.strip() or not (target or '').strip():
+        stats['empty'] += 1
+        return False
+    if target.strip() == source.strip():
+        stats['untranslated'] += 1
+        return False
+    if any(issue.severity == 'error' for issue in check_segment(source, target)):
+        stats['rejected'] += 1
+        return False
+    return True
+
+
+def _records(source: str, lang: str, target: str):
+    yield source, lang, target
+    # A JSON kinyerés a két szélén levágott értéket keresi a memóriában
+    if source.strip() != source:
+        yield source.strip(), lang, target.strip()
+
+
+def fallback_records(records):
+    """
+    A régiós párokból (pt-br) a régió nélküli célnyelv (--targets pt) tartalék párjai. Ezeket a memória
+    derived bejegyzésként, csak pontos bejegyzés hiányában veszi fel (memory.put_many(..., derived=True)),
+    így sem egy importált pontos 'pt' fordítást, sem egymást (pt-BR, pt-PT) nem írják felül.
+    """
+    return [(source, primary_lang(lang), target) for source, lang, target in records if primary_lang(lang) != lang]
+
+
+def align_files(source_path: str, target_path: str, lang: str, stats: Counter = None):
+    """
+    Egy forrás- és egy célnyelvi fájl párosítása kulcs útvonal szerint (ugyanazokkal a kulcsokkal,
+    amelyekkel a feldolgozók és a validátor is dolgozik). :return: (forrás, nyelv, fordítás) hármasok
+    """
+    stats = stats if stats is not None else Counter()
+    source_segments, source_issues = load_segments(source_path)
+    target_segments, target_issues = load_segments(target_path)
+    if any(issue.code == 'syntax' for issue in source_issues + target_issues):
+        logging.warning("Skipping unreadable pair %s / %s", source_path, target_path)
+        stats['unreadable'] += 1
+        return []
+    records = []
+    for key, source in source_segments.items():
+        target = target_segments.get(key)
+        if target is None:
+            stats['unmatched'] += 1
+            continue
+        if accept_pair(source, target, stats):
+            records.extend(_records(source, lang, target))
+            stats['pairs'] += 1
+    return records
+
+
+def align_xliff(file_path: str, stats: Counter = None):
+    """XLIFF: a trans-unitok kitöltött <target> elemei a <source> párjaként, a célnyelv a <file> elemből"""
+    stats = stats if stats is not None else Counter()
+    try:
+        root = ET.parse(file_path).getroot()
+    except ET.ParseError as e:
+        logging.warning("Skipping unreadable XLIFF %s: %s", file_path, e)
+        stats['unreadable'] += 1
+        return []
+    records = []
+    for file_element in root.iter(f'{XLIFF_NS}file'):
+        lang = file_element.get('target-language')
+        if not lang:
+            match = language_suffix(os.path.splitext(os.path.basename(file_path))[0])
+            if match is None:
+                logging.warning("No target language in %s, skipping", file_path)
+                stats['unreadable'] += 1
+                continue
+            lang = match.group(1)
+        lang = normalize_lang(lang)
+        for unit in file_element.iter(f'{XLIFF_NS}trans-unit'):
+            source = unit.find(f'{XLIFF_NS}source')
+            target = unit.find(f'{XLIFF_NS}target')
+            if source is None or target is None:
+                stats['unmatched'] += 1
+                continue
+            if accept_pair(source.text or '', target.text or '', stats):
+                records.extend(_records(source.text, lang, target.text))
+                stats['pairs'] += 1
+    return records
+
+
+def align_tree(path: str, source_lang: str, stats: Counter = None):
+    """
+    Egy könyvtár párhuzamos nyelvi fájljainak párosítása: name_<lang>.ext a name_<source_lang>.ext
+    (vagy nyelvkód nélküli name.ext) párja; az XLIFF fájlok önmagukban is párokat adnak.
+    """
+    stats = stats if stats is not None else Counter()
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = [os.path.join(root, filename) for root, _, files in os.walk(path) for filename in files
+                 if filename.lower().endswith(SUPPORTED_EXTENSIONS)]
+    records = []
+    for file_path in sorted(p for p in paths if p.lower().endswith('.xlf')):
+        records.extend(align_xliff(file_path, stats))
+        stats['files'] += 1
+    for target_path, source_path in pair_localized_files([p for p in paths if not p.lower().endswith('.xlf')],
+                                                         source_lang):
+        if source_path is None:
+            continue
+        match = language_suffix(os.path.splitext(os.path.basename(target_path))[0])
+        if match is None or primary_lang(match.group(1)) == primary_lang(source_lang):
+            continue
+        records.extend(align_files(source_path, target_path, normalize_lang(match.group(1)), stats))
+        stats['files'] += 1
+    return records
+
+
+def read_tmx(file_path: str, source_lang: str = None, stats: Counter = None):
+    """
+    TMX beolvasása: minden <tu> forrásnyelvi <tuv> elemét a többi nyelv <tuv> elemeivel párosítja.
+    A forrásnyelv a paraméter, ennek hiányában a fejléc srclang attribútuma; ha egyik sincs, a fájlt kihagyjuk.
+    A <seg> belső jelöléseiből (ph, bpt, ept, it) a bennük lévő eredeti kód marad meg.
+    """
+    stats = stats if stats is not None else Counter()
+    try:
+        root = ET.parse(file_path).getroot()
+    except ET.ParseError as e:
+        logging.warning("Skipping unreadable TMX %s: %s", file_path, e)
+        stats['unreadable'] += 1
+        return []
+    header = root.find('header')
+    source_lang = normalize_lang(source_lang or (header.get('srclang', '') if header is not None else ''))
+    if not source_lang or source_lang == '*all*':
+        logging.warning("No source language in %s (set --source-lang), skipping", file_path)
+        stats['unreadable'] += 1
+        return []
+    records = []
+    for unit in root.iter('tu'):
+        variants = {}
+        for variant in unit.findall('tuv'):
+            seg = variant.find('seg')
+            lang = variant.get(XML_LANG) or variant.get('lang')
+            if seg is not None and lang:
+                variants[normalize_lang(lang)] = ''.join(seg.itertext())
+        source = variants.pop(source_lang, None)
+        if source is None:
+            # A fejléc srclang-ja (en) és a <tuv> kódja (en-US) eltérhet a régióban
+            same = [lang for lang in variants if primary_lang(lang) == primary_lang(source_lang)]
+            source = variants.pop(same[0]) if len(same) == 1 else None
+        if source is None:
+            stats['unmatched'] += 1
+            continue
+        for lang, target in variants.items():
+            if accept_pair(source, target, stats):
+                records.extend(_records(source, lang, target))
+                stats['pairs'] += 1
+    stats['files'] += 1
+    return records
+
+
+def write_tmx(file_path: str, entries: dict, source_lang: str, tool: str = 'ai-translator'):
+    """A memória ((forrás, nyelv) -> fordítás) kiírása TMX 1.4 formátumban, forrásszövegenként egy <tu>"""
+    units = {}
+    for (source, lang), target in entries.items():
+        units.setdefault(source, []).append((lang, target))
+    root = ET.Element('tmx', version='1.4')
+    ET.SubElement(root, 'header', {'creationtool': tool, 'creationtoolversion': '1.0', 'segtype': 'sentence',
+                                   'o-tmf': 'jsonl', 'adminlang': 'en', 'srclang': source_lang, 'datatype': 'plaintext'})
+    body = ET.SubElement(root, 'body')
+    for source in sorted(units):
+        unit = ET.SubElement(body, 'tu')
+        for lang, text in [(source_lang, source)] + sorted(units[source]):
+            variant = ET.SubElement(unit, 'tuv', {XML_LANG: lang})
+            ET.SubElement(variant, 'seg').text = text
+    ET.indent(root)
+    ET.ElementTree(root).write(file_path, encoding='utf-8', xml_declaration=True)
+    return len(units)
@@ -1,169 +1,456 @@
 import os
-import anthropic
 import re
-import tiktoken
-from typing import List, Tuple
-from dotenv import load_dotenv
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from .logging_config import progress
+from .metrics import metrics
+from .resilience import caller
+from .validation import check_response
 
-def print_safe(text: str):
-    """Biztonságos kiírás, ami kezeli a kódolási hibákat"""
-    try:
-        print(text)
-    except UnicodeEncodeError:
-        print(text.encode('ascii', 'replace').decode())
+# Az anthropic, tiktoken, dotenv és language_tags csomagokat csak az első tényleges használatkor
+# importáljuk, így a --help, a száraz futás és a cache-ből kiszolgált futás nem fizeti meg a betöltésüket
+_client = None
+_encoding = None
+
+# Elutasított válasz esetén ennyiszer kérjük újra a szegmenst, próbálkozásonként kétszeres max_tokens-szel
+RESPONSE_RETRIES = 2
+
+
+class Fallbacks:
+    """
+    Szálanként gyűjti azokat a (forrásszöveg, nyelv) párokat, amelyeknél valódi hiba (API hiba, kliens hiánya,
+    újrapróbálás után is elutasított válasz) miatt a forrásszöveg maradt. Így a forrással azonos, de helyes
+    fordítás ("Garage", "Hangar") megkülönböztethető a visszaeséstől.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def collect(self):
+        """A blokkban (ebben a szálban) rögzített visszaesések halmaza; a külső gyűjtés is megkapja őket"""
+        outer = getattr(self._local, 'pairs', None)
+        self._local.pairs = pairs = set()
+        try:
+            yield pairs
+        finally:
+            self._local.pairs = outer
+            if outer is not None:
+                outer.update(pairs)
+
+    def record(self, text: str, lang: str):
+        pairs = getattr(self._local, 'pairs', None)
+        if pairs is not None:
+            pairs.add((text, lang))
+
+
+fallbacks = Fallbacks()
+
+def _get_encoding():
+    """A tiktoken kódoló, első használatkor betöltve; False, ha nem elérhető"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("claude-2")
+        except Exception:
+            _encoding = False
+    return _encoding
 
 def count_tokens(text: str) -> int:
     """Megszámolja a tokenek számát egy szövegben"""
-    try:
-        enc = tiktoken.encoding_for_model("claude-2")
+    enc = _get_encoding()
+    if enc:
         return len(enc.encode(text))
-    except:
-        # Ha nem sikerül pontosan számolni, becsüljük a szavak száma alapján
-        return len(text.split()) * 2
+    # Ha nem sikerül pontosan számolni, becsüljük a szavak száma alapján
+    return len(text.split()) * 2
 
 def estimate_cost(texts: List[str]) -> Tuple[float, float]:
     """Költségbecslés a szövegek alapján"""
     total_input_tokens = sum(count_tokens(text) for text in texts)
     # Becsült output tokenek (általában 1.2x hosszabb a fordítás)
     total_output_tokens = int(total_input_tokens * 1.2)
-    
+
     # Haiku model árak
     input_cost = (total_input_tokens / 1_000_000) * 0.25  # $0.25/1M token
     output_cost = (total_output_tokens / 1_000_000) * 1.25  # $1.25/1M token
-    
+
     return input_cost, output_cost
 
-def batch_translate_texts(texts: List[str], target_lang: str, model: str = 'claude-3-haiku-20240307', batch_size: int = 10) -> List[str]:
+def language_name(lang: str) -> str:
+    """A nyelvkód angol neve a prompthoz (pl. 'hu' -> 'Hungarian'); ismeretlen kódnál maga a bemenet"""
+    from language_tags import tags
+    language = tags.language(lang) if lang else None
+    if language is not None and language.description:
+        return language.description[0]
+    return lang
+
+def build_system_prompt(target_lang: str, hints=None, strict: bool = False) -> str:
     """
-    Szövegek fordítása batch-ekben
-    :param texts: Fordítandó szövegek listája
-    :param target_lang: Célnyelv
-    :param model: AI modell neve
-    :param batch_size: Egy batch-ben hány szöveget fordítsunk
-    :return: Lefordított szövegek listája
+    A fordítói system prompt az adott célnyelvre.
+    :param hints: korábbi, hasonló szövegek (forrás, fordítás) párjai a fordítási memóriából (few-shot)
+    :param strict: szigorúbb formai utasítás az elutasított válaszok újrakéréséhez
     """
-    print_safe("\nInitializing translation...")
-    
+    prompt = f"""You are a professional translator. Follow these rules:
+1. Keep technical terms and proper nouns unchanged
+2. Use appropriate gaming terminology
+3. Keep the translation natural but maintain the sci-fi atmosphere
+4. ONLY return the translation, no explanations
+5. Keep the same formatting (capitalization, punctuation)
+6. Translate to {language_name(target_lang)} with proper {language_name(target_lang)} grammar and terminology"""
+    if hints:
+        examples = "\n".join(f"{json.dumps(source, ensure_ascii=False)} -> {json.dumps(target, ensure_ascii=False)}"
+                             for source, target in hints)
+        prompt += f"\n7. Stay consistent with these earlier translations of similar texts:\n{examples}"
+    if strict:
+        prompt += (f"\n\nIMPORTANT: Reply with the complete {language_name(target_lang)} translation only. "
+                   "No introduction, notes, explanations, quotes or code fences.")
+    return prompt
+
+def build_multi_system_prompt(target_langs: List[str]) -> str:
+    """System prompt, amely egy hívásban több célnyelvre kér fordítást JSON objektumként"""
+    languages = ", ".join(f"{language_name(lang)} ({lang})" for lang in target_langs)
+    return f"""You are a professional translator. Follow these rules:
+1. Keep technical terms and proper nouns unchanged
+2. Use appropriate gaming terminology
+3. Keep the translation natural but maintain the sci-fi atmosphere
+4. Keep the same formatting (capitalization, punctuation)
+5. Translate into each of these languages with proper grammar and terminology: {languages}
+6. ONLY return a JSON object that maps each language code to its translation, no explanations"""
+
+def get_client():
+    """Az Anthropic kliens, futásonként egyszer létrehozva; None, ha nincs API kulcs"""
+    global _client
+    if _client is not None:
+        return _client
+
+    import anthropic
+    from dotenv import load_dotenv
+
     # Betöltjük a környezeti változókat
     load_dotenv()
     api_key = os.getenv("ANTHROPIC_API_KEY")
-    
+
     if not api_key:
-        print_safe("Error: No API key found in .env file")
-        return texts
-        
-    print_safe("API key loaded successfully")
-    
+        logging.error("No API key found in .env file")
+        return None
+
+    logging.debug("API key loaded successfully")
+
     try:
-        client = anthropic.Client(
+        _client = anthropic.Client(
             api_key=api_key,
         )
     except Exception as e:
-        print_safe(f"Error initializing Anthropic client: {str(e)}")
+        logging.error("Error initializing Anthropic client: %s", e)
+        return None
+    return _client
+
+def _extract_text(text: str) -> str:
+    """Ha a szöveg egy TextBlock objektum stringje, vegyük ki belőle a szöveget"""
+    if isinstance(text, str) and "[TextBlock" in text:
+        try:
+            text_start = text.find('text=') + 6
+            text_end = text.find("', type=") if "', type=" in text else text.find('", type=')
+            if text_start > 5 and text_end > text_start:
+                text = text[text_start:text_end].strip('"\'')
+        except:
+            pass
+    return text
+
+def _response_text(message) -> str:
+    # Extract text from TextBlock response
+    response = message.content
+    if isinstance(response, list) and len(response) > 0:
+        return response[0].text
+    return str(response)
+
+# Modellenkénti árak (input, output) $/1M token; ismeretlen modellnél a Haiku árával számolunk
+MODEL_PRICES = {
+    'claude-3-haiku-20240307': (0.25, 1.25),
+    'claude-3-5-haiku-20241022': (0.80, 4.00),
+    'claude-3-sonnet-20240229': (3.00, 15.00),
+    'claude-3-5-sonnet-20240620': (3.00, 15.00),
+    'claude-3-5-sonnet-20241022': (3.00, 15.00),
+    'claude-3-opus-20240229': (15.00, 75.00),
+}
+
+def _segment_cost(source: str, translated: str, model: str = 'claude-3-haiku-20240307') -> float:
+    return _tokens_cost(count_tokens(source), count_tokens(translated), model)
+
+def _tokens_cost(input_tokens: int, output_tokens: int, model: str) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES['claude-3-haiku-20240307'])
+    return (input_tokens / 1_000_000 * input_price) + (output_tokens / 1_000_000 * output_price)
+
+def new_usage() -> dict:
+    """Egy szegmens fordításának felhasználása: kérések, tokenek és becsült költség ($)"""
+    return {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0}
+
+def _add_usage(usage: dict, message, source: str, translated: str, model: str):
+    """A válasz usage adatai (ha az SDK visszaadja), különben tokenbecslés a szövegekből"""
+    reported = getattr(message, 'usage', None)
+    input_tokens = getattr(reported, 'input_tokens', None)
+    output_tokens = getattr(reported, 'output_tokens', None)
+    if not isinstance(input_tokens, int) or not isinstance(output_tokens, int):
+        input_tokens, output_tokens = count_tokens(source), count_tokens(translated)
+    usage['requests'] += 1
+    usage['input_tokens'] += input_tokens
+    usage['output_tokens'] += output_tokens
+    usage['cost'] += _tokens_cost(input_tokens, output_tokens, model)
+
+def request_translation(client, text: str, target_lang: str, model: str, hints=None, max_tokens: int = 1000,
+                        strict: bool = False, usage: dict = None) -> Tuple[str, str]:
+    """
+    Egy szöveg fordítása egy célnyelvre; :return: (fordítás, stop_reason), hiba esetén kivételt dob
+    :param usage: ha meg van adva, a hívás tokenjei és költsége hozzáadódnak
+    """
+    message = caller.create(
+        client,
+        max_tokens=max_tokens,
+        model=model,
+        temperature=0,
+        system=build_system_prompt(target_lang, hints, strict),
+        messages=[
+            {
+                "role": "user",
+                "content": f"Translate this text to {language_name(target_lang)}:\n{text}"
+            }
+        ]
+    )
+    translated = _response_text(message)
+    if usage is not None:
+        _add_usage(usage, message, text, translated, model)
+    return translated, getattr(message, 'stop_reason', None)
+
+def translate_one(client, text: str, target_lang: str, model: str, hints=None) -> str:
+    """Egy szöveg fordítása egy célnyelvre, hiba esetén kivételt dob"""
+    return request_translation(client, text, target_lang, model, hints)[0]
+
+def _reject(problems: List[str]):
+    metrics.incr('response.rejected')
+    for problem in problems:
+        metrics.incr(f"response.{problem}")
+
+def retry_rejected(client, text: str, target_lang: str, model: str, problems: List[str], hints=None,
+                   usage: dict = None, source: str = None) -> str:
+    """
+    Egy elutasított válaszú szegmens újrakérése szigorúbb prompttal és próbálkozásonként kétszeres max_tokens-szel.
+    :param source: a hívó eredeti szövege (ha a text ebből kinyert), ezzel rögzítjük a visszaesést
+    :return: a fordítás; ha egyik próbálkozás sem felel meg, a forrásszöveg
+    """
+    max_tokens = 1000
+    for attempt in range(RESPONSE_RETRIES):
+        max_tokens *= 2
+        metrics.incr('response.retried')
+        try:
+            translated, stop_reason = request_translation(client, text, target_lang, model, hints, max_tokens,
+                                                          strict=True, usage=usage)
+        except Exception as e:
+            logging.warning("Error retrying rejected translation: %s", e)
+            break
+        problems = check_response(text, translated, target_lang, stop_reason)
+        if not problems:
+            metrics.incr('response.recovered')
+            return translated
+    metrics.incr('response.unrecovered')
+    logging.warning("Translation rejected (%s), using original text instead: %s", ", ".join(problems), text[:80])
+    fallbacks.record(source or text, target_lang)
+    return text
+
+def translate_one_multi(client, text: str, target_langs: List[str], model: str) -> Dict[str, str]:
+    """
+    Egy szöveg fordítása több célnyelvre egyetlen hívásban.
+    Csak a válaszban ténylegesen szereplő nyelveket adja vissza.
+    """
+    message = caller.create(
+        client,
+        max_tokens=1000 * len(target_langs),
+        model=model,
+        temperature=0,
+        system=build_multi_system_prompt(target_langs),
+        messages=[
+            {
+                "role": "user",
+                "content": f"Translate this text into {', '.join(target_langs)}:\n{text}"
+            }
+        ]
+    )
+    raw = _response_text(message).strip()
+    # A modell néha ```json blokkba teszi a választ
+    raw = re.sub(r'^```(?:json)?\s*|\s*```$', '', raw)
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError:
+        logging.debug("Multi-language response is not valid JSON: %s", raw)
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {lang: parsed[lang] for lang in target_langs if isinstance(parsed.get(lang), str)}
+
+def translate_stream(texts: Iterable[str], target_lang: str, model: str = 'claude-3-haiku-20240307',
+                     batch_size: int = 10, hints: List = None, client=None) -> Iterator[Tuple[int, str, dict]]:
+    """
+    Szövegek fordítása generátorként: minden szegmens (index, fordítás, usage) hármasként jön vissza,
+    amint elkészült, így a hívó menet közben alkalmazhatja, mentheti vagy kiírhatja az eredményt.
+    A bemenetet batch_size méretű ablakokban olvassuk (tetszőleges iterálható, pl. egy fájl soronként),
+    a memóriában egyszerre csak egy ablak van.
+    Az elutasított válaszú szegmenseket az ablak végén kérjük újra, így azok később (nem index sorrendben) jönnek.
+    Hibánál vagy kliens nélkül a forrásszöveg jön vissza.
+    :param hints: A szövegekkel azonos sorrendű lista, elemei None vagy (forrás, fordítás) párok listája
+    """
+    client = client or get_client()
+    texts = iter(texts)
+    first = 0
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        logging.debug("Processing batch %d", first // batch_size + 1)
+        rejected = []
+        for index, text in enumerate(batch, first):
+            usage = new_usage()
+            if client is None or not text.strip():
+                if client is None and text.strip():
+                    fallbacks.record(text, target_lang)
+                progress.advance()
+                yield index, text, usage
+                continue
+
+            source = text
+            text = _extract_text(text)
+            hint = hints[index] if hints else None
+            try:
+                logging.debug("Translating text: %s", text)
+                translated_text, stop_reason = request_translation(client, text, target_lang, model, hint, usage=usage)
+                logging.debug("Translated segment", extra={'source': text, 'translation': translated_text, 'lang': target_lang})
+            except Exception as e:
+                logging.warning("Error translating text, using original text instead: %s", e)
+                fallbacks.record(source, target_lang)
+                progress.advance()
+                yield index, text, usage
+                continue
+
+            problems = check_response(text, translated_text, target_lang, stop_reason)
+            if problems:
+                logging.debug("Rejected translation (%s): %s", ", ".join(problems), translated_text)
+                _reject(problems)
+                rejected.append((index, source, text, hint, problems, usage))
+                continue
+            progress.advance()
+            yield index, translated_text, usage
+
+        # Csak az elutasított válaszú szegmenseket kérjük újra, az ablak többi fordítása már kiment
+        for index, source, text, hint, problems, usage in rejected:
+            translated_text = retry_rejected(client, text, target_lang, model, problems, hint, usage, source)
+            progress.advance()
+            yield index, translated_text, usage
+        first += len(batch)
+
+def batch_translate_texts(texts: List[str], target_lang: str, model: str = 'claude-3-haiku-20240307', batch_size: int = 10,
+                          hints: List = None) -> List[str]:
+    """
+    Szövegek fordítása batch-ekben (a translate_stream eredményeinek összegyűjtése)
+    :param texts: Fordítandó szövegek listája
+    :param target_lang: Célnyelv
+    :param model: AI modell neve
+    :param batch_size: Egy batch-ben hány szöveget fordítsunk
+    :param hints: A szövegekkel azonos sorrendű lista, elemei None vagy (forrás, fordítás) párok listája
+    :return: Lefordított szövegek listája
+    """
+    logging.debug("Initializing translation...")
+
+    client = get_client()
+    if client is None:
+        for text in texts:
+            fallbacks.record(text, target_lang)
         return texts
-    
+
     # Költségbecslés
     total_texts = len(texts)
     total_batches = (total_texts + batch_size - 1) // batch_size
-    print_safe(f"\nTotal texts to translate: {total_texts}")
-    print_safe(f"Will process in {total_batches} batches of {batch_size} texts each")
-    
+    logging.debug("Total texts to translate: %d in %d batches of %d", total_texts, total_batches, batch_size)
+
     input_cost, output_cost = estimate_cost(texts)
     total_cost = input_cost + output_cost
-    print_safe(f"\nEstimated costs:")
-    print_safe(f"Input cost: ${input_cost:.3f}")
-    print_safe(f"Output cost: ${output_cost:.3f}")
-    print_safe(f"Total estimated cost: ${total_cost:.3f}")
-    
-    # Ha a költség $1 alatt van, automatikusan elfogadjuk
-    if total_cost < 1.0:
-        print_safe("\nCost is under $1, automatically proceeding with translation...")
-        response = 'y'
-    else:
-        response = 'y'  # Automatikusan elfogadjuk a fordítást
-        print_safe("\nAutomatically proceeding with translation...")
-    
-    if response.lower() != 'y':
-        print_safe("Translation cancelled by user")
-        return texts
+    logging.debug("Estimated costs: input $%.3f, output $%.3f, total $%.3f", input_cost, output_cost, total_cost)
+    if total_cost >= 1.0:
+        logging.info("Estimated cost $%.3f, automatically proceeding with translation...", total_cost)
 
-    translated_texts = []
+    translated_texts = list(texts)
     current_cost = 0.0
-    
-    # Batch-ekben fordítjuk a szövegeket
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        print_safe(f"\nProcessing batch {i//batch_size + 1}/{total_batches}")
-        
-        batch_translations = []
-        for text in batch:
-            if not text.strip():
-                batch_translations.append(text)
-                continue
-            
-            # Ha a szöveg egy TextBlock objektum stringje, vegyük ki belőle a szöveget
-            if isinstance(text, str) and "[TextBlock" in text:
-                try:
-                    text_start = text.find('text=') + 6
-                    text_end = text.find("', type=") if "', type=" in text else text.find('", type=')
-                    if text_start > 5 and text_end > text_start:
-                        text = text[text_start:text_end].strip('"\'')
-                except:
-                    pass
-            
-            try:
-                print_safe(f"\nTranslating text: {text}")
-                
-                message = client.messages.create(
-                    max_tokens=1000,
-                    model=model,
-                    temperature=0,
-            system="""You are a professional translator. Follow these rules:
-1. Keep technical terms and proper nouns unchanged
-2. Use appropriate gaming terminology
-3. Keep the translation natural but maintain the sci-fi atmosphere
-4. ONLY return the translation, no explanations
-5. Keep the same formatting (capitalization, punctuation)
-6. Translate to Hungarian with proper Hungarian grammar and terminology""",
-            messages=[
-                {
-                    "role": "user", 
-                    "content": f"Translate this text to Hungarian:\n{text}"
-                }
-            ]
-                )
-                
-                # Extract text from TextBlock response
-                response = message.content
-                if isinstance(response, list) and len(response) > 0:
-                    translated_text = response[0].text
-                else:
-                    translated_text = str(response)
-                
-                print_safe(f"Original: {text}")
-                print_safe(f"Translated: {translated_text}")
-                batch_translations.append(translated_text)
-                
-                # Költség számítás
-                input_tokens = count_tokens(text)
-                output_tokens = count_tokens(translated_text)
-                batch_cost = (input_tokens / 1_000_000 * 0.25) + (output_tokens / 1_000_000 * 1.25)
-                current_cost += batch_cost
-                
-            except Exception as e:
-                print_safe(f"Error translating text: {str(e)}")
-                print_safe("Using original text instead")
-                batch_translations.append(text)
-        
-        translated_texts.extend(batch_translations)
-        
+    done = 0
+    for index, translated_text, usage in translate_stream(texts, target_lang, model, batch_size, hints, client):
+        translated_texts[index] = translated_text
+        current_cost += usage['cost']
+        done += 1
         # Minden 10. batch után költségjelentés
-        if (i//batch_size + 1) % 10 == 0:
-            print_safe(f"\nProgress: {len(translated_texts)}/{total_texts} texts translated")
-            print_safe(f"Current cost: ${current_cost:.3f}")
-            print_safe(f"Estimated remaining cost: ${(total_cost - current_cost):.3f}")
-    
-    print_safe(f"\nTranslation completed!")
-    print_safe(f"Final cost: ${current_cost:.3f}")
-    
+        if done % (batch_size * 10) == 0:
+            logging.debug("Progress: %d/%d texts translated, current cost $%.3f, estimated remaining $%.3f",
+                          done, total_texts, current_cost, total_cost - current_cost)
+
+    logging.debug("Translation completed, final cost $%.3f", current_cost)
+
     return translated_texts
+
+def batch_translate_multi(texts: List[str], target_langs: List[str], model: str = 'claude-3-haiku-20240307',
+                          batch_size: int = 10, langs_per_call: int = 1, hints: Dict = None) -> Dict[str, List[str]]:
+    """
+    Ugyanazon szövegek fordítása több célnyelvre.
+    :param langs_per_call: Egy API hívásban legfeljebb ennyi nyelvre kérünk fordítást
+    :param hints: Nyelvkód -> a batch_translate_texts hints listája (csak a nyelvenkénti kéréseknél használjuk)
+    :return: Nyelvkód -> lefordított szövegek listája (a bemenettel azonos sorrendben)
+    """
+    hints = hints or {}
+    if langs_per_call <= 1 or len(target_langs) == 1:
+        return {lang: batch_translate_texts(texts, lang, model, batch_size, hints.get(lang)) for lang in target_langs}
+
+    client = get_client()
+    if client is None:
+        for text in texts:
+            for lang in target_langs:
+                fallbacks.record(text, lang)
+        return {lang: list(texts) for lang in target_langs}
+
+    results = {lang: [None] * len(texts) for lang in target_langs}
+    missing = {lang: [] for lang in target_langs}
+    groups = [target_langs[i:i+langs_per_call] for i in range(0, len(target_langs), langs_per_call)]
+
+    for index, text in enumerate(texts):
+        if not text.strip():
+            for lang in target_langs:
+                results[lang][index] = text
+            progress.advance(len(target_langs))
+            continue
+        source = _extract_text(text)
+        for group in groups:
+            try:
+                translated = translate_one_multi(client, source, group, model)
+            except Exception as e:
+                logging.warning("Error translating text into %s: %s", ",".join(group), e)
+                translated = {}
+            for lang in group:
+                problems = check_response(source, translated[lang], lang) if lang in translated else None
+                if problems:
+                    _reject(problems)
+                if lang in translated and not problems:
+                    results[lang][index] = translated[lang]
+                    progress.advance()
+                else:
+                    missing[lang].append(index)
+
+    # Amit a több-nyelvű válasz nem tartalmazott, azt nyelvenként külön kérjük le
+    for lang, indexes in missing.items():
+        if not indexes:
+            continue
+        logging.debug("Falling back to single-language requests for %d texts in %s", len(indexes), lang)
+        lang_hints = hints.get(lang)
+        fallback = batch_translate_texts([texts[i] for i in indexes], lang, model, batch_size,
+                                         [lang_hints[i] for i in indexes] if lang_hints else None)
+        for i, translated in zip(indexes, fallback):
+            results[lang][i] = translated
+
+    return results
@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import struct
+import hashlib
+import logging
+import threading
+from collections import Counter
+from .validation import PLACEHOLDER_PATTERN
+
+# Számok és helyőrzők: ha két szöveg csak ezekben tér el, a korábbi fordítás közvetlenül átírható
+VARIABLE_PATTERN = re.compile(PLACEHOLDER_PATTERN.pattern + r'|\d+(?:[.,]\d+)*')
+
+_HASHES = struct.Struct('<32H')
+
+
+def lang_key(code: str) -> str:
+    """A memória nyelvkulcsa: kisbetűs, kötőjeles kód a régióval együtt (pt_BR, pt-BR -> pt-br)"""
+    return code.strip().lower().replace('_', '-')
+
+
+def skeleton(text: str) -> str:
+    """A szöveg a számok és helyőrzők nélkül (azok helyén egy jelölővel)"""
+    return VARIABLE_PATTERN.sub('\x00', text)
+
+
+def shingles(text: str, size: int = 3) -> set:
+    text = ' '.join(VARIABLE_PATTERN.sub('#', text.lower()).split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def similarity(a: set, b: set) -> float:
+    """Jaccard hasonlóság két shingle halmaz között"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def adapt_translation(source: str, target: str, query: str):
+    """
+    Ha a query csak számokban/helyőrzőkben tér el a source-tól, a target megfelelő részeit lecseréli.
+    Csak egyértelmű esetben (az eltérő érték a forrásban és a fordításban is pontosan egyszer szerepel),
+    különben None.
+    """
+    source_vars = VARIABLE_PATTERN.findall(source)
+    query_vars = VARIABLE_PATTERN.findall(query)
+    if len(source_vars) != len(query_vars) or skeleton(source) != skeleton(query):
+        return None
+    spans = []
+    for old, new in zip(source_vars, query_vars):
+        if old == new:
+            continue
+        if source_vars.count(old) != 1:
+            return None
+        # Számoknál ne találjunk bele egy hosszabb számba (3 a 13-ban)
+        matches = list(re.finditer(r'(?<![\d.,])' + re.escape(old) + r'(?![\d])', target))
+        if len(matches) != 1:
+            return None
+        spans.append((matches[0].start(), matches[0].end(), new))
+    for start, end, new in sorted(spans, reverse=True):
+        target = target[:start] + new + target[end:]
+    return target
+
+
+class MinHashIndex:
+    """
+    MinHash LSH index karakter-trigramokon: a hasonló szövegek jelöltjeit a teljes memória
+    végigolvasása nélkül (sávonkénti hash vödrökből) adja vissza.
+    Trigramonként egyetlen blake2b hívás adja mind a 32 (16 bites) hash értéket.
+    16 sáv x 2 sor mellett egy 0,5-ös Jaccard hasonlóságú szöveg ~99% eséllyel lesz jelölt; a sok gyenge
+    jelöltből a legtöbb sávban egyezőket ellenőrizzük pontos hasonlósággal.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 2):
+        if bands * rows > 32:
+            raise ValueError("At most 32 hash values are available per shingle")
+        self.rows = rows
+        self.buckets = [{} for _ in range(bands)]
+        # A trigramok készlete korlátos, a hash értékeiket újraszámolás helyett megjegyezzük
+        self._gram_hashes = {}
+
+    def _hashes(self, gram: str) -> tuple:
+        hashes = self._gram_hashes.get(gram)
+        if hashes is None:
+            hashes = self._gram_hashes[gram] = _HASHES.unpack(
+                hashlib.blake2b(gram.encode('utf-8'), digest_size=64).digest())
+        return hashes
+
+    def signature(self, grams: set) -> list:
+        return list(map(min, zip(*map(self._hashes, grams))))
+
+    def _bands(self, grams: set):
+        signature = self.signature(grams)
+        rows = self.rows
+        return [tuple(signature[i * rows:(i + 1) * rows]) for i in range(len(self.buckets))]
+
+    def add(self, item, grams: set):
+        for bucket, band in zip(self.buckets, self._bands(grams)):
+            bucket.setdefault(band, []).append(item)
+
+    def candidates(self, grams: set, limit: int = 20) -> list:
+        """A legtöbb sávban egyező legfeljebb `limit` jelölt"""
+        found = Counter()
+        for bucket, band in zip(self.buckets, self._bands(grams)):
+            found.update(bucket.get(band, ()))
+        return [item for item, _ in found.most_common(limit)]
+
+
+class TranslationMemory:
+    """
+    Pontos egyezésű fordítási memória: (forrásszöveg, célnyelv) -> fordítás.
+    A memóriában egy szótár, a lemezen egy hozzáfűzős JSON-lines fájl, így egy megszakított
+    futás sem veszít el már kifizetett fordítást. Csak az ellenőrzésen átment fordítások kerülnek bele.
+    Elérési út nélkül (alapértelmezés) ki van kapcsolva.
+    A derived kulcsok régiós fordításból származtatott, régió nélküli tartalék bejegyzések (pt-br -> pt):
+    pontos bejegyzést nem írnak felül, és exportkor kimaradnak.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.path = None
+        self.entries = {}
+        self.derived = set()
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_reused = 0
+        self.fuzzy_hinted = 0
+        self._file = None
+        self._fuzzy = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def configure(self, path: str = None):
+        """Betölti a memóriát a fájlból (ha létezik), és megnyitja hozzáfűzésre"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            self.entries = {}
+            self.derived = set()
+            self.hits = 0
+            self.misses = 0
+            self.fuzzy_reused = 0
+            self.fuzzy_hinted = 0
+            self._fuzzy = {}
+            if path is None:
+                return
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line_no, line in enumerate(f, 1):
+                        try:
+                            entry = json.loads(line)
+                            key = (entry['source'], lang_key(entry['lang']))
+                            self.entries[key] = entry['target']
+                            if entry.get('derived'):
+                                self.derived.add(key)
+                            else:
+                                self.derived.discard(key)
+                        except (json.JSONDecodeError, KeyError, TypeError):
+                            logging.warning("Skipping invalid translation memory line %d in %s", line_no, path)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+        logging.info("Translation memory %s: %d entries", path, len(self.entries))
+
+    def get(self, source: str, lang: str):
+        if self.path is None:
+            return None
+        lang = lang_key(lang)
+        with self._lock:
+            target = self.entries.get((source, lang))
+            if target is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return target
+
+    def put(self, source: str, lang: str, target: str, model: str = None):
+        if self.path is None or not source.strip():
+            return
+        lang = lang_key(lang)
+        with self._lock:
+            if self.entries.get((source, lang)) == target and (source, lang) not in self.derived:
+                return
+            self.entries[(source, lang)] = target
+            self.derived.discard((source, lang))
+            if lang in self._fuzzy:
+                self._index_entry(self._fuzzy[lang], source)
+            record = {'source': source, 'lang': lang, 'target': target}
+            if model:
+                record['model'] = model
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def put_many(self, records, model: str = None, derived: bool = False) -> int:
+        """
+        Tömeges betöltés (pl. importált párhuzamos fájlokból): (forrás, nyelv, fordítás) hármasok,
+        egyetlen zárolással és egyetlen lemezre írással. :return: az új vagy megváltozott bejegyzések száma
+        :param derived: származtatott tartalék bejegyzések, csak még nem létező kulcsra kerülnek be
+        """
+        if self.path is None:
+            return 0
+        lines = []
+        with self._lock:
+            for source, lang, target in records:
+                lang = lang_key(lang)
+                key = (source, lang)
+                if not source.strip():
+                    continue
+                if derived and key in self.entries:
+                    continue
+                if not derived and self.entries.get(key) == target and key not in self.derived:
+                    continue
+                self.entries[key] = target
+                if derived:
+                    self.derived.add(key)
+                else:
+                    self.derived.discard(key)
+                if lang in self._fuzzy:
+                    self._index_entry(self._fuzzy[lang], source)
+                record = {'source': source, 'lang': lang, 'target': target}
+                if model:
+                    record['model'] = model
+                if derived:
+                    record['derived'] = True
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.writelines(lines)
+            self._file.flush()
+        return len(lines)
+
+    @staticmethod
+    def _index_entry(index, source: str):
+        index['skeletons'].setdefault(skeleton(source), []).append(source)
+        index['minhash'].add(source, shingles(source))
+
+    def _fuzzy_index(self, lang: str) -> dict:
+        """Nyelvenkénti fuzzy index, az első fuzzy keresésnél felépítve, utána a put() bővíti"""
+        index = self._fuzzy.get(lang)
+        if index is None:
+            index = self._fuzzy[lang] = {'skeletons': {}, 'minhash': MinHashIndex()}
+            for source, entry_lang in self.entries:
+                if entry_lang == lang:
+                    self._index_entry(index, source)
+        return index
+
+    def fuzzy(self, source: str, lang: str, threshold: float = 0.5, limit: int = 2):
+        """
+        Közel azonos korábbi fordítások keresése.
+        :return: ('reuse', fordítás), ha csak számokban/helyőrzőkben tér el egy korábbi szövegtől;
+                 ('hints', [(forrás, fordítás), ...]) a legjobb `limit` hasonló párral; vagy None
+        """
+        if self.path is None or not source.strip():
+            return None
+        lang = lang_key(lang)
+        with self._lock:
+            index = self._fuzzy_index(lang)
+            for candidate in index['skeletons'].get(skeleton(source), ()):
+                adapted = adapt_translation(candidate, self.entries[(candidate, lang)], source)
+                if adapted is not None:
+                    self.fuzzy_reused += 1
+                    return 'reuse', adapted
+            grams = shingles(source)
+            scored = sorted(((similarity(grams, shingles(candidate)), candidate)
+                             for candidate in index['minhash'].candidates(grams) if candidate != source),
+                            reverse=True)
+            hints = [(candidate, self.entries[(candidate, lang)]) for score, candidate in scored[:limit]
+                     if score >= threshold]
+            if hints:
+                self.fuzzy_hinted += 1
+                return 'hints', hints
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                    'fuzzy_reused': self.fuzzy_reused, 'fuzzy_hinted': self.fuzzy_hinted}
+
+    def close(self):
+        self.configure(None)
+
+
+memory = TranslationMemory()
@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import logging
+import xml.etree.ElementTree as ET
+from collections import Counter, namedtuple
+from .ini_engine import read_ini
+from .language_utils import language_suffix, plausible_language
+
+Issue = namedtuple('Issue', 'severity code key message')
+
+XLIFF_NS = '{urn:oasis:names:tc:xliff:document:1.2}'
+
+# Helyőrzők és jelölések, amelyeknek a fordításban változatlanul meg kell maradniuk:
+# {0} {name} ${var} %s %1$d %.2f <b> </b> <br/> és a \n, \t escape-ek.
+# A printf szóköz flagjét nem fogadjuk el, különben a francia "50 % de remise" '% d' helyőrzőnek látszana.
+PLACEHOLDER_PATTERN = re.compile(
+    r'\$\{[^}]+\}'
+    r'|\{[^{}\s]*\}'
+    r'|%(?:\d+\$)?[-+0#]*\d*(?:\.\d+)?[sdifuxXeEgGc]'
+    r'|</?[A-Za-z][^<>]*>'
+    r'|\\[nrt]'
+)
+
+SUPPORTED_EXTENSIONS = ('.json', '.ini', '.xml', '.xlf', '.txt', '.md', '.markdown')
+
+
+def placeholders(text: str) -> Counter:
+    return Counter(PLACEHOLDER_PATTERN.findall(text))
+
+
+def check_segment(source: str, target: str, key: str = None):
+    """
+    Egy forrás-cél szegmenspár ellenőrzése.
+    error: üres fordítás, eltérő helyőrzők/tagek, TextBlock maradvány
+    warning: a fordítás azonos a több szavas forrással (valószínűleg lefordítatlan)
+    """
+    issues = []
+    if source.strip() and not (target or '').strip():
+        issues.append(Issue('error', 'empty', key, "translation is empty"))
+        return issues
+    if "[TextBlock" in target:
+        issues.append(Issue('error', 'textblock', key, "translation contains a TextBlock repr"))
+    source_placeholders = placeholders(source)
+    target_placeholders = placeholders(target)
+    if source_placeholders != target_placeholders:
+        missing = sorted((source_placeholders - target_placeholders).elements())
+        extra = sorted((target_placeholders - source_placeholders).elements())
+        issues.append(Issue('error', 'placeholders', key, f"placeholders differ (missing {missing}, extra {extra})"))
+    if target.strip() == source.strip() and len(re.findall(r'[^\W\d_]{2,}', source)) >= 3:
+        issues.append(Issue('warning', 'untranslated', key, "translation is identical to the source"))
+    return issues
+
+
+# A modell magyarázata vagy bevezetője a fordítás helyett/mellett
+EXPLANATION_PATTERN = re.compile(
+    r"^\s*(?:here(?:'s| is) (?:the |a |your )?translation|translation\s*:|sure[,!]|certainly[,!]|i (?:can't|cannot|am unable))"
+    r"|\n\s*(?:notes?|explanation)\s*:", re.IGNORECASE)
+
+# A fordítás/forrás hosszarány elfogadott tartománya (legalább MIN_RATIO_CHARS hosszú forrásnál)
+MIN_RATIO, MAX_RATIO = 0.25, 4.0
+MIN_RATIO_CHARS = 20
+
+# Kínai, japán és koreai írásjegyek (és teljes szélességű írásjelek): egy jegy nagyjából egy szónyi
+# információ, ezért a hosszarányban DENSE_SCRIPT_WEIGHT latin karakternek számítanak
+DENSE_SCRIPT = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+DENSE_SCRIPT_WEIGHT = 3
+
+
+def text_width(text: str) -> int:
+    """A szöveg hossza latin karakterekben mérve (a CJK jegyek DENSE_SCRIPT_WEIGHT-szeres súllyal)"""
+    text = text.strip()
+    return len(text) + (DENSE_SCRIPT_WEIGHT - 1) * len(DENSE_SCRIPT.findall(text))
+
+
+def check_response(source: str, target: str, target_lang: str, stop_reason: str = None) -> list:
+    """
+    A modell válaszának ellenőrzése, mielőtt fordításként elfogadnánk.
+    :return: a hibák kódjai (truncated, format, ratio, language); üres lista, ha a válasz elfogadható
+    """
+    problems = []
+    if stop_reason == 'max_tokens':
+        problems.append('truncated')
+    if ("[TextBlock" in target
+            or (target.lstrip().startswith('```') and not source.lstrip().startswith('```'))
+            or (EXPLANATION_PATTERN.search(target) and not EXPLANATION_PATTERN.search(source))):
+        problems.append('format')
+    # Az arányt írásrendszertől függő szélességgel számoljuk, így a rövid CJK fordítás nem "csonka"
+    source_length = text_width(source)
+    if source_length >= MIN_RATIO_CHARS:
+        ratio = text_width(target) / source_length
+        if not MIN_RATIO <= ratio <= MAX_RATIO:
+            problems.append('ratio')
+    elif text_width(target) > MAX_RATIO * MIN_RATIO_CHARS:
+        # Rövid forrásra hosszú válasz: jellemzően magyarázat
+        problems.append('ratio')
+    if target_lang and not plausible_language(PLACEHOLDER_PATTERN.sub(' ', target), target_lang):
+        problems.append('language')
+    return problems
+
+
+def gate_failures(sources, translations) -> dict:
+    """
+    Olcsó ellenőrzés írás előtt: a hibás szegmensek indexei és hibái.
+    A figyelmeztetések (pl. változatlan szöveg) nem okoznak újrafordítást.
+    """
+    failures = {}
+    for index, (source, target) in enumerate(zip(sources, translations)):
+        if target is None:
+            continue
+        errors = [issue for issue in check_segment(source, target) if issue.severity == 'error']
+        if errors:
+            failures[index] = errors
+    return failures
+
+
+def _flatten_json(node, parent_key, segments, issues):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            _flatten_json(value, f"{parent_key}.{key}" if parent_key else key, segments, issues)
+    elif isinstance(node, list):
+        for i, item in enumerate(node):
+            _flatten_json(item, f"{parent_key}[{i}]", segments, issues)
+    elif isinstance(node, str):
+        segments[parent_key] = node
+
+
+def load_segments(file_path: str):
+    """
+    Beolvassa a fájlt, és visszaadja a szegmenseit (kulcs -> szöveg) és a szintaktikai hibákat.
+    A kulcsok formátuma megegyezik a fájlfeldolgozókéval.
+    """
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
+    segments = {}
+    issues = []
+    try:
+        if ext == '.json':
+            def pairs_hook(pairs):
+                seen = set()
+                for key, _ in pairs:
+                    if key in seen:
+                        issues.append(Issue('error', 'duplicate-key', key, "duplicate key in object"))
+                    seen.add(key)
+                return dict(pairs)
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f, object_pairs_hook=pairs_hook)
+            _flatten_json(data, '', segments, issues)
+        elif ext == '.ini':
+            document = read_ini(file_path)
+            for entry in document.entries:
+                key = document.entry_id(entry)
+                if key in segments:
+                    issues.append(Issue('warning', 'duplicate-key', key, f"duplicate key on line {entry.line}"))
+                    continue
+                segments[key] = document.value(entry)
+        elif ext == '.xlf':
+            root = ET.parse(file_path).getroot()
+            for i, unit in enumerate(root.iter(f'{XLIFF_NS}trans-unit')):
+                target = unit.find(f'{XLIFF_NS}target')
+                segments[unit.get('id', str(i))] = (target.text or '') if target is not None else ''
+        elif ext == '.xml':
+            root = ET.parse(file_path).getroot()
+            elements = [elem for elem in root.iter() if elem.text and elem.text.strip()]
+            for i, elem in enumerate(elements):
+                segments[f"{elem.tag}[{i}]"] = elem.text
+        elif ext in ('.txt', '.md', '.markdown'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                segments['content'] = f.read()
+    except json.JSONDecodeError as e:
+        issues.append(Issue('error', 'syntax', None, f"JSON error at line {e.lineno}, column {e.colno}: {e.msg}"))
+    except ET.ParseError as e:
+        issues.append(Issue('error', 'syntax', None, f"XML error: {e}"))
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        issues.append(Issue('error', 'syntax', None, str(e)))
+    return segments, issues
+
+
+def check_xliff(file_path: str):
+    """XLIFF esetén a forrás és a cél egy fájlban van: trans-unitonként vetjük össze őket"""
+    issues = []
+    try:
+        root = ET.parse(file_path).getroot()
+    except ET.ParseError as e:
+        return [Issue('error', 'syntax', None, f"XML error: {e}")]
+    for i, unit in enumerate(root.iter(f'{XLIFF_NS}trans-unit')):
+        key = unit.get('id', str(i))
+        source = unit.find(f'{XLIFF_NS}source')
+        target = unit.find(f'{XLIFF_NS}target')
+        if source is None or not (source.text or '').strip():
+            continue
+        if target is None:
+            issues.append(Issue('error', 'missing-key', key, "trans-unit has no target"))
+            continue
+        issues.extend(check_segment(source.text, target.text or '', key))
+    return issues
+
+
+def compare_files(source_path: str, target_path: str):
+    """
+    Forrás és célnyelvi fájl szerkezeti egyezése: ugyanazok a kulcsok, és kulcsonként
+    ugyanazok a helyőrzők/tagek, nincs üres vagy TextBlock maradványt tartalmazó érték.
+    """
+    source_segments, source_issues = load_segments(source_path)
+    target_segments, issues = load_segments(target_path)
+    if any(issue.code == 'syntax' for issue in source_issues + issues):
+        return issues
+    for key in source_segments.keys() - target_segments.keys():
+        issues.append(Issue('error', 'missing-key', key, "key missing from target"))
+    for key in target_segments.keys() - source_segments.keys():
+        issues.append(Issue('error', 'extra-key', key, "key not present in source"))
+    for key, source in source_segments.items():
+        if key in target_segments:
+            issues.extend(check_segment(source, target_segments[key], key))
+    return issues
+
+
+def validate_file(file_path: str, source_path: str = None):
+    """Egy fájl ellenőrzése: szintaxis, XLIFF-en belüli egyezés, és ha van forrás, forrás-cél egyezés"""
+    if file_path.lower().endswith('.xlf'):
+        issues = check_xliff(file_path)
+    elif source_path:
+        issues = compare_files(source_path, file_path)
+    else:
+        _, issues = load_segments(file_path)
+    return file_path, source_path, issues
+
+
+def pair_localized_files(paths, source_lang: str = None):
+    """
+    Célnyelvi fájlok párosítása a forrásukkal: strings_hu.json -> strings_fr.json (source_lang)
+    vagy nyelvkód nélküli strings.json. A párosítatlan fájlok forrás nélkül (csak szintaxisra) kerülnek ellenőrzésre.
+    """
+    groups = {}
+    for path in paths:
+        directory, file_name = os.path.split(path)
+        stem, ext = os.path.splitext(file_name)
+        match = language_suffix(stem)
+        base = stem[:match.start()] if match else stem
+        lang = match.group(1).lower() if match else None
+        groups.setdefault((directory, base, ext.lower()), {})[lang] = path
+
+    pairs = []
+    for files in groups.values():
+        source = files.get(source_lang) if source_lang else None
+        if source is None:
+            source = files.get(None)
+        for lang, path in files.items():
+            pairs.append((path, source if path != source else None))
+    return pairs
+
+
+def validate_directory(path: str, source_lang: str = None, workers: int = None):
+    """
+    Párhuzamos ellenőrzés egy könyvtár összes támogatott fájljára.
+    :return: [(fájl, forrás, hibák)] a fájlnév szerint rendezve
+    """
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = [os.path.join(root, filename)
+                 for root, _, files in os.walk(path)
+                 for filename in files
+                 if filename.lower().endswith(SUPPORTED_EXTENSIONS)]
+    pairs = pair_localized_files(paths, source_lang)
+    if len(pairs) <= 1:
+        return [validate_file(file_path, source) for file_path, source in pairs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(validate_file, *zip(*pairs)))
+    return sorted(results)
+
+
+def log_gate_failures(file_path: str, lang: str, failures: dict, keys):
+    for index, issues in failures.items():
+        for issue in issues:
+            logging.warning("Validation failed for %s [%s] %s: %s", file_path, lang, keys[index] if keys else index,
+                            issue.message, extra={'code': issue.code})
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import select
+import struct
+import hashlib
+import logging
+from .file_processors import EXTRACTORS, translate_gated, write_extraction
+from .language_utils import in_place_language, localized_path, is_localized_output
+from .translation_memory import memory
+from .logging_config import progress
+
+# inotify események (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Rekurzív inotify figyelő ctypes-szal (csak Linuxon), külső függőség nélkül"""
+
+    def __init__(self, root: str):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for directory, _, _ in os.walk(root):
+            self._add(directory)
+
+    def _add(self, directory: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            self.dirs[wd] = directory
+
+    def changes(self, timeout: float) -> set:
+        """Legfeljebb timeout másodpercig vár, és visszaadja a változott (vagy törölt) fájlok útvonalait"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Új könyvtár: figyeljük, és a már benne lévő fájlokat is feldolgozzuk
+                    for sub_root, _, files in os.walk(path):
+                        self._add(sub_root)
+                        changed.update(os.path.join(sub_root, filename) for filename in files)
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Tartalék figyelő: a fa mtime/méret pillanatképeit hasonlítja össze"""
+
+    def __init__(self, root: str, interval: float = 2.0):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float) -> set:
+        time.sleep(max(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path, stat in snapshot.items() if self.snapshot.get(path) != stat}
+        changed.update(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(root: str, poll_interval: float = None):
+    """inotify, ha elérhető és nincs kért lekérdezési intervallum; különben lekérdezéses figyelés"""
+    if poll_interval is None:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logging.warning("inotify is not available (%s), falling back to polling", e)
+    return PollingWatcher(root, poll_interval or 2.0)
+
+
+def segment_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class IncrementalTranslator:
+    """
+    Fájlonként megjegyzi a legutóbb látott szegmensek hash-eit, és egy változás után csak az
+    új vagy módosult szegmenseket fordítja le. A változatlan szegmensek fordítását a fordítási
+    memória adja, így a kimenet teljes marad API hívás nélkül.
+    Az állapot egy JSON fájlban megmarad, újraindítás után is csak a különbség fordítódik.
+    Csak a ténylegesen lefordult szegmensek hash-ét jegyzi meg: ami egy kiesés miatt forrásszövegként
+    maradt, az a következő változáskor vagy a retry_pending() hívásakor újra fordításra kerül.
+    """
+
+    def __init__(self, model: str, default_lang: str = 'hu', targets=None, langs_per_call: int = 1,
+                 output_dir: str = None, state_path: str = None, root: str = None):
+        self.model = model
+        self.default_lang = default_lang
+        self.targets = targets
+        self.langs_per_call = langs_per_call
+        self.output_dir = os.path.abspath(output_dir) if output_dir else None
+        self.state_path = state_path
+        self.root = root
+        self.state = {}
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning("Could not load watch state %s, starting fresh: %s", state_path, e)
+
+    def wanted(self, path: str) -> bool:
+        if os.path.splitext(path)[1].lower() not in EXTRACTORS:
+            return False
+        if self.state_path and os.path.abspath(path) == os.path.abspath(self.state_path):
+            return False
+        if self.output_dir and os.path.abspath(path).startswith(self.output_dir + os.sep):
+            return False
+        return not (self.targets and is_localized_output(path, self.targets))
+
+    def process(self, paths, force: bool = False) -> dict:
+        """
+        Feldolgozza a változott fájlokat; :return: statisztika (files, segments, translated)
+        :param force: a fájl változatlan mérete és ideje esetén is újra megnézzük a szegmenseket
+        """
+        stats = {'files': 0, 'segments': 0, 'translated': 0}
+        for path in paths:
+            if not self.wanted(path):
+                continue
+            if not os.path.exists(path):
+                self.state.pop(os.path.abspath(path), None)
+                continue
+            try:
+                translated = self._process_file(path, stats, force)
+            except Exception as e:
+                logging.error("Error processing %s: %s", path, e)
+                continue
+            if translated is not None:
+                stats['files'] += 1
+                stats['translated'] += translated
+        self._save_state()
+        return stats
+
+    def pending(self) -> list:
+        """A legutóbb nem teljesen lefordult fájlok"""
+        return sorted(path for path, entry in self.state.items() if entry.get('pending'))
+
+    def retry_pending(self) -> dict:
+        """A kiesés miatt forrásszövegként maradt szegmensek újrafordítása (a fájlok változása nélkül is)"""
+        return self.process(self.pending(), force=True)
+
+    def _process_file(self, path: str, stats: dict, force: bool = False):
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        previous = self.state.get(key, {})
+        if not force and previous.get('stat') == [stat.st_mtime_ns, stat.st_size]:
+            return None
+
+        extraction = EXTRACTORS[os.path.splitext(path)[1].lower()](path)
+        hashes = [segment_hash(text) for text in extraction.texts]
+        seen = set(previous.get('segments', ()))
+        changed = [i for i, digest in enumerate(hashes) if digest not in seen]
+        stats['segments'] += len(extraction.texts)
+
+        if self.targets:
+            output_paths = {lang: localized_path(path, lang, self.output_dir, self.root) for lang in self.targets}
+        else:
+            output_paths = {in_place_language(path, self.default_lang): path}
+        target_langs = list(output_paths)
+
+        # Célnyelvi kimeneteknél a nem fordított részek (kulcsok, szerkezet) változása miatt is újraírunk,
+        # a változatlan szegmensek fordítása ilyenkor API hívás nélkül jön
+        if changed or (self.targets and (extraction.texts or previous.get('segments'))):
+            logging.info("%s: %d of %d segments added or modified", path, len(changed), len(extraction.texts))
+            progress.add_segments(len(changed) * len(target_langs))
+            fresh = {}
+            fresh_failed = {}
+            if changed:
+                fresh = translate_gated([extraction.texts[i] for i in changed], target_langs, self.model,
+                                        self.langs_per_call, path, [extraction.keys[i] for i in changed], fresh_failed)
+            results = {}
+            for lang in target_langs:
+                # A változatlan szegmensek a memóriából jönnek; ha ott nincsenek, a forrás marad (mint korábban)
+                translations = [memory.get(text, lang) or text for text in extraction.texts]
+                for j, i in enumerate(changed):
+                    translations[i] = fresh[lang][j]
+                results[lang] = translations
+            for out_path in output_paths.values():
+                os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+            write_extraction(extraction, results, target_langs, output_paths)
+            # A valódi hiba (API hiba, elutasított válasz) miatt fordítás nélkül maradt szegmenseket nem jegyezzük meg,
+            # így újra sorra kerülnek; a forrással azonos, de helyes fordítás kész
+            failed = {changed[j] for indexes in fresh_failed.values() for j in indexes}
+            if self.targets:
+                done = {hashes[i] for i in range(len(hashes)) if i not in failed}
+            else:
+                # Helyben fordításnál a következő kinyerés már a kiírt értékeket látja: azok hash-eit jegyezzük meg
+                written = results[target_langs[0]]
+                done = {segment_hash(written[i]) for i in range(len(hashes)) if i not in failed}
+        else:
+            failed = set()
+            done = set(hashes)
+        if failed:
+            logging.warning("%s: %d segments left untranslated, they will be retried", path, len(failed))
+
+        # Helyben fordításnál a saját írásunk is eseményt vált ki; a kiírt fájl adatait jegyezzük meg
+        stat = os.stat(path)
+        self.state[key] = {'stat': [stat.st_mtime_ns, stat.st_size], 'segments': sorted(done)}
+        if failed:
+            self.state[key]['pending'] = len(failed)
+        return len(changed) - len(failed)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.state_path)
+
+
+def watch(root: str, translator: IncrementalTranslator, debounce: float = 1.0, poll_interval: float = None,
+          stop=None, retry_interval: float = 60.0):
+    """
+    Figyeli a fát, és a változásokat debounce másodperc csend után kötegben dolgozza fel.
+    Induláskor egy teljes (inkrementális) menetet futtat. A stop() igaz visszatérése leállítja.
+    A fordítás nélkül maradt szegmenseket csendes időszakban retry_interval másodpercenként újrapróbálja.
+    """
+    if translator.root is None:
+        translator.root = root
+    watcher = make_watcher(root, poll_interval)
+    logging.warning("Watching %s for changes (%s)", root, type(watcher).__name__)
+    initial = [os.path.join(directory, filename) for directory, _, files in os.walk(root) for filename in files]
+    stats = translator.process(initial)
+    logging.info("Initial pass: %(files)d files, %(translated)d segments translated", stats)
+    pending = set()
+    last_retry = time.monotonic()
+    try:
+        while not (stop and stop()):
+            changed = watcher.changes(debounce if pending else 1.0)
+            if changed:
+                pending.update(changed)
+                continue
+            if not pending and time.monotonic() - last_retry >= retry_interval:
+                last_retry = time.monotonic()
+                if translator.pending():
+                    stats = translator.retry_pending()
+                    if stats['translated']:
+                        logging.warning("Retried %d files, %d segments translated", stats['files'], stats['translated'])
+                continue
+            if pending:
+                batch = sorted(pending)
+                pending.clear()
+                started = time.perf_counter()
+                stats = translator.process(batch)
+                if stats['files']:
+                    logging.warning("Updated %d files, %d segments translated in %.1f s", stats['files'],
+                                    stats['translated'], time.perf_counter() - started)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+from .file_processors import EXTRACTORS, translate_gated, write_extraction
+from .language_utils import in_place_language, localized_path, is_localized_output
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    output_paths TEXT NOT NULL,
+    segments INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    first INTEGER NOT NULL,
+    texts TEXT NOT NULL,
+    keys TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS shards_status ON shards(status, lease_expires);
+CREATE INDEX IF NOT EXISTS shards_file ON shards(file_id);
+"""
+
+
+def _digest(texts) -> str:
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class Shard:
+    __slots__ = ('id', 'file_id', 'path', 'target_langs', 'first', 'texts', 'keys')
+
+    def __init__(self, shard_id, file_id, path, target_langs, first, texts, keys):
+        self.id = shard_id
+        self.file_id = file_id
+        self.path = path
+        self.target_langs = target_langs
+        self.first = first
+        self.texts = texts
+        self.keys = keys
+
+
+class WorkQueue:
+    """
+    Tartós, SQLite alapú munkasor a teljes katalógus fordításához.
+    A fájlok szegmenseit shardokra bontjuk; a workerek (akár több gépen, közös fájlrendszeren)
+    bérlettel (lease) foglalnak le egy shardot, szívveréssel hosszabbítják, és a kész fordítást
+    visszaírják. A lejárt bérletű shardot (összeomlott worker) más worker újra lefoglalhatja.
+    A végén a merge lépés a meglévő feldolgozókkal írja ki a fájlokat.
+    Az időbélyegek falióra szerintiek, több gépnél szinkronizált óra kell.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 5):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        db = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        # Minden művelet saját kapcsolatot kap, így szálak és folyamatok között is biztonságos
+        db = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        db.execute("PRAGMA busy_timeout = 60000")
+        return _Transaction(db)
+
+    def enqueue(self, path: str, output_paths: dict, texts, keys, shard_size: int = 50) -> int:
+        """Egy fájl szegmenseinek felvétele shardokban; a már felvett fájlt nem vesszük fel újra"""
+        path = os.path.abspath(path)
+        with self._connect() as db:
+            if db.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone():
+                return 0
+            file_id = db.execute(
+                "INSERT INTO files (path, output_paths, segments, digest) VALUES (?, ?, ?, ?)",
+                (path, json.dumps({lang: os.path.abspath(out) for lang, out in output_paths.items()}),
+                 len(texts), _digest(texts))).lastrowid
+            shards = [(file_id, first, json.dumps(texts[first:first + shard_size], ensure_ascii=False),
+                       json.dumps(keys[first:first + shard_size], ensure_ascii=False))
+                      for first in range(0, len(texts), shard_size)]
+            db.executemany("INSERT INTO shards (file_id, first, texts, keys) VALUES (?, ?, ?, ?)", shards)
+            if not shards:
+                db.execute("UPDATE files SET status = 'ready' WHERE id = ?", (file_id,))
+        return len(shards)
+
+    def claim(self, worker: str, lease: float = 120.0):
+        """Lefoglal egy várakozó vagy lejárt bérletű shardot; None, ha nincs ilyen"""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT s.id, s.file_id, f.path, f.output_paths, s.first, s.texts, s.keys, s.status FROM shards s "
+                "JOIN files f ON f.id = s.file_id "
+                "WHERE s.status = 'pending' OR (s.status = 'leased' AND s.lease_expires < ?) "
+                "ORDER BY s.status = 'leased', s.id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            shard_id, file_id, path, output_paths, first, texts, keys, status = row
+            if status == 'leased':
+                logging.warning("Reclaiming shard %d of %s after an expired lease", shard_id, path)
+            db.execute("UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (worker, now + lease, shard_id))
+        return Shard(shard_id, file_id, path, list(json.loads(output_paths)), first, json.loads(texts), json.loads(keys))
+
+    def heartbeat(self, shard_id: int, worker: str, lease: float = 120.0) -> bool:
+        """Meghosszabbítja a bérletet; False, ha a shardot közben más worker vette át"""
+        with self._connect() as db:
+            return db.execute("UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                              (time.time() + lease, shard_id, worker)).rowcount == 1
+
+    def complete(self, shard: Shard, worker: str, results: dict) -> bool:
+        """
+        Elmenti a shard fordításait; ha minden shard kész, a fájl merge-re kész.
+        :return: False, ha a worker már nem birtokolja a bérletet (a shardot közben más vette át)
+        """
+        with self._connect() as db:
+            updated = db.execute("UPDATE shards SET status = 'done', results = ? "
+                                 "WHERE id = ? AND worker = ? AND status = 'leased'",
+                                 (json.dumps(results, ensure_ascii=False), shard.id, worker)).rowcount
+            remaining = db.execute("SELECT COUNT(*) FROM shards WHERE file_id = ? AND status != 'done'",
+                                   (shard.file_id,)).fetchone()[0]
+            if not remaining:
+                db.execute("UPDATE files SET status = 'ready' WHERE id = ? AND status = 'pending'", (shard.file_id,))
+        return updated == 1
+
+    def release(self, shard: Shard, worker: str):
+        """Hiba után visszateszi a shardot a sorba (max_attempts próbálkozás után 'failed')"""
+        with self._connect() as db:
+            db.execute("UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                       "worker = NULL, lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                       (self.max_attempts, shard.id, worker))
+
+    def requeue(self) -> int:
+        """A 'failed' shardok visszatétele a sorba nullázott próbálkozásszámmal (pl. egy API kiesés után)"""
+        with self._connect() as db:
+            return db.execute("UPDATE shards SET status = 'pending', attempts = 0, worker = NULL, lease_expires = NULL "
+                              "WHERE status = 'failed'").rowcount
+
+    def status(self) -> dict:
+        with self._connect() as db:
+            shards = dict(db.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+            files = dict(db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+        return {'shards': shards, 'files': files}
+
+    def merge(self) -> dict:
+        """
+        A kész fájlok kiírása a meglévő feldolgozókkal: a forrást újra kinyerjük, és ha a szegmensek
+        nem változtak a felvétel óta, a shardok fordításait alkalmazzuk és nyelvenként kiírjuk.
+        """
+        stats = {'merged': 0, 'stale': 0}
+        with self._connect() as db:
+            files = db.execute("SELECT id, path, output_paths, digest FROM files WHERE status = 'ready'").fetchall()
+        for file_id, path, output_paths, digest in files:
+            output_paths = json.loads(output_paths)
+            extraction = EXTRACTORS[os.path.splitext(path)[1].lower()](path)
+            if _digest(extraction.texts) != digest:
+                logging.error("Source changed since it was queued, not merging: %s", path)
+                status = 'stale'
+            else:
+                results = {lang: list(extraction.texts) for lang in output_paths}
+                with self._connect() as db:
+                    rows = db.execute("SELECT first, results FROM shards WHERE file_id = ?", (file_id,)).fetchall()
+                for first, shard_results in rows:
+                    for lang, translations in json.loads(shard_results).items():
+                        results[lang][first:first + len(translations)] = translations
+                for out_path in output_paths.values():
+                    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+                write_extraction(extraction, results, list(output_paths), output_paths)
+                status = 'merged'
+            stats[status] += 1
+            with self._connect() as db:
+                db.execute("UPDATE files SET status = ? WHERE id = ?", (status, file_id))
+        return stats
+
+
+class _Transaction:
+    """Context manager: BEGIN IMMEDIATE ... COMMIT (hiba esetén ROLLBACK), majd a kapcsolat bezárása"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.close()
+        return False
+
+
+def enqueue_tree(queue: WorkQueue, path: str, default_lang: str = 'hu', targets=None, output_dir: str = None,
+                 shard_size: int = 50) -> dict:
+    """A fa összes támogatott fájljának kinyerése és felvétele a sorba"""
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = [os.path.join(root, filename) for root, _, files in os.walk(path) for filename in files]
+    root = path if os.path.isdir(path) else os.path.dirname(path)
+    stats = {'files': 0, 'shards': 0}
+    for file_path in paths:
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in EXTRACTORS or (targets and is_localized_output(file_path, targets)):
+            continue
+        if targets:
+            output_paths = {lang: localized_path(file_path, lang, output_dir, root) for lang in targets}
+        else:
+            output_paths = {in_place_language(file_path, default_lang): file_path}
+        try:
+            extraction = EXTRACTORS[ext](file_path)
+        except Exception as e:
+            logging.error("Error extracting %s: %s", file_path, e)
+            continue
+        stats['shards'] += queue.enqueue(file_path, output_paths, extraction.texts, extraction.keys, shard_size)
+        stats['files'] += 1
+    return stats
+
+
+def run_worker(db_path: str, model: str, langs_per_call: int = 1, lease: float = 120.0) -> int:
+    """
+    Shardokat foglal és fordít, amíg van munka. A fordítás alatt egy háttérszál lease/3
+    időközönként hosszabbítja a bérletet. :return: a lefordított shardok száma
+    """
+    queue = WorkQueue(db_path)
+    worker = worker_id()
+    done = 0
+    while True:
+        shard = queue.claim(worker, lease)
+        if shard is None:
+            return done
+        stop = threading.Event()
+
+        def beat(shard_id=shard.id):
+            while not stop.wait(lease / 3):
+                if not queue.heartbeat(shard_id, worker, lease):
+                    logging.warning("Lost the lease of shard %d", shard_id)
+                    return
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        failed = {}
+        try:
+            results = translate_gated(shard.texts, shard.target_langs, model, langs_per_call, shard.path, shard.keys,
+                                      failed)
+        except Exception as e:
+            logging.error("Error translating shard %d of %s: %s", shard.id, shard.path, e)
+            queue.release(shard, worker)
+            continue
+        finally:
+            stop.set()
+            heartbeat.join()
+        untranslated = set().union(*failed.values())
+        if untranslated:
+            # A hiba miatt forrásszövegre visszaesett fordítás nem kész munka: újra sorra kerül (vagy 'failed' lesz);
+            # a forrással azonos, de helyes fordítás ("Garage", "Hangar") kész
+            logging.warning("Shard %d of %s: %d segments were not translated, releasing it", shard.id, shard.path,
+                            len(untranslated))
+            queue.release(shard, worker)
+            continue
+        if not queue.complete(shard, worker, results):
+            logging.warning("Shard %d of %s was taken over by another worker, discarding its results", shard.id,
+                            shard.path)
+            continue
+        done += 1
+        logging.info("Completed shard %d of %s (%d segments)", shard.id, shard.path, len(shard.texts))
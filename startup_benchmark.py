@@ -0,0 +1,67 @@
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+from statistics import median
+
+# Ezeket csak az első tényleges használatkor szabad betölteni (fordítás, nyelvfelismerés, tokenszámlálás)
+HEAVY_MODULES = ('anthropic', 'tiktoken', 'langdetect', 'dotenv', 'language_tags')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def parse_importtime(stderr: str):
+    """A -X importtime kimenete: [(modul, saját µs, kumulatív µs, mélység)]"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return modules
+
+def measure_startup(command=None, runs: int = 5):
+    """
+    A parancs hideg indítását méri `runs` alkalommal (alapból: run.py --help).
+    :return: (medián idő ms-ben, az utolsó futás importjai)
+    """
+    command = command or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py'), '--help']
+    timings = []
+    modules = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + command, capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        modules = parse_importtime(result.stderr)
+    return median(timings), modules
+
+def heavy_imports(modules):
+    return sorted({name.split('.')[0] for name, _, _, _ in modules if name.split('.')[0] in HEAVY_MODULES})
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start time and imports of run.py (python -X importtime)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure (default: 5)")
+    parser.add_argument("--max-ms", type=float, default=600, help="Fail if the median start time exceeds this (default: 600)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to list (default: 15)")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to measure instead of 'run.py --help'")
+    args = parser.parse_args()
+
+    elapsed, modules = measure_startup(args.command or None, args.runs)
+    total_import = sum(own for _, own, _, _ in modules) / 1000
+    print(f"Median start time: {elapsed:.0f} ms over {args.runs} runs (imports: {total_import:.0f} ms, {len(modules)} modules)")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, own, cumulative, _ in sorted(modules, key=lambda m: -m[2])[:args.top]:
+        print(f"{cumulative / 1000:>14.1f}{own / 1000:>10.1f}  {name}")
+
+    failed = False
+    heavy = heavy_imports(modules)
+    if heavy:
+        print(f"\nFAIL: heavy dependencies imported at startup: {', '.join(heavy)}")
+        failed = True
+    if elapsed > args.max_ms:
+        print(f"\nFAIL: median start time {elapsed:.0f} ms exceeds {args.max_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.language_utils import localized_path, is_localized_output
+from src.file_processors import process_file
+
+
+class FakeMessages:
+    """Offline helyettesítő a messages.create hívásra: '[lang] szöveg' formájú fordítást ad vissza"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        text = kwargs['messages'][0]['content'].split('\n', 1)[1]
+        if 'JSON object' in kwargs['system']:
+            langs = kwargs['messages'][0]['content'].split('\n', 1)[0].split(' into ', 1)[1].rstrip(':').split(',')
+            reply = json.dumps({lang.strip(): f"[{lang.strip()}] {text}" for lang in langs})
+        else:
+            lang = kwargs['messages'][0]['content'].split(' to ', 1)[1].split(':', 1)[0]
+            reply = f"[{lang}] {text}"
+        return SimpleNamespace(content=[SimpleNamespace(text=reply)], stop_reason='end_turn')
+
+
+class TestFanOut(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_localized_path(self):
+        self.assertEqual(localized_path(os.path.join('a', 'strings_fr.json'), 'hu'), os.path.join('a', 'strings_hu.json'))
+        self.assertEqual(localized_path('readme.md', 'de', 'out'), os.path.join('out', 'readme_de.md'))
+        self.assertEqual(localized_path(os.path.join('in', 'a', 'strings_fr.json'), 'hu', 'out', 'in'),
+                         os.path.join('out', 'a', 'strings_hu.json'))
+        self.assertTrue(is_localized_output('strings_hu.json', ['hu', 'de']))
+        self.assertFalse(is_localized_output('strings_fr.json', ['hu', 'de']))
+
+    def test_prompt_uses_target_language(self):
+        self.assertIn('Translate to German', translation.build_system_prompt('de'))
+        self.assertNotIn('Hungarian', translation.build_system_prompt('de'))
+
+    def test_one_output_per_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'menu_fr.json')
+            with open(source, 'w', encoding='utf-8') as f:
+                json.dump({"menu": {"title": "Accueil du vaisseau", "id": "42"}}, f)
+            process_file(source, 'test-model', 'en', targets=['hu', 'de'])
+
+            for lang in ('hu', 'de'):
+                with open(os.path.join(tmp, f'menu_{lang}.json'), encoding='utf-8') as f:
+                    data = json.load(f)
+                self.assertEqual(data['menu']['title'], f"[{translation.language_name(lang)}] Accueil du vaisseau")
+            with open(source, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['menu']['title'], "Accueil du vaisseau")
+        self.assertEqual(len(self.fake.messages.calls), 2)
+
+    def test_several_languages_per_call(self):
+        results = translation.batch_translate_multi(["Bonjour"], ['hu', 'de', 'es'], 'test-model', langs_per_call=3)
+        self.assertEqual(results, {'hu': ["[hu] Bonjour"], 'de': ["[de] Bonjour"], 'es': ["[es] Bonjour"]})
+        self.assertEqual(len(self.fake.messages.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
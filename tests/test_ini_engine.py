@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from src.ini_engine import read_ini
+
+
+class TestIniEngine(unittest.TestCase):
+
+    def write_bytes(self, content: bytes) -> str:
+        handle, path = tempfile.mkstemp(suffix='.ini')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_flat_file_keeps_layout_and_duplicate_keys(self):
+        path = self.write_bytes(b"; header comment\r\nTitle = Accueil  \r\n\r\nTitle=Fermer\r\nEmpty=\r\nurl=http://x")
+        document = read_ini(path)
+        self.assertFalse(document.has_sections)
+        self.assertEqual([document.value(e) for e in document.entries], ['Accueil', 'Fermer', '', 'http://x'])
+        self.assertEqual(document.entries[0].key, 'Title')
+
+        content = document.render({0: 'Kezdőlap', 1: 'Bezárás'})
+        self.assertEqual(content.decode('utf-8'),
+                         "; header comment\r\nTitle = Kezdőlap  \r\n\r\nTitle=Bezárás\r\nEmpty=\r\nurl=http://x")
+
+    def test_sections_comments_and_colon_delimiter(self):
+        path = self.write_bytes("﻿[Menu]\n# keep me\nOpenDoor: Ouvrir\n  continued line\n[Other]\nKey=Valeur\n".encode('utf-8'))
+        document = read_ini(path)
+        self.assertTrue(document.has_sections)
+        self.assertEqual([document.entry_id(e) for e in document.entries], ['Menu.OpenDoor', 'Other.Key'])
+
+        out_path = path + '.out'
+        self.addCleanup(os.remove, out_path)
+        document.write(out_path, {1: 'Érték'})
+        with open(out_path, 'rb') as f:
+            self.assertEqual(f.read(), "﻿[Menu]\n# keep me\nOpenDoor: Ouvrir\n  continued line\n[Other]\nKey=Érték\n".encode('utf-8'))
+
+    def test_latin1_file_is_read_once_and_keeps_encoding(self):
+        path = self.write_bytes("clé=Café\nautre=Été\n".encode('latin-1'))
+        document = read_ini(path)
+        self.assertEqual(document.encoding, 'latin-1')
+        self.assertEqual(document.entries[0].key, 'clé')
+        self.assertEqual(document.render({1: 'Nyár'}), "clé=Café\nautre=Nyár\n".encode('latin-1'))
+        # Ami latin-1-ben nem ábrázolható, azzal a fájl UTF-8 lesz
+        self.assertEqual(document.render({1: 'Nyári idő'}).decode('utf-8'), "clé=Café\nautre=Nyári idő\n")
+
+    def test_multiline_translation_stays_on_one_line(self):
+        path = self.write_bytes(b"a=b\nc=d\n")
+        self.assertEqual(read_ini(path).render({0: "one\ntwo"}), b"a=one\\ntwo\nc=d\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
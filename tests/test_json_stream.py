@@ -0,0 +1,56 @@
+import io
+import json
+import unittest
+from src.json_stream import iter_json_events, iter_json_leaves, stream_rewrite
+
+SAMPLE = '{\r\n  "menu": {"title": "Accueil", "items": ["Fermer", 3, true, {"label": "Di\\"t \\u00e9"}]},\r\n' \
+         '  "count": 12.5e3, "empty": "", "nested": [[ "a" ], null]\r\n}\r\n'
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_events_reproduce_input_exactly(self):
+        for chunk_size in (1, 3, 7, 1 << 16):
+            parts = []
+            for event in iter_json_events(io.StringIO(SAMPLE), chunk_size):
+                parts.append(event[1] if event[0] == 'raw' else event[3])
+            self.assertEqual(''.join(parts), SAMPLE)
+
+    def test_leaf_paths_match_process_json_keys(self):
+        leaves = list(iter_json_leaves(io.StringIO(SAMPLE), chunk_size=5))
+        self.assertEqual(leaves, [
+            ('menu.title', 'Accueil'),
+            ('menu.items[0]', 'Fermer'),
+            ('menu.items[3].label', 'Di"t é'),
+            ('empty', ''),
+            ('nested[0][0]', 'a'),
+        ])
+
+    def test_rewrite_replaces_only_selected_values_in_windows(self):
+        windows = []
+
+        def select(path, value):
+            return value if path.startswith('menu.') else None
+
+        def translate(texts):
+            windows.append(list(texts))
+            return {'hu': [f"HU {t}" for t in texts], 'de': [f"DE {t}" for t in texts]}
+
+        outputs = {'hu': io.StringIO(), 'de': io.StringIO()}
+        stats = stream_rewrite(io.StringIO(SAMPLE), outputs, select, translate, window=2)
+
+        self.assertEqual(stats, {'leaves': 5, 'selected': 3})
+        self.assertEqual(windows, [['Accueil', 'Fermer'], ['Di"t é']])
+        hu = json.loads(outputs['hu'].getvalue())
+        self.assertEqual(hu['menu']['items'][3]['label'], 'HU Di"t é')
+        self.assertEqual(list(hu), ['menu', 'count', 'empty', 'nested'])
+        self.assertIn('"count": 12.5e3', outputs['de'].getvalue())
+        self.assertTrue(outputs['de'].getvalue().endswith('}\r\n'))
+
+    def test_truncated_input_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_events(io.StringIO('{"a": "b"'), 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
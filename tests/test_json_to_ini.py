@@ -0,0 +1,36 @@
+import os
+import json
+import tempfile
+import unittest
+from json_to_ini import fix_encoding, fix_line_endings, json_to_ini, convert_directory
+
+
+class TestJsonToIni(unittest.TestCase):
+
+    def test_value_normalization(self):
+        self.assertEqual(fix_encoding("ÈTAGE Œuvre Élő Ü"), "ETAGE OEuvre Élő Ü")
+        self.assertEqual(fix_encoding("WIP-Hangár"), "WIP - Hangár")
+        self.assertEqual(fix_line_endings("első\\nmásodik   sor "), "első második sor")
+
+    def test_convert_directory_in_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source_dir = os.path.join(tmp, 'json', 'sub')
+            os.makedirs(source_dir)
+            for i in range(3):
+                with open(os.path.join(source_dir, f'f{i}.json'), 'w', encoding='utf-8') as f:
+                    json.dump({"title": f"ÀRMURERIE {i}", "empty": ""}, f)
+            self.assertTrue(convert_directory(os.path.join(tmp, 'json'), os.path.join(tmp, 'ini'), workers=2))
+            with open(os.path.join(tmp, 'ini', 'sub', 'f1.ini'), encoding='utf-8') as f:
+                self.assertEqual(f.read(), "title=ARMURERIE 1\nempty=\n")
+
+    def test_single_file_returns_key_count(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'a.json')
+            with open(source, 'w', encoding='utf-8') as f:
+                json.dump({"a": "x", "b": "y"}, f)
+            keys, _ = json_to_ini(source, os.path.join(tmp, 'a.ini'), verbose=False)
+            self.assertEqual(keys, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import json
+import logging
+import tempfile
+import unittest
+from unittest import mock
+from src import logging_config
+from src.logging_config import ConsoleHandler, setup_logging, stop_logging, ProgressReporter
+
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class TestLoggingConfig(unittest.TestCase):
+
+    def tearDown(self):
+        stop_logging()
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            root_logger.removeHandler(handler)
+
+    def test_json_lines_log_with_extra_fields(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = setup_logging(tmp, 'test', logging.INFO)
+            logging.debug("segment detail")
+            logging.info("Updating key", extra={'key': 'menu.title'})
+            stop_logging()
+            with open(log_file, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['msg'], "Updating key")
+        self.assertEqual(entries[0]['key'], 'menu.title')
+        self.assertEqual(entries[0]['level'], 'INFO')
+
+    def test_progress_is_rate_limited(self):
+        stream = io.StringIO()
+        reporter = ProgressReporter(interval=60, stream=stream)
+        reporter.start(files_total=1)
+        reporter.add_segments(1000)
+        for _ in range(1000):
+            reporter.advance()
+        reporter.finish()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("segments 1000/1000", lines[-1])
+
+    def test_log_line_clears_and_redraws_progress(self):
+        terminal = Terminal()
+        reporter = ProgressReporter(interval=0, stream=terminal)
+        handler = ConsoleHandler(terminal)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        with mock.patch.object(logging_config, 'progress', reporter):
+            reporter.start(files_total=2)
+            reporter.file_done()
+            drawn = reporter.line()
+            handler.emit(logging.makeLogRecord({'msg': "API error", 'levelno': logging.WARNING}))
+        # A naplósor tiszta sorban kezdődik, a haladásjelző alatta újra megjelenik
+        self.assertEqual(terminal.getvalue(),
+                         '\r' + drawn + '\r' + ' ' * len(drawn) + '\r' + "API error\n" + reporter.line())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.pipeline import Pipeline
+from tests.test_fan_out import FakeMessages
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_directory_is_translated_through_all_stages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(5):
+                with open(os.path.join(tmp, f'menu{i}_fr.json'), 'w', encoding='utf-8') as f:
+                    json.dump({"title": f"Accueil du vaisseau {i}"}, f)
+            with open(os.path.join(tmp, 'broken_fr.json'), 'w', encoding='utf-8') as f:
+                f.write('{"title": ')
+            with open(os.path.join(tmp, 'notes.bin'), 'wb') as f:
+                f.write(b'\x00')
+
+            stats = Pipeline('test-model', targets=['hu'], translate_workers=3, queue_size=1).run(tmp)
+
+            self.assertEqual(stats, {'files': 6, 'written': 5, 'failed': 1})
+            for i in range(5):
+                with open(os.path.join(tmp, f'menu{i}_hu.json'), encoding='utf-8') as f:
+                    self.assertEqual(json.load(f)['title'], f"[Hungarian] Accueil du vaisseau {i}")
+
+    def test_in_place_target_ignores_filename_suffix(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # A fájlnév nyelvkódja a forrás nyelve, ahogy --targets mellett; a célnyelv a metaadatból vagy default_lang
+            path = os.path.join(tmp, 'strings_fr.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"a": "Ouvrir la porte du hangar"}, f)
+            tagged = os.path.join(tmp, 'dialog_fr.json')
+            with open(tagged, 'w', encoding='utf-8') as f:
+                json.dump({"target-language": "de", "a": "Fermer la porte"}, f)
+            Pipeline('test-model').run(tmp)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['a'], "[Hungarian] Ouvrir la porte du hangar")
+            with open(tagged, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['a'], "[German] Fermer la porte")
+
+    def test_in_place_json_resumes_from_progress_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Egy megszakadt futás: "a" már le van fordítva és a .progress fájlban szerepel
+            path = os.path.join(tmp, 'menu.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"a": "[Hungarian] Ouvrir la porte", "b": "Fermer la porte"}, f)
+            with open(path + '.progress', 'w', encoding='utf-8') as f:
+                json.dump(["a"], f)
+            Pipeline('test-model').run(tmp)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f), {"a": "[Hungarian] Ouvrir la porte", "b": "[Hungarian] Fermer la porte"})
+            self.assertEqual(len(self.fake.messages.calls), 1)
+            self.assertFalse(os.path.exists(path + '.progress'))
+
+    def test_output_dir_keeps_subdirectories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'src')
+            for sub in ('ui', 'game'):
+                os.makedirs(os.path.join(source, sub))
+                with open(os.path.join(source, sub, 'strings_fr.json'), 'w', encoding='utf-8') as f:
+                    json.dump({"title": f"Accueil du menu {sub}"}, f)
+            out = os.path.join(tmp, 'out')
+            stats = Pipeline('test-model', targets=['hu'], output_dir=out).run(source)
+            self.assertEqual(stats, {'files': 2, 'written': 2, 'failed': 0})
+            for sub in ('ui', 'game'):
+                with open(os.path.join(out, sub, 'strings_hu.json'), encoding='utf-8') as f:
+                    self.assertEqual(json.load(f)['title'], f"[Hungarian] Accueil du menu {sub}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import translate_gated
+from src.prefilter import PreFilter, prefilter
+from tests.test_fan_out import FakeMessages
+
+
+class TestPreFilter(unittest.TestCase):
+
+    def test_rules(self):
+        rules = PreFilter()
+        for text, rule in [("42", 'number'), ("12,5 %", 'number'), ("https://example.com/a", 'url'),
+                           ("textures/ui/icon.png", 'path'), ("#FF8800", 'color'), ("menu.title.open", 'identifier'),
+                           ("MAX_SPEED", 'constant'), ("→", 'symbol'), ("{0}", 'placeholder'),
+                           ("Bonjour", None), ("Oui/Non", None), ("NE PAS ENTRER", None), ("Niveau 3", None),
+                           ("à", None), ("y", None), ("...", 'symbol')]:
+            self.assertEqual(rules.classify(text), rule, text)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({"disable": ["constant"], "rules": [{"name": "sku", "pattern": r"SKU-\d+"}]}, f)
+        self.addCleanup(os.remove, f.name)
+        rules.load(f.name)
+        self.assertIsNone(rules.classify("MAX_SPEED"))
+        self.assertEqual(rules.classify("SKU-1234"), 'sku')
+
+    def test_filtered_segments_skip_the_api(self):
+        fake = SimpleNamespace(messages=FakeMessages())
+        prefilter.configure()
+        self.addCleanup(prefilter.configure)
+        with mock.patch.object(translation, '_client', fake):
+            results = translate_gated(["42", "Bonjour", "https://example.com", "ITEM_ID", "à"], ['hu', 'de'], 'test-model')
+        self.assertEqual(results['hu'], ["42", "[Hungarian] Bonjour", "https://example.com", "ITEM_ID", "[Hungarian] à"])
+        self.assertEqual(results['de'][1], "[German] Bonjour")
+        self.assertEqual(len(fake.messages.calls), 4)
+        self.assertEqual(prefilter.counts, {'number': 2, 'url': 2, 'constant': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
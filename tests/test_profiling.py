@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from src.profiling import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler()
+        with profiler.stage('parse'):
+            pass
+        with profiler.file('dummy.json'):
+            pass
+        self.assertEqual(profiler.calls, {})
+        self.assertEqual(profiler.files, [])
+
+    def test_nested_stage_time_is_not_double_counted(self):
+        profiler = Profiler()
+        profiler.configure(enabled=True)
+        with profiler.stage('parse'):
+            with profiler.stage('detect'):
+                sum(range(10000))
+        self.assertEqual(profiler.calls, {'parse': 1, 'detect': 1})
+        self.assertGreaterEqual(profiler.wall['parse'], profiler.wall['detect'])
+        self.assertAlmostEqual(profiler.self_wall['parse'] + profiler.self_wall['detect'],
+                               profiler.wall['parse'], places=6)
+
+    def test_report_ranks_stages_and_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = Profiler()
+            profiler.configure(enabled=True, cprofile=True, memory=True, output_dir=tmp)
+            with profiler.file('sample.json'):
+                with profiler.stage('translate'):
+                    [str(i) for i in range(50000)]
+                with profiler.stage('write'):
+                    pass
+            text = profiler.write_report()
+            self.assertLess(text.index('translate'), text.index('write'))
+            self.assertIn('sample.json', text)
+            self.assertIsNotNone(profiler.files[0]['peak'])
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'sample.json.prof')))
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'profile_report.txt')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import time
+import threading
+import unittest
+from types import SimpleNamespace
+from src.metrics import metrics
+from src.resilience import ResilientCaller, CircuitBreaker
+
+
+class ScriptedMessages:
+    """Hívásonként előre megadott (késleltetés, hiba) viselkedés; a modell nevét adja vissza"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.models = []
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            delay, error = self.script.pop(0) if self.script else (0, None)
+            self.models.append(kwargs['model'])
+        time.sleep(delay)
+        if error:
+            raise error
+        return kwargs['model']
+
+
+class TestResilience(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_slow_request_is_hedged(self):
+        caller = ResilientCaller(deadline=5, hedge_min_samples=3)
+        client = SimpleNamespace(messages=ScriptedMessages([(0.01, None)] * 3 + [(2.0, None), (0.01, None)]))
+        for _ in range(3):
+            caller.create(client, model='m')
+        start = time.perf_counter()
+        self.assertEqual(caller.create(client, model='m'), 'm')
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(metrics.counters['hedge.fired'], 1)
+        self.assertEqual(metrics.counters['hedge.won'], 1)
+
+    def test_deadline_raises_timeout(self):
+        caller = ResilientCaller(deadline=0.2, hedge=False)
+        client = SimpleNamespace(messages=ScriptedMessages([(1.0, None)]))
+        with self.assertRaises(TimeoutError):
+            caller.create(client, model='m')
+        self.assertEqual(metrics.counters['timeouts'], 1)
+
+    def test_queue_time_does_not_count_against_the_deadline(self):
+        caller = ResilientCaller(deadline=0.5, hedge=False)
+        caller.configure(concurrency=1)
+        self.assertEqual(caller.max_workers, 2)
+        client = SimpleNamespace(messages=ScriptedMessages([(0.3, None)] * 3))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(caller.create(client, model='m'))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # A harmadik kérés ~0.3 s-ot vár a sorban, de csak az indulásától számít a határidő
+        self.assertEqual(results, ['m'] * 3)
+        self.assertEqual(metrics.counters['timeouts'], 0)
+
+    def test_breaker_opens_and_switches_to_fallback(self):
+        caller = ResilientCaller(deadline=5, hedge=False, fallback_model='small')
+        client = SimpleNamespace(messages=ScriptedMessages([(0, RuntimeError("overloaded"))] * 10))
+        for _ in range(10):
+            with self.assertRaises(RuntimeError):
+                caller.create(client, model='big')
+        self.assertEqual(caller.breaker('big').state, 'open')
+        self.assertEqual(caller.create(client, model='big'), 'small')
+        self.assertEqual(metrics.counters['breaker.fallback'], 1)
+
+    def test_half_open_trial_closes_breaker(self):
+        breaker = CircuitBreaker(window=4, min_calls=2, cooldown=0.01)
+        breaker.record(False)
+        breaker.record(False)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
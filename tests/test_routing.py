@@ -0,0 +1,79 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import translate_gated_stream
+from src.metrics import metrics
+from src.routing import ModelRouter, Tier, router, translate_routed
+from src.translation_memory import memory
+
+
+class ModelEchoMessages:
+    def __init__(self):
+        self.models = []
+
+    def create(self, **kwargs):
+        self.models.append(kwargs['model'])
+        text = kwargs['messages'][0]['content'].split('\n', 1)[1]
+        return SimpleNamespace(content=[SimpleNamespace(text=f"{kwargs['model']}: {text}")], stop_reason='end_turn')
+
+
+class TestRouting(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(router.configure)
+
+    def test_tiers_by_length_and_key_pattern(self):
+        model_router = ModelRouter()
+        model_router.configure([Tier('fast', 'small', max_chars=20), Tier('full', 'large')],
+                               [('*.tooltip', 'fast'), ('dialog.*', 'full')])
+        self.assertEqual(model_router.tier_for("Ouvrir").name, 'fast')
+        self.assertEqual(model_router.tier_for("Une longue description du vaisseau").name, 'full')
+        self.assertEqual(model_router.tier_for("Une longue description du vaisseau", 'hud.tooltip').name, 'fast')
+        self.assertEqual(model_router.tier_for("Oui", 'dialog.intro').name, 'full')
+        with self.assertRaises(ValueError):
+            model_router.configure([Tier('fast', 'small')], [('*', 'missing')])
+
+    def test_each_tier_is_batched_separately(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({"tiers": [{"name": "fast", "model": "small", "max_tokens": 4}, {"name": "full", "model": "large"}]}, f)
+        self.addCleanup(os.remove, f.name)
+        router.load(f.name)
+        fake = SimpleNamespace(messages=ModelEchoMessages())
+        texts = ["Ouvrir", "Une très longue description", "Fermer"]
+        with mock.patch.object(translation, '_client', fake):
+            results = translate_routed(texts, ['hu'], 'default-model')
+        self.assertEqual(results['hu'], ["small: Ouvrir", "large: Une très longue description",
+                                         "small: Fermer"])
+        self.assertEqual(fake.messages.models, ['small', 'small', 'large'])
+        self.assertEqual(metrics.counters['tier.fast.segments'], 2)
+        self.assertIn('fast', router.report())
+
+    def test_streamed_segments_are_counted_per_tier(self):
+        router.configure([Tier('fast', 'small', max_tokens=4), Tier('full', 'large')])
+        fake = SimpleNamespace(messages=ModelEchoMessages())
+        with tempfile.TemporaryDirectory() as tmp:
+            tm_path = os.path.join(tmp, 'memory.jsonl')
+            memory.configure(tm_path)
+            try:
+                with mock.patch.object(translation, '_client', fake):
+                    results = dict(translate_gated_stream(["Ouvrir", "Une très longue description", "Fermer"], 'hu',
+                                                          'default-model'))
+            finally:
+                memory.close()
+            with open(tm_path, encoding='utf-8') as f:
+                models = {record['source']: record['model'] for record in map(json.loads, f)}
+        self.assertEqual(results[1], "large: Une très longue description")
+        self.assertEqual(metrics.counters['tier.fast.segments'], 2)
+        self.assertEqual(metrics.counters['tier.full.segments'], 1)
+        self.assertGreater(metrics.counters['tier.full.cost'], 0)
+        # A memóriába a szint modellje kerül, nem a --model
+        self.assertEqual(models, {"Ouvrir": 'small', "Une très longue description": 'large', "Fermer": 'small'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.pipeline import Pipeline
+from src.scheduler import MakespanPlan, order_jobs, simulate_makespan, split_balanced, split_paragraphs
+from tests.test_fan_out import FakeMessages
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_longest_first_with_small_files_up_front(self):
+        jobs = {'a': 5, 'b': 100, 'c': 1, 'd': 40, 'e': 20}
+        self.assertEqual(order_jobs(jobs, workers=2), ['c', 'a', 'b', 'd', 'e'])
+        # A nagy munka a végén hagyná egyedül dolgozni az egyik workert
+        self.assertEqual(simulate_makespan([1, 5, 20, 40, 100], 2), [121, 45])
+        self.assertEqual(simulate_makespan([1, 5, 100, 40, 20], 2), [101, 65])
+        self.assertEqual(MakespanPlan(jobs, 2, split=False).loads[0], 101)
+        # A 100-as munka nagyobb az ideális 83-as terhelésnél: szétosztva számolunk vele
+        self.assertEqual(MakespanPlan(jobs, 2).loads[0], 91)
+
+    def test_split_balanced(self):
+        parts = split_balanced([9, 1, 1, 8, 2, 3], 2)
+        self.assertEqual(sorted(i for part in parts for i in part), list(range(6)))
+        self.assertEqual(sorted(sum([9, 1, 1, 8, 2, 3][i] for i in part) for part in parts), [12, 12])
+
+    def test_split_paragraphs_keeps_code_blocks_and_separators(self):
+        text = "# Titre\n\nPremier paragraphe.\n\n```\ncode\n\nencore\n```\n\nDernier.\n\n"
+        chunks = split_paragraphs(text, max_tokens=10)
+        self.assertEqual(''.join(chunk + separator for chunk, separator in chunks), text)
+        self.assertEqual([chunk for chunk, _ in chunks],
+                         ["# Titre", "Premier paragraphe.", "```\ncode\n\nencore\n```", "Dernier."])
+        self.assertEqual(len(split_paragraphs(text, max_tokens=1000)), 1)
+
+    def test_dominant_text_file_is_chunked(self):
+        fake = SimpleNamespace(messages=FakeMessages())
+        source = "\n\n".join(f"Ouvrir la porte {i}." for i in range(8)) + "\n"
+        chunks = split_paragraphs(source, 10, translation.count_tokens)
+        self.assertGreater(len(chunks), 1)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(translation, '_client', fake), \
+                mock.patch('src.pipeline.CHUNK_TOKENS', 10):
+            with open(os.path.join(tmp, 'guide_fr.md'), 'w', encoding='utf-8') as f:
+                f.write(source)
+            stats = Pipeline('test-model', targets=['hu'], translate_workers=4).run(tmp)
+            self.assertEqual(stats, {'files': 1, 'written': 1, 'failed': 0})
+            # Egy lassú kérés mellé fedező másodpéldány is mehet, ezért a különböző kéréseket számoljuk
+            self.assertEqual(len({call['messages'][0]['content'] for call in fake.messages.calls}), len(chunks))
+            with open(os.path.join(tmp, 'guide_hu.md'), encoding='utf-8') as f:
+                self.assertEqual(f.read(), ''.join(f"[Hungarian] {chunk}{separator}" for chunk, separator in chunks))
+
+    def test_dominant_file_is_split_across_workers(self):
+        fake = SimpleNamespace(messages=FakeMessages())
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(translation, '_client', fake):
+            with open(os.path.join(tmp, 'big_fr.json'), 'w', encoding='utf-8') as f:
+                json.dump({f"k{i}": f"Ouvrir la porte {i}" for i in range(40)}, f)
+            with open(os.path.join(tmp, 'small_fr.json'), 'w', encoding='utf-8') as f:
+                json.dump({"a": "Fermer"}, f)
+            pipeline = Pipeline('test-model', targets=['hu'], translate_workers=4)
+            with self.assertLogs(level='INFO') as logs:
+                stats = pipeline.run(tmp)
+            self.assertEqual(stats, {'files': 2, 'written': 2, 'failed': 0})
+            self.assertTrue(any("into 4 parallel parts" in line for line in logs.output))
+            self.assertEqual(set(pipeline.makespan), {'predicted_makespan', 'makespan'})
+            with open(os.path.join(tmp, 'big_hu.json'), encoding='utf-8') as f:
+                data = json.load(f)
+            self.assertEqual([data[f"k{i}"] for i in range(40)], [f"[Hungarian] Ouvrir la porte {i}" for i in range(40)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from unittest import mock
+from src import translation, server_client
+from src.server import TranslationServer
+from tests.test_fan_out import FakeMessages
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        run_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(run_dir.cleanup)
+        env = mock.patch.dict(os.environ, {'TRANSLATOR_RUN_DIR': run_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.server = TranslationServer(0, 'test-model', 'hu')
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_health_and_strings(self):
+        self.assertTrue(server_client.is_running(self.port))
+        self.assertEqual(server_client.translate_strings(["Bonjour"], ['de'], self.port), {'de': ["[German] Bonjour"]})
+        with self.assertRaises(RuntimeError):
+            server_client.call('/translate-strings', {'texts': "not a list"}, self.port)
+
+    def test_translate_file_with_relative_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'menu_fr.json'), 'w', encoding='utf-8') as f:
+                json.dump({"title": "Accueil du vaisseau"}, f)
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                stats = server_client.translate_file('.', self.port, targets=['hu'], output_dir='out')
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(stats, {'files': 1, 'written': 1, 'failed': 0})
+            with open(os.path.join(tmp, 'out', 'menu_hu.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['title'], "[Hungarian] Accueil du vaisseau")
+
+    def test_post_needs_json_and_token(self):
+        url = f"http://127.0.0.1:{self.port}/shutdown"
+        self.assertEqual(os.stat(server_client.token_path(self.port)).st_mode & 0o777, 0o600)
+        for headers, status in [({'Content-Type': 'text/plain'}, 415),
+                                ({'Content-Type': 'application/json'}, 403),
+                                ({'Content-Type': 'application/json', server_client.TOKEN_HEADER: 'guess'}, 403)]:
+            request = urllib.request.Request(url, data=b'{}', headers=headers)
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)
+            self.assertEqual(context.exception.code, status)
+        self.assertTrue(server_client.is_running(self.port))
+
+    def test_not_running(self):
+        self.assertFalse(server_client.is_running(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
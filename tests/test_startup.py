@@ -0,0 +1,24 @@
+import unittest
+from startup_benchmark import measure_startup, heavy_imports, parse_importtime
+
+# Bőven a mért érték felett (lassú CI gépen is), a cél a nehéz importok visszatérésének elkapása
+MAX_STARTUP_MS = 2000
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_help_does_not_import_heavy_dependencies(self):
+        elapsed, modules = measure_startup(runs=1)
+        self.assertIn('src.main', [name for name, _, _, _ in modules])
+        self.assertEqual(heavy_imports(modules), [])
+        self.assertLess(elapsed, MAX_STARTUP_MS)
+
+    def test_parse_importtime(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        340 |   langdetect.detector\n")
+        self.assertEqual(parse_importtime(stderr), [('langdetect.detector', 120, 340, 1)])
+        self.assertEqual(heavy_imports(parse_importtime(stderr)), ['langdetect'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import tempfile
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import translate_gated
+from src.tm_import import align_tree, fallback_records, read_tmx, write_tmx
+from src.translation_memory import memory
+from tests.test_fan_out import FakeMessages
+
+XLIFF = """<?xml version="1.0" encoding="utf-8"?>
+<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">
+  <file source-language="fr" target-language="de-DE" datatype="plaintext" original="ui">
+    <body>
+      <trans-unit id="save"><source>Sauvegarder</source><target>Speichern</target></trans-unit>
+      <trans-unit id="quit"><source>Quitter</source></trans-unit>
+    </body>
+  </file>
+</xliff>
+"""
+
+
+class TestTranslationMemoryImport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(memory.close)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+        return path
+
+    def test_parallel_files_are_aligned_and_hit_the_cache(self):
+        self.write('menu_fr.json', {"menu": {"open": " Ouvrir ", "close": "Fermer {0}", "id": "Hangar"}})
+        self.write('menu_hu.json', {"menu": {"open": "Megnyitás", "close": "Bezárás", "id": "Hangar"}})
+        self.write('ui.xlf', XLIFF)
+        stats = Counter()
+        records = align_tree(self.tmp.name, 'fr', stats)
+        # A "Fermer {0}" fordításából hiányzik a helyőrző, a "Hangar" változatlan: egyik sem kerül be
+        self.assertEqual(stats['pairs'], 2)
+        self.assertEqual((stats['rejected'], stats['untranslated'], stats['unmatched']), (1, 1, 1))
+        self.assertIn(("Ouvrir", 'hu', "Megnyitás"), records)
+        self.assertIn(("Sauvegarder", 'de-de', "Speichern"), records)
+
+        memory.configure(os.path.join(self.tmp.name, 'tm.jsonl'))
+        self.assertEqual(memory.put_many(records), len(records))
+        # A de-DE pár tartalékként a régió nélküli 'de' célnyelvet is kiszolgálja
+        self.assertEqual(memory.put_many(fallback_records(records), derived=True), 1)
+        fake = SimpleNamespace(messages=FakeMessages())
+        with mock.patch.object(translation, '_client', fake):
+            results = translate_gated(["Ouvrir", "Sauvegarder"], ['hu', 'de'], 'test-model')
+        self.assertEqual(results['hu'][0], "Megnyitás")
+        self.assertEqual(results['de'][1], "Speichern")
+        self.assertEqual(len(fake.messages.calls), 2)
+
+    def test_tmx_round_trip(self):
+        entries = {("Ouvrir <b>{0}</b>", 'hu'): "<b>{0}</b> megnyitása", ("Ouvrir <b>{0}</b>", 'de'): "<b>{0}</b> öffnen",
+                   ("Fermer", 'hu'): "Bezárás"}
+        path = os.path.join(self.tmp.name, 'export.tmx')
+        self.assertEqual(write_tmx(path, entries, 'fr'), 2)
+        stats = Counter()
+        self.assertEqual(sorted(read_tmx(path, stats=stats)), sorted((s, l, t) for (s, l), t in entries.items()))
+        self.assertEqual(stats['pairs'], 3)
+
+    def test_region_is_kept_and_broken_tmx_is_skipped(self):
+        tmx = self.write('pt.tmx', '<tmx version="1.4"><header srclang="fr-FR"/><body><tu>'
+                                   '<tuv xml:lang="fr"><seg>Ouvrir</seg></tuv><tuv xml:lang="pt-BR"><seg>Abrir</seg></tuv>'
+                                   '</tu></body></tmx>')
+        broken = self.write('broken.tmx', '<tmx version="1.4"><body><tu>')
+        stats = Counter()
+        no_source = self.write('nosrc.tmx', '<tmx version="1.4"><header/><body><tu>'
+                                            '<tuv xml:lang="fr"><seg>Ouvrir</seg></tuv></tu></body></tmx>')
+        stats = Counter()
+        records = read_tmx(tmx, stats=stats) + read_tmx(broken, 'fr', stats) + read_tmx(no_source, stats=stats)
+        self.assertEqual(stats['unreadable'], 2)
+        self.assertEqual(records, [("Ouvrir", 'pt-br', "Abrir")])
+
+        memory.configure(os.path.join(self.tmp.name, 'tm.jsonl'))
+        memory.put_many(records)
+        memory.put_many(fallback_records(records), derived=True)
+        self.assertEqual(memory.get("Ouvrir", 'pt-BR'), "Abrir")
+        self.assertEqual(memory.get("Ouvrir", 'pt_br'), "Abrir")
+        self.assertEqual(memory.get("Ouvrir", 'pt'), "Abrir")
+
+    def test_region_fallback_never_overrides_an_exact_entry(self):
+        records = [("Fermer", 'pt-br', "Fechar (BR)"), ("Fermer", 'pt-pt', "Fechar (PT)"), ("Ouvrir", 'pt-pt', "Abrir"),
+                   ("Ouvrir", 'pt', "Abrir (pt)")]
+        tm_path = os.path.join(self.tmp.name, 'tm.jsonl')
+        memory.configure(tm_path)
+        memory.put_many(records)
+        memory.put_many(fallback_records(records), derived=True)
+        # Az első régiós pár a tartalék, a második nem írja felül; a pontos 'pt' bejegyzés megmarad
+        self.assertEqual(memory.get("Fermer", 'pt'), "Fechar (BR)")
+        self.assertEqual(memory.get("Ouvrir", 'pt'), "Abrir (pt)")
+
+        # Újratöltés után is tudjuk, melyik bejegyzés származtatott; egy pontos fordítás felülírja
+        memory.configure(tm_path)
+        self.assertEqual(memory.derived, {("Fermer", 'pt')})
+        memory.put("Fermer", 'pt', "Fechar")
+        self.assertEqual(memory.derived, set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import process_json
+from tests.test_fan_out import FakeMessages
+from tests.test_validation import TruncatingMessages
+
+
+class Interrupted(BaseException):
+    pass
+
+
+class CrashingMessages(FakeMessages):
+    """A harmadik kérésnél megszakad (mint egy Ctrl+C vagy a folyamat leállítása)"""
+
+    def create(self, **kwargs):
+        if len(self.calls) == 2:
+            raise Interrupted()
+        return super().create(**kwargs)
+
+
+class TestTranslateStream(unittest.TestCase):
+
+    def test_results_are_yielded_as_they_complete(self):
+        fake = SimpleNamespace(messages=TruncatingMessages())
+        consumed = []
+
+        def source():
+            for text in ["Ouvrir", "Fermer", "Sauver", "Charger"]:
+                consumed.append(text)
+                yield text
+
+        with mock.patch.object(translation, '_client', fake):
+            stream = translation.translate_stream(source(), 'hu', 'test-model', batch_size=3)
+            first = next(stream)
+            # Csak az első ablakot olvastuk be
+            self.assertEqual(consumed, ["Ouvrir", "Fermer", "Sauver"])
+            results = [first] + list(stream)
+
+        # A levágott "Fermer" az újrakérés után, az ablak végén jön
+        self.assertEqual([(index, text) for index, text, _ in results],
+                         [(0, "HU Ouvrir"), (2, "HU Sauver"), (1, "HU Fermer"), (3, "HU Charger")])
+        usage = dict((index, usage) for index, _, usage in results)
+        self.assertEqual(usage[0]['requests'], 1)
+        self.assertEqual(usage[1]['requests'], 2)
+        self.assertGreater(usage[1]['cost'], usage[0]['cost'])
+
+    def test_process_json_keeps_results_yielded_before_a_crash(self):
+        for stream in (False, True):
+            with self.subTest(stream=stream), tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'menu.json')
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({"a": "Ouvrir la porte", "b": "Fermer la porte", "c": "Sauver la partie"}, f)
+                with mock.patch.object(translation, '_client', SimpleNamespace(messages=CrashingMessages())):
+                    with self.assertRaises(Interrupted):
+                        process_json(path, None, 'test-model', 'hu', stream=stream)
+                with open(path, encoding='utf-8') as f:
+                    self.assertEqual(json.load(f), {"a": "[Hungarian] Ouvrir la porte",
+                                                    "b": "[Hungarian] Fermer la porte", "c": "Sauver la partie"})
+                with open(path + '.progress', encoding='utf-8') as f:
+                    self.assertEqual(sorted(json.load(f)), ["a", "b"])
+
+                # Folytatáskor csak a hiányzó szegmens megy ki
+                fake = SimpleNamespace(messages=FakeMessages())
+                with mock.patch.object(translation, '_client', fake):
+                    process_json(path, None, 'test-model', 'hu', stream=stream)
+                self.assertEqual(len(fake.messages.calls), 1)
+                with open(path, encoding='utf-8') as f:
+                    self.assertEqual(json.load(f)['c'], "[Hungarian] Sauver la partie")
+                self.assertFalse(os.path.exists(path + '.progress'))
+
+    def test_process_json_writes_once_per_checkpoint_interval(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'menu.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({f"k{i}": f"Ouvrir la porte {i}" for i in range(30)}, f)
+            with mock.patch.object(translation, '_client', SimpleNamespace(messages=FakeMessages())), \
+                    mock.patch('os.replace', wraps=os.replace) as replace:
+                process_json(path, None, 'test-model', 'hu', stream=False)
+            # 30 szegmens, de a teljes fájl csak egyszer, a végén íródik ki
+            self.assertEqual(replace.call_count, 1)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['k29'], "[Hungarian] Ouvrir la porte 29")
+            self.assertEqual(os.listdir(tmp), ['menu.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
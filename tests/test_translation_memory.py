@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import translate_gated
+from src.translation_memory import memory
+from tests.test_fan_out import FakeMessages
+
+
+class TestTranslationMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(memory.close)
+
+    def test_hits_skip_the_api_and_survive_a_restart(self):
+        memory.configure(self.path)
+        translate_gated(["Bonjour", "Salut"], ['hu'], 'test-model')
+        self.assertEqual(len(self.fake.messages.calls), 2)
+
+        memory.configure(self.path)
+        results = translate_gated(["Salut", "Merci", "Bonjour"], ['hu', 'de'], 'test-model')
+        self.assertEqual(results['hu'], ["[Hungarian] Salut", "[Hungarian] Merci", "[Hungarian] Bonjour"])
+        self.assertEqual(results['de'][0], "[German] Salut")
+        # hu: csak a "Merci" új, de: mind a három
+        self.assertEqual(len(self.fake.messages.calls), 2 + 1 + 3)
+        self.assertEqual(memory.stats()['hits'], 2)
+
+    def test_fuzzy_reuse_and_hints(self):
+        memory.configure(self.path)
+        translate_gated(["Niveau 3 requis", "Ouvrir la porte du hangar"], ['hu'], 'test-model')
+        self.assertEqual(len(self.fake.messages.calls), 2)
+
+        results = translate_gated(["Niveau 12 requis", "Ouvrir la porte du vaisseau"], ['hu'], 'test-model')
+        # Csak a szám tér el: a régi fordítást igazítjuk át, API hívás nélkül
+        self.assertEqual(results['hu'][0], "[Hungarian] Niveau 12 requis")
+        self.assertEqual(len(self.fake.messages.calls), 3)
+        # A hasonló szöveg few-shot példaként kerül a promptba
+        self.assertIn('"Ouvrir la porte du hangar" -> "[Hungarian] Ouvrir la porte du hangar"',
+                      self.fake.messages.calls[-1]['system'])
+        self.assertEqual(memory.stats()['fuzzy_reused'], 1)
+        self.assertEqual(memory.stats()['fuzzy_hinted'], 1)
+
+    def test_untranslated_fallback_is_not_stored(self):
+        memory.configure(self.path)
+        with mock.patch.object(translation, '_client', None), mock.patch.object(translation, 'get_client', return_value=None):
+            translate_gated(["Bonjour"], ['hu'], 'test-model')
+        self.assertEqual(memory.stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
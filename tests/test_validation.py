@@ -0,0 +1,104 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.file_processors import translate_gated
+from src.validation import check_response, check_segment, compare_files, validate_directory
+
+
+class DroppingMessages:
+    """Az első válaszból elhagyja a helyőrzőt, a másodikban már helyes fordítást ad"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        text = kwargs['messages'][0]['content'].split('\n', 1)[1]
+        reply = text.replace('{0}', '') if self.calls == 1 else f"HU {text}"
+        return SimpleNamespace(content=[SimpleNamespace(text=reply)], stop_reason='end_turn')
+
+
+class TruncatingMessages:
+    """A "Fermer" első fordítását levágja (max_tokens), a többi szegmenst elsőre jól fordítja"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        text = kwargs['messages'][0]['content'].split('\n', 1)[1]
+        if text == "Fermer" and len(self.calls) == 2:
+            return SimpleNamespace(content=[SimpleNamespace(text="Bez")], stop_reason='max_tokens')
+        return SimpleNamespace(content=[SimpleNamespace(text=f"HU {text}")], stop_reason='end_turn')
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_segment_checks(self):
+        codes = lambda source, target: [issue.code for issue in check_segment(source, target)]
+        self.assertEqual(codes("Bonjour {0}, %s <b>ami</b>", "Szia {0}, %s <b>barát</b>"), [])
+        self.assertEqual(codes("Bonjour {0}", "Szia"), ['placeholders'])
+        self.assertEqual(codes("Bonjour", "  "), ['empty'])
+        self.assertEqual(codes("Bonjour", "[TextBlock(text='Szia')]"), ['textblock'])
+        self.assertEqual(codes("Ouvrir la porte maintenant", "Ouvrir la porte maintenant"), ['untranslated'])
+        # A francia százalékjel szóközzel nem printf helyőrző
+        self.assertEqual(codes("50 % de remise, 10 % sur tout", "50% kedvezmény, mindenre 10%"), [])
+        self.assertEqual(codes("Remise de %d %%", "%d %% kedvezmény"), [])
+
+    def test_compare_files_and_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'menu_fr.json')
+            target = os.path.join(tmp, 'menu_hu.json')
+            with open(source, 'w', encoding='utf-8') as f:
+                json.dump({"a": "Ouvrir %s", "b": "Fermer"}, f)
+            with open(target, 'w', encoding='utf-8') as f:
+                json.dump({"a": "Nyitás %s"}, f)
+            self.assertEqual([(i.code, i.key) for i in compare_files(source, target)], [('missing-key', 'b')])
+
+            with open(os.path.join(tmp, 'broken_hu.json'), 'w', encoding='utf-8') as f:
+                f.write('{"a": ')
+            results = {os.path.basename(path): (source_path, issues)
+                       for path, source_path, issues in validate_directory(tmp, 'fr', workers=2)}
+            self.assertEqual(results['menu_hu.json'][0], source)
+            self.assertEqual([i.code for i in results['broken_hu.json'][1]], ['syntax'])
+            self.assertEqual(results['menu_fr.json'], (None, []))
+
+    def test_gate_requeues_only_failing_segments(self):
+        fake = SimpleNamespace(messages=DroppingMessages())
+        with mock.patch.object(translation, '_client', fake):
+            results = translate_gated(["Bonjour {0}"], ['hu'], 'test-model')
+        self.assertEqual(results['hu'], ["HU Bonjour {0}"])
+        self.assertEqual(fake.messages.calls, 2)
+
+
+    def test_response_checks(self):
+        self.assertEqual(check_response("Ouvrir", "Megnyitás", 'hu', 'end_turn'), [])
+        self.assertEqual(check_response("Ouvrir", "Megny", 'hu', 'max_tokens'), ['truncated'])
+        self.assertEqual(check_response("Ouvrir", "Here is the translation: Megnyitás", 'hu'), ['format'])
+        self.assertEqual(check_response("Ouvrir", "```\nMegnyitás\n```", 'hu'), ['format'])
+        self.assertEqual(check_response("Ouvrir la porte du hangar", "Nyit", 'hu'), ['ratio'])
+        # A CJK fordítás karakterre jóval rövidebb, de nem csonka
+        self.assertEqual(check_response("Le vaisseau est prêt pour le décollage immédiat.", "飞船已准备好立即起飞。", 'zh'), [])
+        self.assertEqual(check_response("Sauvegarder la partie", "ゲームを保存", 'ja'), [])
+        self.assertEqual(check_response("Le vaisseau est prêt pour le décollage immédiat.", "飞", 'zh'), ['ratio'])
+        self.assertEqual(check_response("Ouvrir la porte", "Open the hangar door of the ship now, please", 'hu'),
+                         ['language'])
+
+    def test_only_rejected_responses_are_retried(self):
+        fake = SimpleNamespace(messages=TruncatingMessages())
+        with mock.patch.object(translation, '_client', fake):
+            results = translation.batch_translate_texts(["Ouvrir", "Fermer", "Sauver"], 'hu', 'test-model')
+        self.assertEqual(results, ["HU Ouvrir", "HU Fermer", "HU Sauver"])
+        self.assertEqual(len(fake.messages.calls), 4)
+        retry = fake.messages.calls[-1]
+        self.assertEqual(retry['messages'][0]['content'].split('\n', 1)[1], "Fermer")
+        self.assertEqual(retry['max_tokens'], 2000)
+        self.assertIn("IMPORTANT", retry['system'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.translation_memory import memory
+from src.watch import IncrementalTranslator, InotifyWatcher, PollingWatcher
+from tests.test_fan_out import FakeMessages
+from tests.test_work_queue import LoanwordMessages
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(memory.close)
+        memory.configure(os.path.join(self.tmp.name, 'state', 'memory.jsonl'))
+
+    def write_json(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return path
+
+    def test_only_changed_segments_are_translated(self):
+        state_path = os.path.join(self.tmp.name, 'state', 'watch_state.json')
+        source = self.write_json('menu_fr.json', {"a": "Ouvrir la porte", "b": "Fermer la porte", "id": "42"})
+        translator = IncrementalTranslator('test-model', targets=['hu'], state_path=state_path)
+        self.assertEqual(translator.process([source])['translated'], 2)
+        self.assertEqual(len(self.fake.messages.calls), 2)
+
+        # Saját kimenet és változatlan fájl: nincs munka
+        self.assertEqual(translator.process([source, os.path.join(self.tmp.name, 'menu_hu.json')])['files'], 0)
+
+        self.write_json('menu_fr.json', {"a": "Ouvrir la porte", "b": "Fermer la trappe", "c": "Nouvelle entrée du hangar", "id": "43"})
+        # Újraindítás után is csak a különbség megy ki
+        translator = IncrementalTranslator('test-model', targets=['hu'], state_path=state_path)
+        self.assertEqual(translator.process([source])['translated'], 2)
+        self.assertEqual(len(self.fake.messages.calls), 4)
+        with open(os.path.join(self.tmp.name, 'menu_hu.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"a": "[Hungarian] Ouvrir la porte", "b": "[Hungarian] Fermer la trappe",
+                                            "c": "[Hungarian] Nouvelle entrée du hangar", "id": "43"})
+
+    def test_segments_failed_during_outage_are_retried(self):
+        state_path = os.path.join(self.tmp.name, 'state', 'watch_state.json')
+        source = self.write_json('menu_fr.json', {"a": "Ouvrir la porte", "b": "Fermer la porte"})
+        translator = IncrementalTranslator('test-model', targets=['hu'], state_path=state_path)
+        with mock.patch.object(translation.caller, 'create', side_effect=ConnectionError("API down")):
+            self.assertEqual(translator.process([source])['translated'], 0)
+        self.assertEqual(translator.pending(), [os.path.abspath(source)])
+
+        # Helyreállás után a fájl változása nélkül is lefordulnak, és többé nem maradnak függőben
+        self.assertEqual(translator.retry_pending()['translated'], 2)
+        self.assertEqual(translator.pending(), [])
+        with open(os.path.join(self.tmp.name, 'menu_hu.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"a": "[Hungarian] Ouvrir la porte", "b": "[Hungarian] Fermer la porte"})
+
+        # A következő változáskor csak az új szegmens megy ki
+        self.write_json('menu_fr.json', {"a": "Ouvrir la porte", "b": "Fermer la porte", "c": "Nouvelle entrée"})
+        self.assertEqual(translator.process([source])['translated'], 1)
+        self.assertEqual(len(self.fake.messages.calls), 3)
+
+    def test_translation_equal_to_source_is_not_pending(self):
+        self.fake.messages = LoanwordMessages()
+        state_path = os.path.join(self.tmp.name, 'state', 'watch_state.json')
+        source = self.write_json('menu_fr.json', {"a": "Garage", "b": "Ouvrir la porte"})
+        translator = IncrementalTranslator('test-model', targets=['hu'], state_path=state_path)
+        self.assertEqual(translator.process([source])['translated'], 2)
+        self.assertEqual(translator.pending(), [])
+        self.assertEqual(translator.retry_pending()['translated'], 0)
+        self.assertEqual(len(self.fake.messages.calls), 2)
+
+    def test_in_place_output_is_not_translated_again(self):
+        state_path = os.path.join(self.tmp.name, 'state', 'watch_state.json')
+        source = os.path.join(self.tmp.name, 'notes.txt')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write("Ouvrir la porte du garage")
+        translator = IncrementalTranslator('test-model', state_path=state_path)
+        self.assertEqual(translator.process([source])['translated'], 1)
+        with open(source, encoding='utf-8') as f:
+            translated = f.read()
+        self.assertIn("Ouvrir la porte du garage", translated)
+        self.assertNotEqual(translated, "Ouvrir la porte du garage")
+
+        # A saját írásunk (és egy újabb esemény ugyanarra a tartalomra) nem fordít újra
+        self.assertEqual(translator.process([source], force=True)['translated'], 0)
+        translator = IncrementalTranslator('test-model', state_path=state_path)
+        self.assertEqual(translator.process([source], force=True)['translated'], 0)
+        self.assertEqual(len(self.fake.messages.calls), 1)
+
+    def test_watchers_report_changed_files(self):
+        watchers = [PollingWatcher(self.tmp.name, interval=0.01)]
+        try:
+            watchers.append(InotifyWatcher(self.tmp.name))
+        except (OSError, AttributeError):
+            pass
+        path = self.write_json('strings_fr.json', {"a": "Bonjour"})
+        os.makedirs(os.path.join(self.tmp.name, 'sub'))
+        for watcher in watchers:
+            changed = set()
+            for _ in range(3):
+                changed |= watcher.changes(0.05)
+            self.assertIn(path, changed, type(watcher).__name__)
+            watcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
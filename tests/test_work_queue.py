@@ -0,0 +1,100 @@
+import os
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import translation
+from src.work_queue import WorkQueue, enqueue_tree, run_worker
+from tests.test_fan_out import FakeMessages
+
+
+class LoanwordMessages(FakeMessages):
+    """A jövevényszavakat (Garage, Hangar) változatlanul adja vissza, ez a helyes fordításuk"""
+
+    def create(self, **kwargs):
+        response = super().create(**kwargs)
+        text = response.content[0].text.split('] ', 1)[1]
+        if text in ('Garage', 'Hangar'):
+            response.content[0].text = text
+        return response
+
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = SimpleNamespace(messages=FakeMessages())
+        patcher = mock.patch.object(translation, '_client', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source_dir = os.path.join(self.tmp.name, 'src')
+        os.makedirs(self.source_dir)
+        for name in ('menu_fr.json', 'dialog_fr.json'):
+            with open(os.path.join(self.source_dir, name), 'w', encoding='utf-8') as f:
+                json.dump({f"k{i}": f"Bonjour le monde numéro {i}" for i in range(5)}, f)
+        self.db_path = os.path.join(self.tmp.name, 'queue.db')
+
+    def test_crashed_lease_is_reclaimed_and_files_are_merged(self):
+        queue = WorkQueue(self.db_path)
+        stats = enqueue_tree(queue, self.source_dir, targets=['hu', 'de'], shard_size=2)
+        self.assertEqual(stats, {'files': 2, 'shards': 6})
+        # Újra felvétel nem duplikál
+        self.assertEqual(enqueue_tree(queue, self.source_dir, targets=['hu', 'de'])['shards'], 0)
+
+        # Egy worker lefoglal egy shardot, majd "összeomlik": a bérlete azonnal lejár
+        crashed = queue.claim('crashed-worker', lease=-1)
+        self.assertIsNotNone(crashed)
+
+        self.assertEqual(run_worker(self.db_path, 'test-model', lease=30), 6)
+        self.assertFalse(queue.heartbeat(crashed.id, 'crashed-worker'))
+        self.assertFalse(queue.complete(crashed, 'crashed-worker', {'hu': ['x'] * 2, 'de': ['x'] * 2}))
+        self.assertEqual(queue.status()['shards'], {'done': 6})
+
+        self.assertEqual(queue.merge(), {'merged': 2, 'stale': 0})
+        with open(os.path.join(self.source_dir, 'menu_de.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['k4'], "[German] Bonjour le monde numéro 4")
+        self.assertEqual(len(data), 5)
+
+    def test_untranslated_shards_fail_and_can_be_requeued(self):
+        queue = WorkQueue(self.db_path, max_attempts=2)
+        enqueue_tree(queue, self.source_dir, targets=['hu'], shard_size=5)
+        # API kiesés: a forrásszöveg marad, ez nem számít kész shardnak
+        with mock.patch.object(translation.caller, 'create', side_effect=ConnectionError("API down")):
+            self.assertEqual(run_worker(self.db_path, 'test-model'), 0)
+        self.assertEqual(queue.status()['shards'], {'failed': 2})
+        self.assertEqual(queue.merge(), {'merged': 0, 'stale': 0})
+
+        self.assertEqual(queue.requeue(), 2)
+        self.assertEqual(run_worker(self.db_path, 'test-model'), 2)
+        self.assertEqual(queue.merge(), {'merged': 2, 'stale': 0})
+
+    def test_translation_equal_to_source_completes_the_shard(self):
+        self.fake.messages = LoanwordMessages()
+        with open(os.path.join(self.source_dir, 'menu_fr.json'), 'w', encoding='utf-8') as f:
+            json.dump({"a": "Garage", "b": "Hangar", "c": "Ouvrir la porte"}, f)
+        os.remove(os.path.join(self.source_dir, 'dialog_fr.json'))
+        queue = WorkQueue(self.db_path, max_attempts=2)
+        enqueue_tree(queue, self.source_dir, targets=['hu'], shard_size=5)
+
+        self.assertEqual(run_worker(self.db_path, 'test-model'), 1)
+        self.assertEqual(queue.status()['shards'], {'done': 1})
+        self.assertEqual(len({call['messages'][0]['content'] for call in self.fake.messages.calls}), 3)
+        self.assertEqual(queue.merge(), {'merged': 1, 'stale': 0})
+        with open(os.path.join(self.source_dir, 'menu_hu.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"a": "Garage", "b": "Hangar", "c": "[Hungarian] Ouvrir la porte"})
+
+    def test_changed_source_is_not_merged(self):
+        queue = WorkQueue(self.db_path)
+        enqueue_tree(queue, self.source_dir, targets=['hu'])
+        run_worker(self.db_path, 'test-model')
+        with open(os.path.join(self.source_dir, 'menu_fr.json'), 'w', encoding='utf-8') as f:
+            json.dump({"k0": "Au revoir tout le monde"}, f)
+        self.assertEqual(queue.merge(), {'merged': 1, 'stale': 1})
+        self.assertFalse(os.path.exists(os.path.join(self.source_dir, 'menu_hu.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
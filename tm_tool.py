@@ -0,0 +1,54 @@
+import sys
+import argparse
+from collections import Counter
+from src.translation_memory import memory
+from src.tm_import import align_tree, fallback_records, read_tmx, write_tmx
+
+def import_paths(args):
+    stats = Counter()
+    records = []
+    for path in args.paths:
+        if path.lower().endswith('.tmx'):
+            records.extend(read_tmx(path, args.source_lang, stats))
+        else:
+            records.extend(align_tree(path, args.source_lang or 'fr', stats))
+    memory.configure(args.tm)
+    # Előbb a pontos párok, így a régiós párok tartaléka egy ugyanebben az importban lévő pontos párt sem ír felül
+    added = memory.put_many(records) + memory.put_many(fallback_records(records), derived=True)
+    print(f"{stats['files']} file(s), {stats['pairs']} aligned pair(s), {added} new translation memory entries")
+    skipped = {name: stats[name] for name in ('unmatched', 'empty', 'untranslated', 'rejected', 'unreadable') if stats[name]}
+    if skipped:
+        print("Skipped: " + ", ".join(f"{count} {name}" for name, count in skipped.items()))
+    print(f"Translation memory {args.tm}: {memory.stats()['entries']} entries")
+    memory.close()
+
+def export_tmx(args):
+    memory.configure(args.tm)
+    # A régiós párokból származtatott tartalék bejegyzések nem kerülnek a TMX-be
+    entries = {key: target for key, target in memory.entries.items() if key not in memory.derived}
+    memory.close()
+    units = write_tmx(args.output, entries, args.source_lang)
+    print(f"Exported {len(entries)} translations of {units} source segments to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap the translation memory from existing translations, or export it as TMX")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Align parallel locale files, XLIFF targets and TMX files into the translation memory")
+    importer.add_argument("paths", nargs="+", help="Directories or files: name_<lang>.ext is paired with name_<source-lang>.ext by key path, "
+                                                   ".xlf trans-units by ID, .tmx files are read as-is")
+    importer.add_argument("--tm", required=True, help="Translation memory file (JSON lines), created if missing")
+    importer.add_argument("--source-lang", help="Source language code (default: fr for locale files, the header srclang for TMX files)")
+    importer.set_defaults(handler=import_paths)
+
+    exporter = commands.add_parser("export", help="Write the translation memory as a TMX 1.4 file")
+    exporter.add_argument("output", help="TMX file to write")
+    exporter.add_argument("--tm", required=True, help="Translation memory file (JSON lines)")
+    exporter.add_argument("--source-lang", default="fr", help="Source language code written to the TMX (default: fr)")
+    exporter.set_defaults(handler=export_tmx)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())